@@ -75,6 +75,24 @@ GENEAPROVE_STATIC_ROOT = (
     else __GENEAPROVE_ROOT_DEV
 )
 
+# Maximum number of years a person can live. This is used to estimate the
+# lifespan of persons for which we do not know the birth or death dates.
+GENEAPROVE_MAX_LIFESPAN = 110
+
+# Whether to maintain the ancestor_closure table, which speeds up queries for
+# ancestors and descendants at the cost of disk space. When enabling it on an
+# existing database, run "./manage.py rebuild ancestor_closure".
+GENEAPROVE_ANCESTOR_CLOSURE = False
+
+# Whether to record the SQL queries executed by each JSON request, to report
+# those repeated from the same place in the code (N+1 patterns) and check
+# the query budget of views (see JSONView.query_budget).
+GENEAPROVE_SQL_AUDIT = False
+
+# Whether a request that exceeds its query budget fails (with
+# QueryBudgetExceeded) instead of only logging a warning. Useful in tests.
+GENEAPROVE_SQL_BUDGET_STRICT = False
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
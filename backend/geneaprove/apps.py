@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class GeneaproveConfig(AppConfig):
+    name = 'geneaprove'
+
+    def ready(self):
+        # Keep the derived tables up-to-date when assertions change
+        from . import signals  # noqa: F401
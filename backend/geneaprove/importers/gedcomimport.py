@@ -7,6 +7,7 @@ import django.utils.timezone
 from geneaprove.utils.gedcom import parse_gedcom, Invalid_Gedcom, \
         GedcomRecord, ADDR_FIELDS, FAM_EVENT_FIELDS
 from geneaprove import models
+from geneaprove.signals import suspended
 from django.db import transaction, connection
 import geneaprove.importers
 import re
@@ -1722,8 +1723,10 @@ class GedcomFileImporter(geneaprove.importers.Importer):
                A tuple (success, errors), where errors might be None
         """
 
+        # The derived tables are computed once the import is done, see
+        # PersonSet.recompute_main_ids
         try:
-            with transaction.atomic():
+            with suspended(), transaction.atomic():
                 m = GedcomImporter(filename)
             return (True, m.errors_as_string())
         except Invalid_Gedcom as e:
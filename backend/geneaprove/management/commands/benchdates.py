@@ -0,0 +1,88 @@
+"""
+Provides new commands to ./manage.py
+"""
+
+import json
+import sys
+import time
+from django.core.management.base import BaseCommand
+from geneaprove.utils import date
+from geneaprove.utils.tests.datecorpus import corpus
+
+
+def _cache_stats(func):
+    info = func.cache_info()
+    total = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": round(info.hits / total, 4) if total else None,
+        "size": info.currsize,
+    }
+
+
+def _timed(func, dates, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for d in dates:
+            func(d)
+    elapsed = time.perf_counter() - start
+    count = len(dates) * repeat
+    return {
+        "dates": count,
+        "seconds": round(elapsed, 6),
+        "dates_per_sec": round(count / elapsed, 1) if elapsed else None,
+    }
+
+
+class Command(BaseCommand):
+    """Benchmark the date parser on a corpus of real-world dates"""
+
+    help = 'Measure the performance of date parsing, output json'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--synthetic', type=int, default=5000,
+            help='Number of synthetic dates added to the GEDCOM dates')
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Seed used to generate the synthetic dates')
+        parser.add_argument(
+            '--repeat', type=int, default=1,
+            help='Number of passes over the corpus')
+        parser.add_argument(
+            '--output', default=None,
+            help='Write results to this file rather than stdout')
+
+    def handle(self, *args, **options):
+        dates = corpus(synthetic=options['synthetic'], seed=options['seed'])
+        repeat = options['repeat']
+        result = {
+            "corpus": {
+                "dates": len(dates),
+                "distinct": len(set(dates)),
+                "unparsed": sum(
+                    1 for d in set(dates) if date.sort_date(d) is None),
+            },
+        }
+
+        # Uncached parsing, as done by earlier versions
+        result["DateRange"] = _timed(date.DateRange, dates, repeat)
+        result["DateRange.sort_date"] = _timed(
+            lambda d: date.DateRange(d).sort_date(), dates, repeat)
+
+        # Cached versions, starting from an empty cache
+        date.cache_clear()
+        result["parse"] = _timed(date.parse, dates, repeat)
+        result["parse"]["cache"] = _cache_stats(date.parse)
+
+        date.cache_clear()
+        result["sort_date"] = _timed(date.sort_date, dates, repeat)
+        result["sort_date"]["cache"] = _cache_stats(date.sort_date)
+
+        out = json.dumps(result, indent=3)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(out + "\n")
+        else:
+            sys.stdout.write(out + "\n")
@@ -0,0 +1,142 @@
+"""
+Provides new commands to ./manage.py
+"""
+
+import datetime
+import gc
+import json
+import sys
+import time
+from django.core.management.base import BaseCommand
+from geneaprove import models
+from geneaprove.models.theme.styles import Style
+from geneaprove.views.to_json import ModelEncoder
+
+
+def _objects(model, count):
+    """
+    Unsaved instances of `model`, with all the fields used by their
+    serializers. None of them needs a query to be converted.
+    """
+    now = datetime.datetime(2020, 1, 1, 12, 30)
+    assertion = dict(
+        rationale='found in census', researcher_id=1, last_change=now,
+        source_id=None, surety_id=2)
+
+    if model == models.Persona:
+        return [models.Persona(
+                    id=i, display_name=f'John Smith {i}', main_id=i,
+                    last_change=now)
+                for i in range(count)]
+    elif model == models.Event:
+        return [models.Event(
+                    id=i, name='Birth', type_id=1, place_id=i % 100,
+                    date='1870-05-03', date_sort='1870-05-03')
+                for i in range(count)]
+    elif model == models.Place:
+        return [models.Place(
+                    id=i, name=f'Place {i}', date=None, date_sort=None,
+                    parent_place_id=None)
+                for i in range(count)]
+    elif model == models.Source:
+        return [models.Source(
+                    id=i, title=f'Census {i}', abbrev='Census',
+                    biblio='Census', medium='book', subject_date='1870',
+                    higher_source_id=None, researcher_id=1, last_change=now)
+                for i in range(count)]
+    elif model == Style:
+        return [Style(font_weight='bold', color='red', fill='#fff')
+                for i in range(count)]
+    elif model == models.P2E:
+        return [models.P2E(id=i, person_id=i, event_id=i, role_id=1,
+                           **assertion)
+                for i in range(count)]
+    elif model == models.P2P:
+        return [models.P2P(id=i, person1_id=i, person2_id=i + 1, type_id=1,
+                           **assertion)
+                for i in range(count)]
+    elif model == models.P2G:
+        return [models.P2G(id=i, person_id=i, group_id=i, role_id=1,
+                           **assertion)
+                for i in range(count)]
+    elif model == models.P2C:
+        result = []
+        for i in range(count):
+            c = models.Characteristic(
+                id=i, name='Occupation', date='1870', date_sort=None,
+                place_id=None)
+            c._prefetched_objects_cache = {'parts': [
+                models.Characteristic_Part(
+                    characteristic_id=i, type_id=1, name='farmer')]}
+            result.append(models.P2C(
+                id=i, person_id=i, characteristic=c, **assertion))
+        return result
+
+
+def _timed(encoder, objects, repeat):
+    """
+    Time the encoding of objects, keeping the best of `repeat` passes. As
+    in timeit, the garbage collector is disabled while timing.
+    """
+    best = None
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            out = encoder.encode(objects)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        gc.enable()
+    return out, {
+        "seconds": round(best, 6),
+        "objects_per_sec": round(len(objects) / best, 1) if best else None,
+    }
+
+
+class Command(BaseCommand):
+    """Benchmark the conversion of model instances to JSON"""
+
+    help = ('Compare the speed of ModelEncoder with and without the'
+            ' registered serializers, output json')
+
+    MODELS = (models.Persona, models.Event, models.Place, models.Source,
+              Style, models.P2E, models.P2C, models.P2P, models.P2G)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count', type=int, default=100000,
+            help='Number of instances of each model')
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Number of passes over the instances, the best one is kept')
+        parser.add_argument(
+            '--output', default=None,
+            help='Write results to this file rather than stdout')
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        result = {}
+
+        for model in self.MODELS:
+            objects = _objects(model, options['count'])
+            generic, result_generic = _timed(
+                ModelEncoder(serializers={}), objects, repeat)
+            registry, result_registry = _timed(
+                ModelEncoder(), objects, repeat)
+            result[model.__name__] = {
+                "objects": len(objects),
+                "generic": result_generic,
+                "registry": result_registry,
+                "speedup": round(
+                    result_generic["seconds"] / result_registry["seconds"],
+                    2) if result_registry["seconds"] else None,
+                "identical": generic == registry,
+            }
+
+        out = json.dumps(result, indent=3)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(out + "\n")
+        else:
+            sys.stdout.write(out + "\n")
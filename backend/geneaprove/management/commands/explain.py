@@ -0,0 +1,145 @@
+"""
+Provides new commands to ./manage.py
+"""
+
+import django.db
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import termcolors
+from geneaprove import models
+from geneaprove.sql import (
+    AssertList, PersonSet, PlaceSet, Relationship, SourceSet, update_derived)
+from geneaprove.utils.sqlaudit import QueryRecorder
+
+STYLE = termcolors.make_style(fg='green', opts=('bold',))
+WARNING = termcolors.make_style(fg='red', opts=('bold',))
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """Report the queries that need a full scan of a table"""
+
+    help = ('Run the queries done by PersonSet, SourceSet, PlaceSet and'
+            ' AssertList for one person, source, place and event, and report'
+            ' the ones for which the database reads a whole table'
+            ' (EXPLAIN QUERY PLAN). Changes made while updating the derived'
+            ' tables are rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--person', type=int, help='Id of a persona')
+        parser.add_argument('--source', type=int, help='Id of a source')
+        parser.add_argument('--place', type=int, help='Id of a place')
+        parser.add_argument('--event', type=int, help='Id of an event')
+        parser.add_argument(
+            '--min-rows', type=int, default=1000,
+            help='Ignore full scans of tables with fewer rows')
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Show the plan of all queries, not only full scans')
+
+    def handle(self, *args, **options):
+        if django.db.connection.vendor != 'sqlite':
+            raise CommandError('Only supported for sqlite databases')
+
+        def _default(name, model):
+            return options[name] or model.objects \
+                .values_list('id', flat=True).order_by('id').first()
+
+        ids = dict(
+            person=_default('person', models.Persona),
+            source=_default('source', models.Source),
+            place=_default('place', models.Place),
+            event=_default('event', models.Event))
+
+        with QueryRecorder(skip=(__name__, )) as queries:
+            self._workload(**ids)
+
+        scans = 0
+
+        with django.db.connection.cursor() as cur:
+            # The tables large enough that a full scan matters
+            tables = set()
+            for t in django.db.connection.introspection.table_names(cur):
+                cur.execute(
+                    f'SELECT COUNT(*) FROM (SELECT 1 FROM "{t}" LIMIT %s)',
+                    [options['min_rows']])
+                if cur.fetchone()[0] >= options['min_rows']:
+                    tables.add(t)
+
+            for normalized, (sql, params) in queries.statements.items():
+                try:
+                    cur.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                except django.db.Error:
+                    continue   # for instance "pragma"
+
+                plan = [row[3] for row in cur.fetchall()]
+                full = [d for d in plan
+                        if d.startswith("SCAN ")
+                        and "USING" not in d
+                        and "VIRTUAL TABLE" not in d
+                        and d.split()[1] in tables]
+
+                if full or options['all']:
+                    style = WARNING if full else STYLE
+                    sys.stdout.write(style(f"{normalized}\n"))
+                    for d in plan:
+                        sys.stdout.write(f"   {d}\n")
+                scans += bool(full)
+
+        sys.stdout.write(STYLE(
+            f"{len(queries)} queries, {len(queries.statements)} distinct,"
+            f" {scans} with full table scans\n"))
+
+    def _workload(self, person, source, place, event):
+        """
+        Run the queries done by the views. Only the queries for which the
+        plan depends on the data (ids) need to run here, the plan of the
+        others is computed once.
+        """
+        if person is not None:
+            persons = PersonSet()
+            persons.add_ids([person])
+            main_id = persons.get_from_id(person).main_id
+            persons.add_folks(main_id, Relationship.ANCESTORS)
+            persons.add_folks(main_id, Relationship.DESCENDANTS)
+            persons.has_known_parent(list(persons.persons))
+            persons.has_known_parent(
+                list(persons.persons), relationship=Relationship.DESCENDANTS)
+            persons.fetch_p2e()
+            persons.fetch_p2c()
+            persons.fetch_p2p()
+            persons.asserts.to_json()
+
+            persons = PersonSet()
+            persons.add_ids([main_id])
+            persons.count_asserts()
+            persons.fetch_asserts_subset(limit=20).to_json()
+
+            PersonSet().add_ids(limit=20)
+
+            try:
+                with django.db.transaction.atomic():
+                    update_derived(main_ids=[main_id])
+                    raise _Rollback()
+            except _Rollback:
+                pass
+
+        if source is not None:
+            sources = SourceSet()
+            sources.add_ids([source])
+            sources.get_citations(source)
+            sources.count_asserts()
+            sources.fetch_asserts(limit=20)
+            sources.asserts.to_json()
+
+        if place is not None:
+            places = PlaceSet()
+            places.add_ids([place])
+            places.count_asserts()
+            places.fetch_asserts(limit=20).to_json()
+
+        if event is not None:
+            AssertList(models.P2E.objects.filter(event_id=event)).to_json()
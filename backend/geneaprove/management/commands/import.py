@@ -5,6 +5,7 @@ Provides new commands to ./manage.py
 import sys
 import time
 from geneaprove.importers.gedcomimport import GedcomFileImporter
+from geneaprove.sql import PersonSet
 from django.utils import termcolors
 from django.core.management.base import LabelCommand
 
@@ -29,6 +30,9 @@ class Command(LabelCommand):
         if errors:
             print(errors)
 
+        # Also updates the tables derived from the assertions
+        PersonSet.recompute_main_ids()
+
         end = time.time()
         sys.stdout.write(
             STYLE(f'Done importing ({(end - start):0.3f} s)\n'))
@@ -0,0 +1,34 @@
+"""
+Provides new commands to ./manage.py
+"""
+
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import termcolors
+from geneaprove.sql.derived import TABLES, update_derived
+
+STYLE = termcolors.make_style(fg='green', opts=('bold',))
+
+
+class Command(BaseCommand):
+    """Recompute the tables derived from the assertions"""
+
+    help = ('Recompute the tables derived from the assertions (all of them'
+            f' by default): {", ".join(TABLES)}')
+
+    def add_arguments(self, parser):
+        parser.add_argument('tables', nargs='*', help='Tables to recompute')
+
+    def handle(self, *args, **options):
+        tables = options['tables'] or None
+        for t in tables or []:
+            if t not in TABLES:
+                raise CommandError(
+                    f'Unknown table {t}, expecting one of {", ".join(TABLES)}')
+
+        start = time.time()
+        update_derived(tables=tables)
+        end = time.time()
+        sys.stdout.write(
+            STYLE(f'Done rebuilding ({(end - start):0.3f} s)\n'))
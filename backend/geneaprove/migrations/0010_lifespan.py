@@ -0,0 +1,37 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    derived_tables = ['lifespan']
+    # Computed once all migrations are applied, see signals.migrated
+
+    dependencies = [
+        ('geneaprove', '0009_main_id_in_persona'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lifespan',
+            fields=[
+                ('person', models.OneToOneField(db_column='main_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='lifespan', serialize=False, to='geneaprove.Persona')),
+                ('start', models.IntegerField(help_text='Earliest possible birth year')),
+                ('end', models.IntegerField(help_text='Latest possible death year')),
+                ('span', models.IntegerField(help_text='end - start. Indexed so that the longest lifespan in the table can be found efficiently')),
+                ('birth_known', models.BooleanField(default=False, help_text='Whether start is a known birth date')),
+                ('death_known', models.BooleanField(default=False, help_text='Whether end is a known death date')),
+            ],
+            options={
+                'db_table': 'lifespan',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='lifespan',
+            index=models.Index(fields=['start', 'end'], name='lifespan_start'),
+        ),
+        migrations.AddIndex(
+            model_name='lifespan',
+            index=models.Index(fields=['span'], name='lifespan_span'),
+        ),
+    ]
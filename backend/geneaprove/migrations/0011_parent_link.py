@@ -0,0 +1,33 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    derived_tables = ['parent_link']
+    # Computed once all migrations are applied, see signals.migrated
+
+    dependencies = [
+        ('geneaprove', '0010_lifespan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParentLink',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sex', models.TextField(help_text='The sex of the parent, if known', null=True)),
+                ('child', models.ForeignKey(db_column='child_main_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='parent_links', to='geneaprove.Persona')),
+                ('parent', models.ForeignKey(db_column='parent_main_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='child_links', to='geneaprove.Persona')),
+                ('role', models.ForeignKey(db_index=False, help_text='The role of the parent in the birth event', on_delete=django.db.models.deletion.CASCADE, to='geneaprove.Event_Type_Role')),
+            ],
+            options={
+                'db_table': 'parent_link',
+                'unique_together': {('child', 'parent', 'role')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='parentlink',
+            index=models.Index(fields=['parent', 'child'], name='parent_link_parent'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    derived_tables = ['ancestor_closure']
+    # Computed once all migrations are applied, see signals.migrated
+
+    dependencies = [
+        ('geneaprove', '0011_parent_link'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AncestorClosure',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generation', models.IntegerField(help_text='Number of generations between the two persons')),
+                ('path_count', models.IntegerField(default=1, help_text='Number of distinct paths from descendant to ancestor with that number of generations')),
+                ('ancestor', models.ForeignKey(db_column='ancestor_main_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='descendant_closure', to='geneaprove.Persona')),
+                ('descendant', models.ForeignKey(db_column='descendant_main_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_closure', to='geneaprove.Persona')),
+            ],
+            options={
+                'db_table': 'ancestor_closure',
+                'unique_together': {('ancestor', 'descendant', 'generation')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ancestorclosure',
+            index=models.Index(fields=['descendant', 'generation'], name='ancestor_closure_desc'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geneaprove', '0012_ancestor_closure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change_Counter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'change_counter',
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+# Expression indexes for the sort order of the lists (keyset pagination),
+# which cannot be described in the models.
+INDEXES = {
+    'persona_sort': 'persona (lower(name), id)',
+    'place_sort': 'place (lower(name), id)',
+    'source_sort': 'source (lower(abbrev), lower(title), id)',
+}
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geneaprove', '0013_change_counter'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f'CREATE INDEX {name} ON {columns}',
+            f'DROP INDEX {name}')
+        for name, columns in INDEXES.items()
+    ]
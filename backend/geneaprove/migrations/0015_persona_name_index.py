@@ -0,0 +1,65 @@
+import collections
+from django.db import migrations
+
+
+def forward(apps, schema_editor):
+    # A virtual table, which cannot be described in the models
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE persona_name_index USING fts5("
+        "name, given, surname, "
+        "tokenize='unicode61 remove_diacritics 2', "
+        "prefix='1 2 3')")
+
+    # main_id -> (names, given names, surnames)
+    names = collections.defaultdict(lambda: (set(), set(), set()))
+
+    with schema_editor.connection.cursor() as cur:
+        cur.execute(
+            "SELECT persona.main_id, persona.name FROM persona "
+            "WHERE persona.main_id IS NOT NULL")
+        for main_id, name in cur.fetchall():
+            names[main_id][0].add(name)
+
+        cur.execute(
+            "SELECT persona.main_id, t.gedcom, part.name "
+            "FROM persona, p2c, characteristic_part part, "
+            "characteristic_part_type t "
+            "WHERE p2c.person_id=persona.id "
+            "AND NOT p2c.disproved "
+            "AND part.characteristic_id=p2c.characteristic_id "
+            "AND part.type_id=t.id "
+            "AND t.is_name_part "
+            "AND persona.main_id IS NOT NULL")
+        for main_id, gedcom, name in cur.fetchall():
+            n = names[main_id]
+            if gedcom == 'GIVN':
+                n[1].add(name)
+            elif gedcom == 'SURN':
+                n[2].add(name)
+            else:
+                n[0].add(name)   # nickname, prefix,...
+
+        cur.executemany(
+            "INSERT INTO persona_name_index "
+            "(rowid, name, given, surname) VALUES (%s, %s, %s, %s)",
+            [(main_id, ' '.join(n), ' '.join(g), ' '.join(s))
+             for main_id, (n, g, s) in names.items()])
+
+
+def backward(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE persona_name_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geneaprove', '0014_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(forward, backward),
+    ]
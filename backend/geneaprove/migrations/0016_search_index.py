@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+def forward(apps, schema_editor):
+    # A virtual table, which cannot be described in the models
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE persona_name_index")
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE search_index USING fts5("
+            "name, given, surname, details, "
+            "tokenize='unicode61 remove_diacritics 2', "
+            "prefix='1 2 3')")
+
+
+def backward(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE search_index")
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE persona_name_index USING fts5("
+            "name, given, surname, "
+            "tokenize='unicode61 remove_diacritics 2', "
+            "prefix='1 2 3')")
+
+
+class Migration(migrations.Migration):
+
+    derived_tables = ['search_index']
+    # Computed once all migrations are applied, see signals.migrated
+
+    dependencies = [
+        ('geneaprove', '0015_persona_name_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(forward, backward),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    derived_tables = ['person_summary']
+    # Computed once all migrations are applied, see signals.migrated
+
+    dependencies = [
+        ('geneaprove', '0016_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Person_Summary',
+            fields=[
+                ('person', models.OneToOneField(db_column='main_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='geneaprove.Persona')),
+                ('sex', models.TextField(help_text='The sex of the person, if known', null=True)),
+                ('birth', models.TextField(help_text='Date of the earliest birth event', null=True)),
+                ('death', models.TextField(help_text='Date of the latest death event', null=True)),
+                ('marriage', models.TextField(help_text='Date of the earliest marriage event', null=True)),
+                ('personas', models.IntegerField(default=1, help_text='Number of personas grouped in the person')),
+                ('events', models.IntegerField(default=0, help_text='Number of person-to-event assertions')),
+                ('characteristics', models.IntegerField(default=0, help_text='Number of person-to-characteristic assertions')),
+            ],
+            options={
+                'db_table': 'person_summary',
+            },
+        ),
+    ]
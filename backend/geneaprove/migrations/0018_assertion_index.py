@@ -0,0 +1,51 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    derived_tables = ['assertion_index']
+    # Computed once all migrations are applied, see signals.migrated
+
+    dependencies = [
+        ('geneaprove', '0017_person_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Assertion_Index',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.IntegerField(help_text='The table of the assertion, see AssertionIndexSet.KINDS')),
+                ('assertion_id', models.IntegerField(help_text='The id of the assertion in its table')),
+                ('date_sort', models.TextField(help_text='The date used to sort assertions', null=True)),
+                ('event', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='geneaprove.Event')),
+                ('person', models.ForeignKey(db_column='person_main_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='geneaprove.Persona')),
+                ('place', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='geneaprove.Place')),
+                ('source', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='geneaprove.Source')),
+            ],
+            options={
+                'db_table': 'assertion_index',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='assertion_index',
+            index=models.Index(fields=['kind', 'assertion_id'], name='assertion_index_id'),
+        ),
+        migrations.AddIndex(
+            model_name='assertion_index',
+            index=models.Index(fields=['event'], name='assertion_index_event'),
+        ),
+        migrations.AddIndex(
+            model_name='assertion_index',
+            index=models.Index(fields=['person', 'date_sort', 'kind', 'assertion_id'], name='assertion_index_person'),
+        ),
+        migrations.AddIndex(
+            model_name='assertion_index',
+            index=models.Index(fields=['source', 'date_sort', 'kind', 'assertion_id'], name='assertion_index_source'),
+        ),
+        migrations.AddIndex(
+            model_name='assertion_index',
+            index=models.Index(fields=['place', 'date_sort', 'kind', 'assertion_id'], name='assertion_index_place'),
+        ),
+    ]
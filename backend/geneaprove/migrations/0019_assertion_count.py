@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    derived_tables = ['assertion_index']
+    # Computed once all migrations are applied, see signals.migrated
+
+    dependencies = [
+        ('geneaprove', '0018_assertion_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Assertion_Count',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('about', models.IntegerField(help_text='What object_id refers to, see AssertionIndexSet.COLUMNS')),
+                ('object_id', models.IntegerField(help_text='The main_id of a person, or the id of a source or place')),
+                ('count', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'assertion_count',
+                'unique_together': {('about', 'object_id')},
+            },
+        ),
+    ]
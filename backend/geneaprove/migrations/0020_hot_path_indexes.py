@@ -0,0 +1,64 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Indexes for the queries that compute the derived tables and the family
+# graph. The partial indexes only apply to queries that test
+# "NOT disproved", as the raw queries in geneaprove.sql do.
+INDEXES = {
+    'p2e_event_role': 'p2e (event_id, role_id) WHERE NOT disproved',
+    'p2e_person_role': 'p2e (person_id, role_id) WHERE NOT disproved',
+    'characteristic_part_char_type':
+        'characteristic_part (characteristic_id, type_id)',
+}
+
+# Foreign keys that are no longer indexed on their own. They have few
+# distinct values, but without statistics (before running ANALYZE) sqlite
+# assumes these indexes are selective, and uses them in correlated
+# subqueries instead of the indexes on the persons.
+# These are the names that django gave to the indexes in 0001_initial.
+UNINDEXED = {
+    'p2e_role_id_605d5a5b': 'p2e (role_id)',
+    'event_type_id_79752242': 'event (type_id)',
+    'characteristic_part_type_id_b4173c99': 'characteristic_part (type_id)',
+}
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geneaprove', '0019_assertion_count'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    f'DROP INDEX IF EXISTS {name}',
+                    f'CREATE INDEX {name} ON {columns}')
+                for name, columns in UNINDEXED.items()
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='p2e',
+                    name='role',
+                    field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='geneaprove.Event_Type_Role'),
+                ),
+                migrations.AlterField(
+                    model_name='event',
+                    name='type',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='geneaprove.Event_Type'),
+                ),
+                migrations.AlterField(
+                    model_name='characteristic_part',
+                    name='type',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='geneaprove.Characteristic_Part_Type'),
+                ),
+            ],
+        ),
+    ] + [
+        migrations.RunSQL(
+            f'CREATE INDEX {name} ON {columns}',
+            f'DROP INDEX {name}')
+        for name, columns in INDEXES.items()
+    ]
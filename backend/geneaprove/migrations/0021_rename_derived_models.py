@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geneaprove', '0020_hot_path_indexes'),
+    ]
+
+    operations = [
+        # Follow the naming convention of other multi-word models. The
+        # tables keep their names.
+        migrations.RenameModel(
+            old_name='AncestorClosure',
+            new_name='Ancestor_Closure',
+        ),
+        migrations.RenameModel(
+            old_name='ParentLink',
+            new_name='Parent_Link',
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+# The sort order of sources has NULL replaced with an empty string, so that
+# the index can be used for the keyset pagination (see 0014).
+OLD_COLUMNS = 'source (lower(abbrev), lower(title), id)'
+NEW_COLUMNS = (
+    "source (COALESCE(lower(abbrev), ''), COALESCE(lower(title), ''), id)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geneaprove', '0021_rename_derived_models'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            ['DROP INDEX source_sort',
+             f'CREATE INDEX source_sort ON {NEW_COLUMNS}'],
+            ['DROP INDEX source_sort',
+             f'CREATE INDEX source_sort ON {OLD_COLUMNS}']),
+    ]
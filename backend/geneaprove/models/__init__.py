@@ -9,19 +9,24 @@ object appropriate for use by simplejson. For instance:
          return {"name": self.name}
 """
 
-from django.db import models, connection
+from django.db import models, connection, transaction
 import django.utils.timezone
 from .asserts import Assertion, P2P, P2C, P2E, P2G, P2P_Type
 from .characteristic import Characteristic_Part_Type, \
     Characteristic, Characteristic_Part
+from .closure import Ancestor_Closure
 from .event import Event_Type, Event_Type_Role, Event
 from .group import Group_Type, Group_Type_Role, Group
+from .lifespan import Lifespan
+from .parentlink import Parent_Link
 from .persona import Persona
 from .place import Place, Place_Part_Type, Place_Part
 from .representation import Representation
 from .repository import Repository, Repository_Type
 from .researcher import Researcher
 from .source import Source, Citation_Part_Type, Citation_Part
+from .summary import Person_Summary
+from .timeline import Assertion_Index, Assertion_Count
 from .surety import Surety_Scheme, Surety_Scheme_Part
 from .base import GeneaProveModel, Part_Type
 from .theme import Theme, Rule, RulePart
@@ -42,6 +47,38 @@ class Config(GeneaProveModel):
         db_table = "config"
 
 
+class Change_Counter(GeneaProveModel):
+    """
+    Counters incremented every time some part of the database changes, so
+    that in-memory caches (possibly in other processes) know when they need
+    to be reloaded.
+    """
+
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.IntegerField(default=0)
+
+    class Meta:
+        """Meta data for the model"""
+        db_table = "change_counter"
+
+    @staticmethod
+    def increment(name):
+        """Increment the counter `name`, creating it if needed"""
+        with transaction.atomic():
+            updated = Change_Counter.objects \
+                .filter(name=name) \
+                .update(value=models.F('value') + 1)
+            if not updated:
+                Change_Counter.objects.create(name=name, value=1)
+
+    @staticmethod
+    def get(name):
+        """The current value of the counter `name`"""
+        return Change_Counter.objects \
+            .filter(name=name) \
+            .values_list('value', flat=True).first() or 0
+
+
 class Project (GeneaProveModel):
 
     """
@@ -2,7 +2,7 @@ import collections
 from django.db import models
 import django.utils.timezone
 import logging
-from .base import GeneaProveModel
+from .base import GeneaProveModel, fields_getter
 from .characteristic import Characteristic, Characteristic_Part_Type
 from .event import Event, Event_Type_Role
 from .group import Group, Group_Type_Role
@@ -77,15 +77,21 @@ class Assertion(GeneaProveModel):
         """What select_related() to use if we want to export to JSON"""
         return []
 
+    _json_fields = fields_getter(
+        'id', 'disproved', 'rationale', 'researcher_id', 'last_change',
+        'source_id', 'surety_id')
+
     def to_json(self):
+        (id, disproved, rationale, researcher_id, last_change, source_id,
+         surety_id) = self._json_fields()
         return {
-            "id": self.id,
-            "disproved": self.disproved,
-            "rationale": self.rationale,
-            "researcher": self.researcher_id,
-            "last_change": self.last_change,
-            "source_id": self.source_id,
-            "surety": self.surety_id}
+            "id": id,
+            "disproved": disproved,
+            "rationale": rationale,
+            "researcher": researcher_id,
+            "last_change": last_change,
+            "source_id": source_id,
+            "surety": surety_id}
 
     def getRelatedIds(self, into):
         """
@@ -127,11 +133,14 @@ class P2P(Assertion):
         super().getRelatedIds(into)
         into.add_missing(persons=(self.person1_id, self.person2_id))
 
+    _p2p_fields = fields_getter('person1_id', 'person2_id', 'type_id')
+
     def to_json(self):
+        person1_id, person2_id, type_id = self._p2p_fields()
         res = super().to_json()
-        res['p1'] = {'person': self.person1_id}
-        res['p2'] = {'person': self.person2_id}
-        res['type'] = self.type_id
+        res['p1'] = {'person': person1_id}
+        res['p2'] = {'person': person2_id}
+        res['type'] = type_id
         return res
 
 
@@ -159,23 +168,28 @@ class P2C(Assertion):
         into.add_missing(persons=(self.person_id, ),
                          places=(self.characteristic.place_id, ))
 
-    def to_json(self):
-        res = super().to_json()
-        fetch_image = False
+    def has_image(self):
+        """
+        Whether the characteristic is an image, in which case the
+        representations of the source are also needed.
+        """
+        return self.source_id is not None and any(
+            p.type_id == Characteristic_Part_Type.PK_img
+            for p in self.characteristic.parts.all())
 
-        # ??? Could be slow, and result in a lot of queries
-        parts = []
-        for p in self.characteristic.parts.all():
-            parts.append({'type': p.type_id, 'value': p.name})
-            if p.type_id == Characteristic_Part_Type.PK_img:
-                fetch_image = True
+    _p2c_fields = fields_getter('person_id')
 
-        res['p1'] = {'person': self.person_id}
+    def to_json(self):
+        # The parts and the representations should have been prefetched,
+        # see AssertList.to_json()
+        res = super().to_json()
+        res['p1'] = {'person': self._p2c_fields()}
         res['p2'] = {'char': self.characteristic,
                      'repr': list(self.source.representations.all())
-                         if fetch_image and self.source
+                         if self.has_image()
                          else None,
-                     'parts': parts}
+                     'parts': [{'type': p.type_id, 'value': p.name}
+                               for p in self.characteristic.parts.all()]}
         return res
 
 
@@ -187,7 +201,11 @@ class P2E(Assertion):
     event = models.ForeignKey(
         Event, related_name="actors", on_delete=models.CASCADE)
     role = models.ForeignKey(
-        Event_Type_Role, null=True, on_delete=models.CASCADE)
+        Event_Type_Role, null=True, on_delete=models.CASCADE,
+        db_index=False)
+    # Not indexed on its own: there are few roles, and the planner would
+    # otherwise use this index rather than the one on person or event. See
+    # the p2e_event_role and p2e_person_role indexes instead.
 
     def __str__(self):
         role = f" (as {self.role_id if self.role_id else ''})"
@@ -210,10 +228,13 @@ class P2E(Assertion):
             events=(self.event_id, ),
             places=(self.event.place_id, ))
 
+    _p2e_fields = fields_getter('person_id', 'event_id', 'role_id')
+
     def to_json(self):
+        person_id, event_id, role_id = self._p2e_fields()
         res = super().to_json()
-        res['p1'] = {'person': self.person_id}
-        res['p2'] = {'event': self.event_id, 'role': self.role_id}
+        res['p1'] = {'person': person_id}
+        res['p2'] = {'event': event_id, 'role': role_id}
         return res
 
 
@@ -234,10 +255,13 @@ class P2G(Assertion):
         super().getRelatedIds(into)
         into.add_missing(persons=(self.person_id, ))
 
+    _p2g_fields = fields_getter('person_id', 'group_id', 'role_id')
+
     def to_json(self):
+        person_id, group_id, role_id = self._p2g_fields()
         res = super().to_json()
-        res['p1'] = {'person': self.person_id}
-        res['p2'] = {'group': self.group_id, 'role': self.role_id}
+        res['p1'] = {'person': person_id}
+        res['p2'] = {'group': group_id, 'role': role_id}
         return res
 
 
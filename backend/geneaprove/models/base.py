@@ -1,5 +1,25 @@
 from django.db import models
 from geneaprove.utils import date
+import operator
+
+
+def fields_getter(*attrs):
+    """
+    A function that returns the tuple of the values of `attrs` for a model
+    instance. Fields are read directly from the instance's __dict__, which
+    is much faster than going through django's descriptors for foreign
+    keys. Instances with deferred fields, and attributes that are not
+    fields, fall back to reading the attributes.
+    """
+    from_attrs = operator.attrgetter(*attrs)
+    from_dict = operator.itemgetter(*attrs)
+
+    def _get(obj):
+        try:
+            return from_dict(obj.__dict__)
+        except KeyError:
+            return from_attrs(obj)
+    return _get
 
 
 class GeneaProveModel(models.Model):
@@ -26,7 +46,7 @@ def compute_sort_date(partial_date):
     """
     return (None
             if partial_date is None
-            else date.DateRange(partial_date).sort_date())
+            else date.sort_date(partial_date))
 
 
 ##########
@@ -1,7 +1,8 @@
 from django.db import models
 from geneaprove.utils.date import DateRange
 from .place import Place
-from .base import GeneaProveModel, compute_sort_date, Part_Type, lazy_lookup
+from .base import GeneaProveModel, compute_sort_date, Part_Type, \
+    fields_getter, lazy_lookup
 
 
 class Characteristic_Part_Type(Part_Type):
@@ -49,13 +50,15 @@ class Characteristic(GeneaProveModel):
         self.date_sort = compute_sort_date(self.date)
         super().save(**kwargs)
 
+    _json_fields = fields_getter('name', 'date', 'date_sort', 'place_id')
+
     def to_json(self):
+        name, date, date_sort, place_id = self._json_fields()
         return {
-            "name": self.name,
-            "date": self.date,
-            "date_sort": None
-                if not self.date_sort else DateRange(self.date_sort),
-            "place": self.place_id}
+            "name": name,
+            "date": date,
+            "date_sort": None if not date_sort else DateRange(date_sort),
+            "place": place_id}
 
 
 class Characteristic_Part(GeneaProveModel):
@@ -68,7 +71,8 @@ class Characteristic_Part(GeneaProveModel):
     characteristic = models.ForeignKey(
         Characteristic, related_name="parts", on_delete=models.CASCADE)
     type = models.ForeignKey(
-        Characteristic_Part_Type, on_delete=models.CASCADE)
+        Characteristic_Part_Type, on_delete=models.CASCADE, db_index=False)
+    # Not indexed on its own, see the characteristic_part_char_type index
     name = models.TextField()
     sequence_number = models.IntegerField(default=1)
 
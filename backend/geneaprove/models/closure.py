@@ -0,0 +1,40 @@
+from django.db import models
+from .base import GeneaProveModel
+from .persona import Persona
+
+
+class Ancestor_Closure(GeneaProveModel):
+    """
+    The transitive closure of the parent_link table: one row for each
+    ancestor of each person, and each generation at which that ancestor
+    appears in the tree (a person can appear several times in the same tree
+    in case of implex).
+    This table is only maintained when the GENEAPROVE_ANCESTOR_CLOSURE
+    setting is True (see geneaprove.sql.closure), since it can become large.
+    """
+
+    ancestor = models.ForeignKey(
+        Persona, db_column="ancestor_main_id", db_index=False,
+        related_name="descendant_closure", on_delete=models.CASCADE)
+    descendant = models.ForeignKey(
+        Persona, db_column="descendant_main_id", db_index=False,
+        related_name="ancestor_closure", on_delete=models.CASCADE)
+    generation = models.IntegerField(
+        help_text="Number of generations between the two persons")
+    path_count = models.IntegerField(
+        default=1,
+        help_text="Number of distinct paths from descendant to ancestor with"
+        " that number of generations")
+
+    class Meta:
+        """Meta data for the model"""
+        db_table = "ancestor_closure"
+        unique_together = (("ancestor", "descendant", "generation"), )
+        indexes = [
+            models.Index(fields=['descendant', 'generation'],
+                         name='ancestor_closure_desc'),
+        ]
+
+    def __str__(self):
+        return (f'<Ancestor_Closure {self.ancestor_id} -> '
+                f'{self.descendant_id} gen={self.generation}>')
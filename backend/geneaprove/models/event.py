@@ -1,7 +1,8 @@
 from django.db import models
 from geneaprove.utils.date import DateRange
 from .place import Place
-from .base import GeneaProveModel, Part_Type, compute_sort_date, lazy_lookup
+from .base import GeneaProveModel, Part_Type, compute_sort_date, lazy_lookup, \
+    fields_getter
 
 
 class Event_Type(Part_Type):
@@ -56,7 +57,10 @@ class Event(GeneaProveModel):
     assertion.
     """
 
-    type = models.ForeignKey(Event_Type, on_delete=models.CASCADE)
+    type = models.ForeignKey(
+        Event_Type, on_delete=models.CASCADE, db_index=False)
+    # Not indexed: there are few types, and events are always found from
+    # their actors
     place = models.ForeignKey(Place, null=True, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     date = models.CharField(
@@ -79,31 +83,33 @@ class Event(GeneaProveModel):
         date = " (on " + d + ")" if d else ""
         return self.name + date
 
+    _json_fields = fields_getter(
+        'id', 'name', 'type_id', 'place_id', 'date', 'date_sort')
+
     def to_json(self):
-        # Convert the date sort to a datetime, so that we can then send either
-        # only the year or the full date to clients
-        d = self.date_sort
+        id, name, type_id, place_id, date, date_sort = self._json_fields()
         return {
-            "id": self.id,
-            "name": self.name,
-            "type": self.type_id,
-            "place": self.place_id,
-            "date": self.date,
-            "date_sort": self.date_sort
+            "id": id,
+            "name": name,
+            "type": type_id,
+            "place": place_id,
+            "date": date,
+            "date_sort": date_sort
         }
 
     def get_place_part(self, part):
         """
-        Look for a specific place part, possibly querying the database.
+        Look for a specific place part, possibly querying the database
+        unless the parts and their types were prefetched.
         `part` is one of "name", "country", ...
         """
         if self.place:
             if part == "name":
                 return self.place.name
             else:
-                try:
-                    return self.place.parts.get(part, "")
-                except ValueError:
-                    return None
+                for p in self.place.parts.all():
+                    if p.type.name == part:
+                        return p.name
+                return ""
         else:
             return None
@@ -0,0 +1,41 @@
+from django.db import models
+from .base import GeneaProveModel
+from .persona import Persona
+
+
+class Lifespan(GeneaProveModel):
+    """
+    The period during which a person might have been alive, as estimated
+    from the dates of all the events the person took part in.
+    This table is a cache, computed from the P2E assertions (see
+    geneaprove.sql.lifespans). There is one row per person (main_id) that
+    has at least one dated event.
+    Dates are stored as years, which is precise enough to filter persons
+    that could have been alive at a given time.
+    """
+
+    person = models.OneToOneField(
+        Persona, primary_key=True, db_column="main_id",
+        related_name="lifespan", on_delete=models.CASCADE)
+    start = models.IntegerField(
+        help_text="Earliest possible birth year")
+    end = models.IntegerField(
+        help_text="Latest possible death year")
+    span = models.IntegerField(
+        help_text="end - start. Indexed so that the longest lifespan in"
+        " the table can be found efficiently")
+    birth_known = models.BooleanField(
+        default=False, help_text="Whether start is a known birth date")
+    death_known = models.BooleanField(
+        default=False, help_text="Whether end is a known death date")
+
+    class Meta:
+        """Meta data for the model"""
+        db_table = "lifespan"
+        indexes = [
+            models.Index(fields=['start', 'end'], name='lifespan_start'),
+            models.Index(fields=['span'], name='lifespan_span'),
+        ]
+
+    def __str__(self):
+        return f'<Lifespan {self.person_id} {self.start}-{self.end}>'
@@ -0,0 +1,37 @@
+from django.db import models
+from .base import GeneaProveModel
+from .event import Event_Type_Role
+from .persona import Persona
+
+
+class Parent_Link(GeneaProveModel):
+    """
+    A direct parent-child relationship between two persons.
+    This table is a cache, computed from the birth events (the child is the
+    principal, and the parents have the father or mother role), so that
+    recursive queries for ancestors and descendants do not need to join
+    persona, p2e and event for each generation (see geneaprove.sql.parents).
+    """
+
+    child = models.ForeignKey(
+        Persona, db_column="child_main_id", db_index=False,
+        related_name="parent_links", on_delete=models.CASCADE)
+    parent = models.ForeignKey(
+        Persona, db_column="parent_main_id", db_index=False,
+        related_name="child_links", on_delete=models.CASCADE)
+    role = models.ForeignKey(
+        Event_Type_Role, db_index=False, on_delete=models.CASCADE,
+        help_text="The role of the parent in the birth event")
+    sex = models.TextField(
+        null=True, help_text="The sex of the parent, if known")
+
+    class Meta:
+        """Meta data for the model"""
+        db_table = "parent_link"
+        unique_together = (("child", "parent", "role"), )
+        indexes = [
+            models.Index(fields=['parent', 'child'], name='parent_link_parent'),
+        ]
+
+    def __str__(self):
+        return f'<Parent_Link {self.child_id} -> {self.parent_id}>'
@@ -1,5 +1,6 @@
 from django.db import models
-from .base import GeneaProveModel, compute_sort_date, Part_Type
+from .base import GeneaProveModel, compute_sort_date, Part_Type, \
+    fields_getter
 from ..sql import AssertList
 
 
@@ -44,6 +45,18 @@ class Place(GeneaProveModel):
         self.date_sort = compute_sort_date(self.date)
         super().save(**kwargs)
 
+    _json_fields = fields_getter(
+        'id', 'date', 'date_sort', 'parent_place_id', 'name')
+
+    def to_json(self):
+        id, date, date_sort, parent_place_id, name = self._json_fields()
+        return {
+            "id": id,
+            "date": date,
+            "date_sort": date_sort,
+            "parent_place_id": parent_place_id,
+            "name": name}
+
 
 class Place_Part_Type(Part_Type):
     """
@@ -1,7 +1,7 @@
 from django.db import models
 import django.utils.timezone
 
-from .base import GeneaProveModel, Part_Type
+from .base import GeneaProveModel, Part_Type, fields_getter
 from .place import Place
 from .repository import Repository
 from .researcher import Researcher
@@ -72,20 +72,32 @@ documents the citation styles.""")
         """Meta data for the model"""
         db_table = "source"
 
+    _json_fields = fields_getter(
+        'higher_source_id', 'subject_place_id', 'jurisdiction_place_id',
+        'researcher_id', 'subject_date', 'medium', 'title', 'id', 'abbrev',
+        'biblio', 'last_change', 'comments')
+
     def to_json(self):
+        (higher_source_id, subject_place_id, jurisdiction_place_id,
+         researcher_id, subject_date, medium, title, id, abbrev, biblio,
+         last_change, comments) = self._json_fields()
         return {
-            "higher_source_id": self.higher_source_id,
-            "subject_place": self.subject_place,
-            "jurisdiction_place": self.jurisdiction_place,
-            "researcher": self.researcher_id,
-            "subject_date": self.subject_date,
-            "medium": self.medium,
-            "title": self.title,
-            "id": self.id,
-            "abbrev": self.abbrev,
-            "biblio": self.biblio,
-            "last_change": self.last_change,
-            "comments": self.comments}
+            "higher_source_id": higher_source_id,
+            # The places themselves, only fetched when they are set
+            "subject_place":
+                None if subject_place_id is None else self.subject_place,
+            "jurisdiction_place":
+                None if jurisdiction_place_id is None
+                else self.jurisdiction_place,
+            "researcher": researcher_id,
+            "subject_date": subject_date,
+            "medium": medium,
+            "title": title,
+            "id": id,
+            "abbrev": abbrev,
+            "biblio": biblio,
+            "last_change": last_change,
+            "comments": comments}
 
 #    def compute_medium(self):
 #        """
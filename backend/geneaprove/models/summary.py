@@ -0,0 +1,39 @@
+from django.db import models
+from .base import GeneaProveModel
+from .persona import Persona
+
+
+class Person_Summary(GeneaProveModel):
+    """
+    The data needed to display a person in lists and trees.
+    This table is a cache, computed from the assertions (see
+    geneaprove.sql.summary), so that these do not have to be fetched and
+    merged every time. There is one row per person (main_id).
+    Dates are stored as sort dates (see DateRange.sort_date()).
+    """
+
+    person = models.OneToOneField(
+        Persona, primary_key=True, db_column="main_id",
+        related_name="summary", on_delete=models.CASCADE)
+    sex = models.TextField(
+        null=True, help_text="The sex of the person, if known")
+    birth = models.TextField(
+        null=True, help_text="Date of the earliest birth event")
+    death = models.TextField(
+        null=True, help_text="Date of the latest death event")
+    marriage = models.TextField(
+        null=True, help_text="Date of the earliest marriage event")
+    personas = models.IntegerField(
+        default=1, help_text="Number of personas grouped in the person")
+    events = models.IntegerField(
+        default=0, help_text="Number of person-to-event assertions")
+    characteristics = models.IntegerField(
+        default=0,
+        help_text="Number of person-to-characteristic assertions")
+
+    class Meta:
+        """Meta data for the model"""
+        db_table = "person_summary"
+
+    def __str__(self):
+        return f'<Person_Summary {self.person_id}>'
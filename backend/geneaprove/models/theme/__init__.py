@@ -1,3 +1,4 @@
+import collections
 from django.db import models
 from ..base import GeneaProveModel
 from .checks import Checker
@@ -23,7 +24,22 @@ class Theme(GeneaProveModel):
         """
         Return the list of RuleChecker for this theme.
         """
-        return [r.as_rule_checker() for r in self.rules.all()]
+        rules = self.fetch_rules()
+        return [r.as_rule_checker() for r in rules]
+
+    def fetch_rules(self):
+        """
+        All rules of the theme, with their parts and children. They are
+        fetched at once, rather than recursively for each And or Or rule.
+        :returntype: list of Rule
+        """
+        rules = list(self.rules.prefetch_related('parts'))
+        children = collections.defaultdict(list)
+        for r in rules:
+            children[r.parent_id].append(r)
+        for r in rules:
+            r._children = children[r.id]
+        return rules
 
 
 class Rule(GeneaProveModel):
@@ -56,6 +72,9 @@ class Rule(GeneaProveModel):
         ordering = ("sequence_number", "name")
         db_table = "rule"
 
+    _children = None
+    # The child rules, when already fetched (see Theme.fetch_rules)
+
     def __str__(self):
         return (
             f"(Rule name={self.name} type={self.type}"
@@ -77,19 +96,25 @@ class Rule(GeneaProveModel):
 
             # ??? Should send a list and let front-end deal with dict
             'parts': {p.field: p for p in self.parts.all()},
-            'children': self.children.all(),
+            'children': self.get_children(),
         }
 
+    def get_children(self):
+        """The child rules"""
+        if self._children is None:
+            return list(self.children.all())
+        return self._children
+
     def as_rule_checker(self):
         """
         Create a RuleChecker, usable from python to check whether the rule
         applies.
         """
-        children = [r.as_rule_checker() for r in self.children.all()]
+        rules = [r.as_rule_checker() for r in self.get_children()]
 
         kwargs = {}
-        if children:
-            kwargs["rules"] = children
+        if rules:
+            kwargs["rules"] = rules
 
         for part in self.parts.all():
             kwargs[part.field] = Checker.build_check(part)
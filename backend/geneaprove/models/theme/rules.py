@@ -2,7 +2,7 @@ import collections
 import datetime
 from geneaprove import models
 from .checks import Check_Success, Check_Exact
-from geneaprove.sql import PersonSet, Relationship
+from geneaprove.sql import LifespanSet, PersonSet, Relationship
 
 __slots__ = ["RuleChecker"]
 
@@ -61,6 +61,14 @@ class RuleChecker(object, metaclass=_RuleMeta):
         """
         pass
 
+    def prepare(self, persons, precomputed):
+        """
+        Same as `precompute`, but called once the persons to display are
+        known, before `initial`, so that only their data is fetched.
+        :param PersonSet persons:
+        """
+        pass
+
     def initial(self, person, precomputed, statuses):
         """
         Compute the initial status, for the given person
@@ -93,6 +101,16 @@ class Alive(RuleChecker):
         self.max_age = max_age
         self.alive = alive or Check_Success()
 
+    def prepare(self, persons, precomputed):
+        # Persons that might still be alive, as estimated from the dates
+        # of all their events, or for which we know no date at all. Only
+        # needed for persons with no known birth or death.
+        current_year = datetime.datetime.now().year
+        precomputed[self.id] = LifespanSet().get_alive(
+            current_year, current_year, include_unknown=True,
+            main_ids=[p.main_id for p in persons.persons.values()
+                      if p.birthISODate is None and p.deathISODate is None])
+
     def initial(self, person, precomputed, statuses):
         # If we have no birth date, we could assume it is at least 15 years
         # before the first child's birth date (recursively). But that becomes
@@ -104,7 +122,10 @@ class Alive(RuleChecker):
         if death is not None:
             alive = False  # known death, person is no longer alive
         elif birth is None:
-            alive = None   # no known birth or death, can't say anything
+            # no known birth or death, but other events might tell us the
+            # person is no longer alive
+            alive = (None if person.main_id in precomputed[self.id]
+                     else False)
         else:
             current_year = datetime.datetime.now().year
             b_year = int(birth[0:4])
@@ -137,6 +158,10 @@ class _Combine(RuleChecker):
         for rule in self.rules:
             rule.precompute(decujus, precomputed)
 
+    def prepare(self, persons, precomputed):
+        for rule in self.rules:
+            rule.prepare(persons, precomputed)
+
     def _combine(self, values):
         pass
 
@@ -195,7 +220,7 @@ class KnownFather(RuleChecker):
 
     def precompute(self, decujus, precomputed):
         if 'knownancestors' not in precomputed:
-            precomputed['knownancestors'] = PersonSet.has_known_parent()
+            precomputed['knownancestors'] = PersonSet().has_known_parent()
 
     def initial(self, person, precomputed, statuses):
         knownp = precomputed['knownancestors']
@@ -211,7 +236,7 @@ class KnownMother(RuleChecker):
 
     def precompute(self, decujus, precomputed):
         if 'knownancestors' not in precomputed:
-            precomputed['knownancestors'] = PersonSet.has_known_parent()
+            precomputed['knownancestors'] = PersonSet().has_known_parent()
 
     def initial(self, person, precomputed, statuses):
         knownp = precomputed['knownancestors']
@@ -236,7 +261,7 @@ class Ancestor(RuleChecker):
             raise Exception
 
     def precompute(self, decujus, precomputed):
-        ancestors = PersonSet.get_folks(
+        ancestors = PersonSet().get_folks(
             relationship=Relationship.ANCESTORS,
             person_id=decujus if self.decujus < 0 else self.decujus)
         precomputed[self.id] = set( # Do not insert the decujus himself
@@ -263,7 +288,7 @@ class Descendant(RuleChecker):
             raise Exception
 
     def precompute(self, decujus, precomputed):
-        desc = PersonSet.get_folks(
+        desc = PersonSet().get_folks(
             relationship=Relationship.DESCENDANTS,
             person_id=decujus if self.decujus < 0 else self.decujus)
         precomputed[self.id] = set( # Do not insert the decujus himself
@@ -298,14 +323,14 @@ class Implex(RuleChecker):
         """
         count = collections.defaultdict(int)
 
-        ancestors = PersonSet.get_folks(
+        ancestors = PersonSet().get_folks(
             relationship=Relationship.ANCESTORS,
             person_id=decujus if self.decujus < 0 else self.decujus)
         for a in ancestors:
             if a.generation != 0:
                 count[a.main_id] += 1
 
-        desc = PersonSet.get_folks(
+        desc = PersonSet().get_folks(
             relationship=Relationship.DESCENDANTS,
             person_id=decujus if self.decujus < 0 else self.decujus)
         for a in desc:
@@ -1,3 +1,6 @@
+from ..base import fields_getter
+
+
 class Style(object):
     """
     An object that describes drawing styles to apply to GUI objects
@@ -24,21 +27,24 @@ class Style(object):
                 self.stroke == second.stroke and
                 self.fill == second.fill)
 
+    _json_fields = fields_getter('font_weight', 'color', 'stroke', 'fill')
+
     def to_json(self):
         """
         Convert the style to a structure that can be encoded as JSON and then
         used by the GUI.
         """
         # Must match PersonStyle from src/Store/Styles.tsx
+        font_weight, color, stroke, fill = self._json_fields()
         result = {}
-        if self.font_weight:
-            result['fontWeight'] = self.font_weight
-        if self.color:
-            result['color'] = self.color
-        if self.stroke:
-            result['stroke'] = self.stroke
-        if self.fill:
-            result['fill'] = self.fill
+        if font_weight:
+            result['fontWeight'] = font_weight
+        if color:
+            result['color'] = color
+        if stroke:
+            result['stroke'] = stroke
+        if fill:
+            result['fill'] = fill
         return result
 
     def merge(self, second):
@@ -0,0 +1,84 @@
+from django.db import models
+from .base import GeneaProveModel
+from .event import Event
+from .persona import Persona
+from .place import Place
+from .source import Source
+
+
+class Assertion_Index(GeneaProveModel):
+    """
+    One row per assertion (of any kind), with its date and the entities it
+    is about, so that the assertions of a person, a source or a place can be
+    paginated in date order with a range scan on one of the indexes.
+    This table is a cache, computed from the P2E, P2C, P2P and P2G tables
+    (see geneaprove.sql.timeline).
+    A P2P between two different persons has one row for each of them, and
+    the source is only set on the first one, so that it is not counted
+    twice for the source.
+    """
+
+    kind = models.IntegerField(
+        help_text="The table of the assertion, see AssertionIndexSet.KINDS")
+    assertion_id = models.IntegerField(
+        help_text="The id of the assertion in its table")
+    date_sort = models.TextField(
+        null=True, help_text="The date used to sort assertions")
+    person = models.ForeignKey(
+        Persona, db_column="person_main_id", db_index=False,
+        related_name="+", on_delete=models.CASCADE)
+    source = models.ForeignKey(
+        Source, null=True, db_index=False,
+        related_name="+", on_delete=models.CASCADE)
+    place = models.ForeignKey(
+        Place, null=True, db_index=False,
+        related_name="+", on_delete=models.CASCADE)
+    event = models.ForeignKey(
+        Event, null=True, db_index=False,
+        related_name="+", on_delete=models.CASCADE)
+
+    class Meta:
+        """Meta data for the model"""
+        db_table = "assertion_index"
+        indexes = [
+            models.Index(fields=['kind', 'assertion_id'],
+                         name='assertion_index_id'),
+            models.Index(fields=['event'],
+                         name='assertion_index_event'),
+            models.Index(fields=['person', 'date_sort', 'kind',
+                                 'assertion_id'],
+                         name='assertion_index_person'),
+            models.Index(fields=['source', 'date_sort', 'kind',
+                                 'assertion_id'],
+                         name='assertion_index_source'),
+            models.Index(fields=['place', 'date_sort', 'kind',
+                                 'assertion_id'],
+                         name='assertion_index_place'),
+        ]
+
+    def __str__(self):
+        return f'<Assertion_Index {self.kind}:{self.assertion_id}>'
+
+
+class Assertion_Count(GeneaProveModel):
+    """
+    The number of assertions about each person, source and place, so that
+    they do not have to be counted every time a list of assertions is
+    displayed.
+    This table is a cache, computed from assertion_index (see
+    geneaprove.sql.timeline). Objects without assertions have no row.
+    """
+
+    about = models.IntegerField(
+        help_text="What object_id refers to, see AssertionIndexSet.COLUMNS")
+    object_id = models.IntegerField(
+        help_text="The main_id of a person, or the id of a source or place")
+    count = models.IntegerField()
+
+    class Meta:
+        """Meta data for the model"""
+        db_table = "assertion_count"
+        unique_together = (("about", "object_id"), )
+
+    def __str__(self):
+        return f'<Assertion_Count {self.about}:{self.object_id}>'
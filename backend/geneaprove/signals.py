@@ -0,0 +1,271 @@
+"""
+Keeps the tables derived from the assertions (lifespans, parent links,...)
+up-to-date when the assertions are modified one at a time.
+
+Bulk operations (for instance a GEDCOM import, which uses bulk_create) do
+not send signals, or run within `suspended()`, and must call
+`geneaprove.sql.update_derived()` when they are done.
+"""
+
+import contextlib
+import django.db
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models.signals import post_migrate, post_save, post_delete, \
+    pre_save
+from django.dispatch import receiver
+import logging
+import threading
+from . import models
+from .sql import AssertionIndexSet, HigherSourcesCache, LifespanSet, \
+    ParentLinkSet, PersonSummarySet, SearchIndexSet
+from .sql.graph import FamilyGraph
+from .sql.derived import update_derived, update_parent_links
+
+logger = logging.getLogger(__name__)
+
+
+_state = threading.local()
+
+
+@contextlib.contextmanager
+def suspended():
+    """
+    Ignore the changes to the assertions made in this thread, within this
+    context, instead of updating the derived tables for each of them. The
+    caller must then call `update_derived()`, which is much faster than
+    the incremental updates when many objects are created.
+    """
+    depth = getattr(_state, 'suspended', 0)
+    _state.suspended = depth + 1
+    try:
+        yield
+    finally:
+        _state.suspended = depth
+        if not depth:
+            # Not derived tables, but caches invalidated by the receivers
+            HigherSourcesCache.touch()
+
+
+def _is_suspended():
+    return getattr(_state, 'suspended', 0) > 0
+
+
+def _main_ids(person_ids):
+    return set(
+        models.Persona.objects
+        .filter(id__in=person_ids)
+        .values_list('main_id', flat=True))
+
+
+@receiver(post_save, sender=models.P2E)
+@receiver(post_delete, sender=models.P2E)
+@receiver(post_save, sender=models.P2C)
+@receiver(post_delete, sender=models.P2C)
+@receiver(post_save, sender=models.P2P)
+@receiver(post_delete, sender=models.P2P)
+@receiver(post_save, sender=models.P2G)
+@receiver(post_delete, sender=models.P2G)
+def assertion_changed(sender, instance, **kwargs):
+    """An assertion was created, modified or deleted"""
+    if _is_suspended():
+        return
+    AssertionIndexSet().update_assertions(sender, [instance.id])
+
+
+@receiver(pre_save, sender=models.P2E)
+def p2e_saving(sender, instance, **kwargs):
+    """
+    Remember the person and event the assertion was about, see p2e_changed
+    """
+    if _is_suspended() or instance.pk is None:
+        return
+    instance._previous = models.P2E.objects \
+        .filter(id=instance.pk) \
+        .values_list('person_id', 'event_id').first()
+
+
+@receiver(post_save, sender=models.P2E)
+@receiver(post_delete, sender=models.P2E)
+def p2e_changed(sender, instance, **kwargs):
+    """
+    A person-to-event assertion was created, modified or deleted. When it
+    was moved to another person or event, both the old and the new ones are
+    updated.
+    """
+    if _is_suspended():
+        return
+    person_ids = {instance.person_id}
+    event_ids = {instance.event_id}
+    previous = getattr(instance, '_previous', None)
+    if previous is not None:
+        person_ids.add(previous[0])
+        event_ids.add(previous[1])
+
+    main_ids = _main_ids(person_ids)
+    LifespanSet().update(main_ids)
+    PersonSummarySet().update(main_ids)
+
+    event_types = set(
+        models.Event.objects
+        .filter(id__in=event_ids)
+        .values_list('type_id', flat=True))
+
+    # If this is a birth event, recompute the parents of the children (and
+    # of the persons of the assertion, who might have been the child)
+    if models.Event_Type.PK_birth in event_types:
+        children = set(
+            models.Persona.objects
+            .filter(events__event_id__in=event_ids,
+                    events__event__type_id=models.Event_Type.PK_birth,
+                    events__role_id=models.Event_Type_Role.PK_principal)
+            .values_list('main_id', flat=True))
+        children.update(main_ids)
+        update_parent_links(children)
+
+    # Spouses are read from the marriage events
+    if models.Event_Type.PK_marriage in event_types:
+        FamilyGraph.touch()
+
+
+@receiver(post_save, sender=models.P2C)
+@receiver(post_delete, sender=models.P2C)
+def p2c_changed(sender, instance, **kwargs):
+    """The sex or the names of a person might have changed"""
+    if _is_suspended():
+        return
+    main_ids = _main_ids([instance.person_id])
+    ParentLinkSet().update_sex(main_ids)
+    PersonSummarySet().update(main_ids)
+    SearchIndexSet().update(main_ids)
+
+
+@receiver(post_save, sender=models.Characteristic_Part)
+@receiver(post_delete, sender=models.Characteristic_Part)
+def characteristic_part_changed(sender, instance, **kwargs):
+    """The sex or the names of a person might have changed"""
+    if _is_suspended():
+        return
+    main_ids = set(
+        models.Persona.objects
+        .filter(p2c__characteristic_id=instance.characteristic_id)
+        .values_list('main_id', flat=True))
+    ParentLinkSet().update_sex(main_ids)
+    PersonSummarySet().update(main_ids)
+    SearchIndexSet().update(main_ids)
+
+
+@receiver(pre_save, sender=models.Persona)
+def persona_saving(sender, instance, **kwargs):
+    """Remember the person the persona belonged to, see persona_changed"""
+    if _is_suspended() or instance.pk is None:
+        return
+    instance._previous_main_id = models.Persona.objects \
+        .filter(id=instance.pk) \
+        .values_list('main_id', flat=True).first()
+
+
+@receiver(post_save, sender=models.Persona)
+@receiver(post_delete, sender=models.Persona)
+def persona_changed(sender, instance, **kwargs):
+    """
+    The name or the number of personas of a person might have changed, as
+    well as the person its assertions belong to. When the persona was moved
+    to another person, both persons are updated.
+    """
+    if _is_suspended():
+        return
+    main_ids = {instance.main_id, getattr(instance, '_previous_main_id', None)}
+    PersonSummarySet().update(main_ids)
+    AssertionIndexSet().update(main_ids)
+    SearchIndexSet().update(main_ids)
+
+
+@receiver(post_save, sender=models.Place)
+@receiver(post_delete, sender=models.Place)
+def place_changed(sender, instance, **kwargs):
+    """The name of a place might have changed"""
+    if _is_suspended():
+        return
+    SearchIndexSet().update_places([instance.id])
+
+
+@receiver(post_save, sender=models.Place_Part)
+@receiver(post_delete, sender=models.Place_Part)
+def place_part_changed(sender, instance, **kwargs):
+    """The name of a place might have changed"""
+    if _is_suspended():
+        return
+    SearchIndexSet().update_places([instance.place_id])
+
+
+@receiver(post_save, sender=models.Source)
+@receiver(post_delete, sender=models.Source)
+def source_changed(sender, instance, **kwargs):
+    """The title or the higher source of a source might have changed"""
+    if _is_suspended():
+        return
+    SearchIndexSet().update_sources([instance.id])
+    HigherSourcesCache.touch()
+
+
+@receiver(post_save, sender=models.Citation_Part)
+@receiver(post_delete, sender=models.Citation_Part)
+def citation_part_changed(sender, instance, **kwargs):
+    """The parts inherited by lower sources have changed"""
+    if _is_suspended():
+        return
+    HigherSourcesCache.touch()
+
+
+@receiver(post_save, sender=models.Event)
+def event_changed(sender, instance, created, **kwargs):
+    """The date or the place of an event might have changed"""
+    if _is_suspended():
+        return
+    if not created:   # new events have no participant yet
+        main_ids = set(
+            models.Persona.objects
+            .filter(events__event_id=instance.id)
+            .values_list('main_id', flat=True))
+        LifespanSet().update(main_ids)
+        PersonSummarySet().update(main_ids)
+        AssertionIndexSet().update_events([instance.id])
+
+
+@receiver(post_save, sender=models.Characteristic)
+def characteristic_changed(sender, instance, created, **kwargs):
+    """The date or place of a characteristic might have changed"""
+    if _is_suspended():
+        return
+    if not created:   # new characteristics have no assertion yet
+        AssertionIndexSet().update_characteristics([instance.id])
+
+
+@receiver(post_migrate)
+def migrated(sender, app_config, using, plan=None, **kwargs):
+    """
+    Compute the derived tables created by the migrations that were just
+    applied (see the `derived_tables` attribute of these migrations).
+    Migrations cannot do it themselves, since the queries that compute
+    these tables are written for the latest schema.
+    """
+    if app_config.name != 'geneaprove' or not plan:
+        return
+
+    tables = set()
+    for migration, backward in plan:
+        if not backward:
+            tables.update(getattr(migration, 'derived_tables', ()))
+    if not tables:
+        return
+
+    connection = django.db.connections[using]
+    executor = MigrationExecutor(connection)
+    if executor.migration_plan(executor.loader.graph.leaf_nodes()):
+        logger.warning(
+            'Not all migrations are applied, run "./manage.py rebuild %s"'
+            ' once they are', ' '.join(sorted(tables)))
+        return
+
+    logger.info('compute derived tables %s', ', '.join(sorted(tables)))
+    update_derived(tables=tables)
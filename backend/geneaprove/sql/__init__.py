@@ -3,6 +3,15 @@ High-level SQL queries
 """
 
 from .asserts import AssertList
-from .personas import PersonSet, Relationship
+from .closure import AncestorClosureSet
+from .graph import FamilyGraph, global_graph
+from .lifespans import LifespanSet
+from .parents import ParentLinkSet
+from .personas import PersonRow, PersonSet, Relationship
 from .places import PlaceSet
-from .sources import SourceSet
\ No newline at end of file
+from .search import SearchIndexSet
+from .sqlsets import Invalid_Cursor
+from .sources import HigherSourcesCache, SourceSet
+from .summary import PersonSummarySet
+from .timeline import AssertionIndexSet
+from .derived import update_derived
@@ -6,10 +6,11 @@ client.
 
 import collections
 from django.conf import settings
-from django.db.models import F, Q, Value, IntegerField, TextField
 from geneaprove import models
 import logging
+from .loader import Loader
 from .sqlsets import SQLSet
+from .timeline import AssertionIndexSet
 
 
 logger = logging.getLogger('geneaprove.related')
@@ -30,6 +31,7 @@ class AssertList(SQLSet):
         self._missing_places = set()   # list of ids
         self._missing_sources = set()  # list of ids
         self._missing_events = set()   # list of ids
+        self._loader = Loader()        # all objects loaded for the asserts
 
     def __iter__(self):
         return iter(self.asserts)
@@ -60,6 +62,8 @@ class AssertList(SQLSet):
         self._known_persons.update(persons)
         self._known_places.update(places)
         self._known_sources.update(sources)
+        for known in (events, persons, places, sources):
+            self._loader.add(known)
 
     def add_missing(self, *, persons=[], places=[], sources=[], events=[]):
         """
@@ -84,82 +88,61 @@ class AssertList(SQLSet):
         self._missing_places.update(places)
         self._missing_sources.update(sources)
 
-    def fetch_asserts_subset(self, tables, offset=None, limit=None):
+    def fetch_asserts_subset(self, about, ids, offset=None, limit=None):
         """
-        Fetch a subset of assertions.
-        :param list tables:
-            The list of tables that should be queried, as ini
-               [models.P2E.objects.filter(...),
-                models.P2C.objects.filter(...)]
+        Fetch a subset of the assertions about persons, sources or places,
+        sorted by date.
+        :param str about: "person", "source" or "place"
+        :param ids: the main_id of the persons, or the ids of the sources
+           or places.
         """
-        pm = None
-        for idx, queryset in enumerate(tables):
-            # ??? Should we use a dispatching operation
-            if queryset.model == models.P2E:
-                date = F('event__date_sort')
-            elif queryset.model == models.P2C:
-                date = F('characteristic__date_sort')
-            elif queryset.model == models.P2P:
-                date = Value("", TextField())
-            elif queryset.model == models.P2G:
-                date = Value("", TextField())
-            else:
-                raise Exception('Unknown queryset %s' % queryset)
-
-            a = queryset \
-                .values('id') \
-                .annotate(kind=Value(idx, IntegerField()), date_sort=date)
-            pm = a if pm is None else pm.union(a)
-
-        pm = pm.order_by('date_sort')
-        pm = self.limit_offset(pm, offset=offset, limit=limit)
-
-        asserts = list(pm)
+        asserts = AssertionIndexSet().get_page(
+            about, ids, offset=offset, limit=limit)
         result = [None] * len(asserts)
 
-        for kind, queryset in enumerate(tables):
-            ids = [a['id'] for a in asserts if a['kind'] == kind]
-            if ids:
-                # Memorize the sort order, because the next query (using "IN")
-                # will not preserve it.
-                order = {a['id']: idx
-                         for idx, a in enumerate(asserts)
-                         if a['kind'] == kind}
-                prefetch = queryset.model.related_json_fields()
-                for chunk in self.sqlin(queryset.model.objects, id__in=ids):
-                    for c in self.prefetch_related(chunk, *prefetch):
-                        result[order[c.id]] = c
-
-        # result.sort(key=lambda a: order[a.id])
+        for kind in range(len(AssertionIndexSet.KINDS)):
+            model = AssertionIndexSet.model(kind)
+
+            # Memorize the sort order, because the next query (using "IN")
+            # will not preserve it.
+            order = {id: idx
+                     for idx, (m, id) in enumerate(asserts)
+                     if m == model}
+            if order:
+                rows = self.sqlin(model.objects, id__in=order.keys()) \
+                    .select_related(*model.related_json_fields())
+                for c in rows:
+                    result[order[c.id]] = c
+
         self.asserts.extend(result)
 
     def to_json(self):
         """
         Convert to JSON, after fetching related entities. The result also
-        includes entities given to `set_known`
+        includes entities given to `set_known`.
+        All the objects needed to convert the asserts are fetched with one
+        query per table, so that the to_json methods of the asserts do not
+        need to query the database.
         """
         logger.debug('fetching related entities')
 
+        by_model = collections.defaultdict(list)
+        for a in self.asserts:
+            by_model[type(a)].append(a)
+        for model, asserts in by_model.items():
+            self._loader.prefetch_related(
+                asserts, *model.related_json_fields())
+
         for a in self.asserts:
             a.getRelatedIds(into=self)
 
-        def _fetch(queryset, missing, known):
+        def _fetch(model, missing, known):
             missing.difference_update(a.id for a in known)
-            if not missing:
-                return known
-            result = [row
-                    for chunk in self.sqlin(queryset.objects, id__in=missing)
-                    for row in chunk]
+            result = list(self._loader.get(model, missing).values())
             result.extend(known)
             return result
 
-        # as part of converting the P2C to json, we will need to know the
-        # parts, so fetch them now.
-        self.prefetch_related(
-            [a for a in self.asserts if isinstance(a, models.P2C)],
-            'characteristic__parts')
-
-        return {
+        result = {
             'asserts': self.asserts,
             'events': _fetch(
                 models.Event, self._missing_events, self._known_events),
@@ -170,3 +153,14 @@ class AssertList(SQLSet):
             'sources': _fetch(
                 models.Source, self._missing_sources, self._known_sources),
         }
+
+        # The sources are already known, and are needed for the
+        # representations of the P2C
+        self._loader.prefetch_related(self.asserts, 'source')
+
+        p2c = by_model[models.P2C]
+        self._loader.prefetch_related(p2c, 'characteristic__parts')
+        self._loader.prefetch_related(
+            [a.source for a in p2c if a.has_image()], 'representations')
+
+        return result
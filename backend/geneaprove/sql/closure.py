@@ -0,0 +1,195 @@
+"""
+Maintains the ancestor_closure table, all ancestors of all persons
+"""
+
+import django.db
+from django.conf import settings
+import logging
+from .. import models
+from .parents import MAX_DEPTH
+from .sqlsets import SQLSet
+
+logger = logging.getLogger(__name__)
+
+# The direct parents, ignoring the role
+LINKS = "(SELECT DISTINCT parent_main_id, child_main_id FROM parent_link)"
+
+
+class AncestorClosureSet(SQLSet):
+    """
+    Computes the ancestor_closure table from the parent_link table.
+
+    When a link is added (or removed) between a parent P and a child C, every
+    ancestor A of P (at generation ga, via na paths, including P itself) and
+    every descendant D of C (at gd, via nd paths, including C itself) gain
+    (or lose) na * nd paths at generation ga + gd + 1. This only holds when
+    the link is not part of a cycle, so we recompute the whole table in such
+    a case (cycles only occur in case of errors in the database).
+    """
+
+    @staticmethod
+    def enabled():
+        """Whether the closure table should be used and maintained"""
+        return getattr(settings, 'GENEAPROVE_ANCESTOR_CLOSURE', False)
+
+    def update(self, main_ids=None):
+        """
+        Recompute the whole table. This could take a while on large
+        databases. `main_ids` is ignored, since the ancestors of these persons
+        are also the ancestors of all their descendants.
+        """
+        logger.debug('rebuild ancestor_closure')
+
+        with django.db.transaction.atomic():
+            with django.db.connection.cursor() as cur:
+                cur.execute("DELETE FROM ancestor_closure")
+                if not self.enabled():
+                    return
+
+                cur.execute("DROP TABLE IF EXISTS closure_frontier")
+                cur.execute(
+                    "CREATE TEMPORARY TABLE closure_frontier AS "
+                    "SELECT parent_main_id AS ancestor_main_id, "
+                    "child_main_id AS descendant_main_id, "
+                    "1 AS path_count "
+                    f"FROM {LINKS} links")
+
+                for generation in range(1, MAX_DEPTH + 1):
+                    cur.execute(
+                        "INSERT INTO ancestor_closure "
+                        "(ancestor_main_id, descendant_main_id, generation, "
+                        "path_count) "
+                        "SELECT ancestor_main_id, descendant_main_id, "
+                        f"{generation}, path_count FROM closure_frontier")
+                    if cur.rowcount == 0:
+                        break
+
+                    cur.execute(
+                        "CREATE TEMPORARY TABLE closure_next AS "
+                        "SELECT links.parent_main_id AS ancestor_main_id, "
+                        "f.descendant_main_id, "
+                        "SUM(f.path_count) AS path_count "
+                        f"FROM closure_frontier f, {LINKS} links "
+                        "WHERE links.child_main_id=f.ancestor_main_id "
+                        "GROUP BY links.parent_main_id, f.descendant_main_id")
+                    cur.execute("DROP TABLE closure_frontier")
+                    cur.execute(
+                        "ALTER TABLE closure_next RENAME TO closure_frontier")
+
+                cur.execute("DROP TABLE closure_frontier")
+
+    def apply(self, removed, added):
+        """
+        Update the table after some parent links were removed or added.
+        :param removed: a set of (child, parent) main_ids
+        :param added: a set of (child, parent) main_ids
+        """
+        if not self.enabled() or (not removed and not added):
+            return
+
+        with django.db.transaction.atomic():
+            with django.db.connection.cursor() as cur:
+                for child, parent in removed:
+                    if self._in_cycle(cur, child, parent):
+                        break
+                    self._remove_paths(cur, child, parent)
+                else:
+                    for child, parent in added:
+                        if self._in_cycle(cur, child, parent):
+                            break
+                        self._add_paths(cur, child, parent)
+                    else:
+                        return
+
+            self.update()
+
+    def _in_cycle(self, cur, child, parent):
+        """Whether the link child->parent would be part of a cycle"""
+        if child == parent:
+            return True
+        cur.execute(
+            "SELECT 1 FROM ancestor_closure "
+            "WHERE ancestor_main_id=%s AND descendant_main_id=%s LIMIT 1",
+            [child, parent])
+        return len(cur.fetchall()) != 0
+
+    def _paths(self, cur, child, parent):
+        """
+        All the paths going through the link child->parent, as a list
+        of (ancestor, descendant, generation, path_count)
+        """
+        cur.execute(
+            "WITH up(main_id, generation, path_count) AS ("
+                f"SELECT {parent:d}, 0, 1 "
+                "UNION ALL "
+                "SELECT ancestor_main_id, generation, path_count "
+                "FROM ancestor_closure "
+                f"WHERE descendant_main_id={parent:d}"
+            "), down(main_id, generation, path_count) AS ("
+                f"SELECT {child:d}, 0, 1 "
+                "UNION ALL "
+                "SELECT descendant_main_id, generation, path_count "
+                "FROM ancestor_closure "
+                f"WHERE ancestor_main_id={child:d}"
+            ") SELECT up.main_id, down.main_id, "
+            "up.generation + down.generation + 1, "
+            "SUM(up.path_count * down.path_count) "
+            "FROM up, down "
+            f"WHERE up.generation + down.generation < {MAX_DEPTH} "
+            "GROUP BY up.main_id, down.main_id, "
+            "up.generation + down.generation + 1")
+        return cur.fetchall()
+
+    def _add_paths(self, cur, child, parent):
+        cur.executemany(
+            "INSERT INTO ancestor_closure "
+            "(ancestor_main_id, descendant_main_id, generation, path_count) "
+            "VALUES (%s, %s, %s, %s) "
+            "ON CONFLICT (ancestor_main_id, descendant_main_id, generation) "
+            "DO UPDATE SET path_count="
+            "ancestor_closure.path_count + excluded.path_count",
+            self._paths(cur, child, parent))
+
+    def _remove_paths(self, cur, child, parent):
+        paths = self._paths(cur, child, parent)
+        cur.executemany(
+            "UPDATE ancestor_closure SET path_count=path_count - %s "
+            "WHERE ancestor_main_id=%s AND descendant_main_id=%s "
+            "AND generation=%s",
+            [(count, a, d, g) for a, d, g, count in paths])
+        cur.executemany(
+            "DELETE FROM ancestor_closure "
+            "WHERE ancestor_main_id=%s AND descendant_main_id=%s "
+            "AND generation=%s AND path_count<=0",
+            [(a, d, g) for a, d, g, count in paths])
+
+    def get_ancestors(self, main_id, max_depth=None):
+        """
+        All ancestors of main_id, up to max_depth generations.
+        :returntype: list of (main_id, generation, path_count)
+        """
+        return self._get(
+            'ancestor_main_id', 'descendant_main_id', main_id, max_depth)
+
+    def get_descendants(self, main_id, max_depth=None):
+        """
+        All descendants of main_id, up to max_depth generations.
+        :returntype: list of (main_id, generation, path_count)
+        """
+        return self._get(
+            'descendant_main_id', 'ancestor_main_id', main_id, max_depth)
+
+    def _get(self, select, where, main_id, max_depth):
+        with django.db.connection.cursor() as cur:
+            cur.execute(
+                f"SELECT {select}, generation, path_count "
+                "FROM ancestor_closure "
+                f"WHERE {where}=%s AND generation<=%s "
+                "ORDER BY generation",
+                [main_id, max_depth or MAX_DEPTH])
+            return cur.fetchall()
+
+    def is_ancestor(self, ancestor, descendant):
+        """Whether `ancestor` is an ancestor of `descendant`"""
+        return models.Ancestor_Closure.objects.filter(
+            ancestor_id=ancestor, descendant_id=descendant).exists()
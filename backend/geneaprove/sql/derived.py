@@ -0,0 +1,57 @@
+"""
+Tables derived from the assertions, and stored in the database for
+efficiency.
+"""
+
+from .closure import AncestorClosureSet
+from .graph import FamilyGraph
+from .lifespans import LifespanSet
+from .parents import ParentLinkSet
+from .search import SearchIndexSet
+from .summary import PersonSummarySet
+from .timeline import AssertionIndexSet
+
+# The derived tables, in the order they must be computed
+TABLES = {
+    'lifespan': LifespanSet,
+    'parent_link': ParentLinkSet,
+    'ancestor_closure': AncestorClosureSet,
+    'search_index': SearchIndexSet,
+    'person_summary': PersonSummarySet,
+    'assertion_index': AssertionIndexSet,
+}
+
+
+def update_derived(main_ids=None, tables=None):
+    """
+    Recompute the derived tables for the given persons, or for the whole
+    database if `main_ids` is None. This must be called after bulk changes
+    to the database (imports, main_id changes,...) since these do not
+    send the signals used for incremental updates.
+
+    :param tables: the names of the tables to recompute (see TABLES), or
+       None to recompute all of them.
+    """
+    for name, table in TABLES.items():
+        if tables is not None and name not in tables:
+            continue
+
+        if name == 'parent_link' and main_ids is not None:
+            update_parent_links(main_ids)
+        elif name == 'ancestor_closure' and main_ids is not None:
+            pass  # done as part of the parent_link update
+        else:
+            table().update(main_ids)
+
+    FamilyGraph.touch()
+
+
+def update_parent_links(main_ids):
+    """
+    Recompute the parents of the given persons, and update the tables
+    that depend on them
+    """
+    removed, added = ParentLinkSet().update(main_ids)
+    AncestorClosureSet().apply(removed, added)
+    if removed or added:
+        FamilyGraph.touch()
@@ -0,0 +1,547 @@
+"""
+An in-memory representation of the family relationships (parents, children
+and spouses) of all persons in the database.
+"""
+
+from array import array
+import collections
+import django.db
+import logging
+import math
+import threading
+from .. import models
+from .parents import MAX_DEPTH
+
+logger = logging.getLogger(__name__)
+
+Relation = collections.namedtuple(
+    'Relation', 'gen1 gen2 ancestors paths others', defaults=((), ))
+
+
+class _Adjacency(object):
+    """
+    Compressed sparse rows: the neighbors of node `i` are
+    targets[offsets[i]:offsets[i + 1]], and each of them has an associated
+    value in `data` (for instance the role of a parent).
+    """
+
+    __slots__ = ("offsets", "targets", "data")
+
+    def __init__(self, count, edges):
+        """
+        :param int count: the number of nodes
+        :param edges: a list of (from, to, data) tuples, where from and to
+           are node indexes
+        """
+        edges.sort()
+        self.offsets = array('l', [0] * (count + 1))
+        self.targets = array('l', (e[1] for e in edges))
+        self.data = array('l', (e[2] for e in edges))
+
+        for e in edges:
+            self.offsets[e[0] + 1] += 1
+        for i in range(count):
+            self.offsets[i + 1] += self.offsets[i]
+
+    def neighbors(self, index):
+        return self.targets[self.offsets[index]:self.offsets[index + 1]]
+
+    def neighbors_data(self, index):
+        s = slice(self.offsets[index], self.offsets[index + 1])
+        return zip(self.targets[s], self.data[s])
+
+
+class FamilyGraph(object):
+    """
+    The graph of all persons (by main_id) and their relationships. It is
+    loaded lazily, in one query, the first time it is needed, and then
+    reloaded whenever the "family" change counter is incremented in the
+    database (see `touch()`), possibly from another process.
+
+    Persons are stored in contiguous arrays and referenced by their index in
+    these arrays; only persons that have at least one relationship are
+    stored.
+    """
+
+    COUNTER = "family"
+
+    CACHE_SIZE = 32
+    # Number of results of get_implex and get_cycles kept in memory
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._cache = collections.OrderedDict()   # see _cached()
+        self.ids = array('l')     # index -> main_id
+        self.index = {}           # main_id -> index
+        self.parents = _Adjacency(0, [])    # data is the role
+        self.children = _Adjacency(0, [])   # data is the role of the parent
+        self.spouses = _Adjacency(0, [])
+
+    @staticmethod
+    def touch():
+        """
+        Invalidate all in-memory graphs, in all processes, after a change to
+        the relationships.
+        """
+        models.Change_Counter.increment(FamilyGraph.COUNTER)
+
+    def invalidate(self):
+        """
+        Reload the graph the next time it is used, in this process only.
+        This is needed when the database was changed without going through
+        `touch`, for instance when a transaction was rolled back.
+        """
+        self._version = None
+
+    def update_if_needed(self):
+        """
+        Reload the graph if the database has changed since it was last
+        loaded
+        """
+        version = models.Change_Counter.get(FamilyGraph.COUNTER)
+
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._load()
+                    self._version = version
+
+    def _load(self):
+        logger.debug('loading family graph')
+
+        with django.db.connection.cursor() as cur:
+            cur.execute(
+                "SELECT 0, child_main_id, parent_main_id, role_id "
+                "FROM parent_link "
+                "UNION ALL "
+                "SELECT 1, a.main_id, b.main_id, 0 "
+                "FROM event, p2e pa, p2e pb, persona a, persona b "
+                f"WHERE event.type_id={models.Event_Type.PK_marriage} "
+                "AND pa.event_id=event.id "
+                "AND pb.event_id=event.id "
+                f"AND pa.role_id={models.Event_Type_Role.PK_principal} "
+                f"AND pb.role_id={models.Event_Type_Role.PK_principal} "
+                "AND NOT pa.disproved "
+                "AND NOT pb.disproved "
+                "AND pa.person_id=a.id "
+                "AND pb.person_id=b.id "
+                "AND a.main_id<>b.main_id")
+            rows = cur.fetchall()
+
+        self._build(rows)
+
+    def _build(self, rows):
+        """
+        :param rows: a list of (kind, p1, p2, role), where kind is 0 when p2
+           is a parent of p1 (with the given role), and 1 when they are
+           spouses.
+        """
+        index = {}
+        ids = array('l')
+        for kind, p1, p2, role in rows:
+            for main_id in (p1, p2):
+                if main_id not in index:
+                    index[main_id] = len(ids)
+                    ids.append(main_id)
+
+        parents = set()
+        spouses = set()
+        for kind, p1, p2, role in rows:
+            if kind == 0:
+                parents.add((index[p1], index[p2], role))
+            else:
+                spouses.add((index[p1], index[p2], 0))
+
+        # Assign all at once, other threads might be reading the graph
+        (self.ids, self.index, self.parents, self.children, self.spouses,
+         self._cache) = (
+            ids, index,
+            _Adjacency(len(ids), list(parents)),
+            _Adjacency(len(ids), [(p, c, r) for c, p, r in parents]),
+            _Adjacency(len(ids), list(spouses)),
+            collections.OrderedDict())
+
+    def _related(self, adjacency, main_id):
+        idx = self.index.get(main_id)
+        if idx is None:
+            return []
+        return sorted(set(self.ids[i] for i in adjacency.neighbors(idx)))
+
+    def get_parents(self, main_id):
+        """The main_id of the parents of `main_id`"""
+        return self._related(self.parents, main_id)
+
+    def get_children(self, main_id):
+        """The main_id of the children of `main_id`"""
+        return self._related(self.children, main_id)
+
+    def get_spouses(self, main_id):
+        """The main_id of the spouses of `main_id`"""
+        return self._related(self.spouses, main_id)
+
+    def get_parents_with_role(self, main_id):
+        """
+        The parents of `main_id`
+        :returntype: list of (main_id, role_id)
+        """
+        idx = self.index.get(main_id)
+        if idx is None:
+            return []
+        return [(self.ids[i], role)
+                for i, role in self.parents.neighbors_data(idx)]
+
+    def get_folks(self, group, main_id, max_depth=None, skip=0):
+        """
+        Same as PersonSet.get_folks, but computed in memory.
+        :param str group: either "parents" or "children"
+        :returntype: list of (main_id, generation, folks) tuples, where folks
+           is the list of parents or children of main_id.
+        """
+        adjacency = getattr(self, group)
+        depth = max_depth or MAX_DEPTH
+        ids = self.ids
+
+        start = self.index.get(main_id)
+        if start is None:
+            return [] if skip else [(main_id, 0, [])]
+
+        result = []
+        generation = 0
+        frontier = [start]
+        while frontier:
+            if not skip or generation > skip:
+                for idx in frontier:
+                    result.append(
+                        (ids[idx], generation,
+                         [ids[i] for i in adjacency.neighbors(idx)]))
+
+            if generation > depth:
+                break
+
+            # A person can be reached through several paths, but is only
+            # returned once per generation
+            seen = set()
+            next_frontier = []
+            for idx in frontier:
+                for i in adjacency.neighbors(idx):
+                    if i not in seen:
+                        seen.add(i)
+                        next_frontier.append(i)
+
+            frontier = next_frontier
+            generation += 1
+
+        return result
+
+    def get_kin(self, main_id, max_depth):
+        """
+        The relatives of `main_id`, following parents, children and spouses
+        links, up to `max_depth` links away (a sibling is two links away,
+        through a parent). Each person is returned once, with the length of
+        the shortest chain of links.
+        :returntype: dict of main_id -> distance, in order of distance.
+           This includes main_id itself, at distance 0.
+        """
+        start = self.index.get(main_id)
+        if start is None:
+            return {main_id: 0}
+
+        adjacencies = (self.parents, self.children, self.spouses)
+        distances = {start: 0}
+        frontier = [start]
+        distance = 0
+        while frontier and distance < max_depth:
+            distance += 1
+            next_frontier = []
+            for idx in frontier:
+                for adjacency in adjacencies:
+                    for i in adjacency.neighbors(idx):
+                        if i not in distances:
+                            distances[i] = distance
+                            next_frontier.append(i)
+            frontier = next_frontier
+
+        return {self.ids[idx]: d for idx, d in distances.items()}
+
+    def _cached(self, key, compute):
+        """
+        The result of `compute()`, which is kept until the graph is
+        reloaded. Only the CACHE_SIZE most recent results are kept.
+        """
+        result = self._cache.get(key)
+        if result is None:
+            result = compute()
+            self._cache[key] = result
+            while len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+    def get_cycles(self, main_id):
+        """
+        The parent links that make an ancestor of `main_id` their own
+        ancestor, which can only come from errors in the database.
+        Following them would give an infinite number of Sosa numbers to all
+        the ancestors in the cycle, so they are ignored by `get_implex` and
+        `get_sosa`.
+        :returntype: sorted list of (child, parent) main_id tuples
+        """
+        ids = self.ids
+        return sorted((ids[c], ids[p]) for c, p in self._cycles(main_id))
+
+    def _cycles(self, main_id):
+        return self._cached(
+            ('cycles', main_id), lambda: self._compute_cycles(main_id))
+
+    def _compute_cycles(self, main_id):
+        # A depth-first search over the ancestors: a link to a person that
+        # is still on the current path closes a cycle.
+        start = self.index.get(main_id)
+        if start is None:
+            return frozenset()
+
+        cycles = set()
+        on_path = {start}
+        done = set()
+        stack = [(start, iter(self.parents.neighbors(start)))]
+        while stack:
+            idx, parents = stack[-1]
+            for parent in parents:
+                if parent in on_path:
+                    cycles.add((idx, parent))
+                elif parent not in done:
+                    on_path.add(parent)
+                    stack.append(
+                        (parent, iter(self.parents.neighbors(parent))))
+                    break
+            else:
+                stack.pop()
+                on_path.discard(idx)
+                done.add(idx)
+
+        if cycles:
+            logger.warning(
+                'ancestors of %s: ignoring the parent links that create'
+                ' cycles (child, parent): %s',
+                main_id,
+                sorted((self.ids[c], self.ids[p]) for c, p in cycles))
+        return frozenset(cycles)
+
+    def get_implex(self, main_id, max_depth=None):
+        """
+        The number of Sosa numbers of each ancestor of `main_id`, i.e. the
+        number of distinct paths from `main_id` to that ancestor. This is
+        more than one in case of implex (pedigree collapse).
+        This is computed one generation at a time, by adding the number of
+        paths of the children, so each (ancestor, generation) pair is only
+        looked at once, whatever the number of paths. The result is kept
+        until the graph is reloaded.
+        :returntype: dict of main_id -> number of Sosa numbers. The decujus
+           itself is included (with one Sosa number).
+        """
+        depth = max_depth or MAX_DEPTH
+        return self._cached(
+            ('implex', main_id, depth),
+            lambda: self._compute_implex(main_id, depth))
+
+    def _compute_implex(self, main_id, depth):
+        start = self.index.get(main_id)
+        if start is None:
+            return {main_id: 1}
+
+        cycles = self._cycles(main_id)
+        counts = {}
+        frontier = {start: 1}
+        generation = 0
+        while frontier and generation <= depth:
+            next_frontier = {}
+            for idx, count in frontier.items():
+                counts[idx] = counts.get(idx, 0) + count
+                for parent in self.parents.neighbors(idx):
+                    if (idx, parent) not in cycles:
+                        next_frontier[parent] = \
+                            next_frontier.get(parent, 0) + count
+            frontier = next_frontier
+            generation += 1
+
+        return {self.ids[idx]: count for idx, count in counts.items()}
+
+    def get_sosa(self, main_id, first=1, last=None, max_depth=None):
+        """
+        The ancestors of `main_id` with their Sosa (Ahnentafel) number: the
+        decujus is 1, and the father and mother of `n` are `2n` and `2n+1`.
+        A person appears once for each of their Sosa numbers (implex). If
+        the database knows several fathers (or mothers) for a person, they
+        all get the same number.
+
+        Only the numbers between `first` and `last` (included) are returned.
+        Branches that cannot lead to these numbers are not looked at, so the
+        cost depends on the size of the result, not on the size of the tree.
+        Parent links that create cycles are ignored (see `get_cycles`).
+        :returntype: list of (sosa, main_id), sorted by Sosa number
+        """
+        depth = max_depth or MAX_DEPTH
+        if last is None:
+            last = (2 << depth) - 1
+        first = max(1, first)
+        if last < first:
+            return []
+
+        def _useful(sosa):
+            # Whether sosa, or one of the numbers of its ancestors, is in
+            # the range. The ancestors of sosa at d generations are numbered
+            # from sosa << d to ((sosa + 1) << d) - 1
+            for d in range(max(0, first.bit_length() - sosa.bit_length()),
+                           last.bit_length() - sosa.bit_length() + 1):
+                if (sosa << d) <= last and ((sosa + 1) << d) - 1 >= first:
+                    return True
+            return False
+
+        start = self.index.get(main_id)
+        if start is None:
+            return [(1, main_id)] if first == 1 else []
+
+        cycles = self._cycles(main_id)
+        father = models.Event_Type_Role.PK_birth__father
+        result = []
+        generation = 0
+        frontier = [(1, start)]
+        while frontier and generation <= depth:
+            next_frontier = []
+            for sosa, idx in frontier:
+                if sosa >= first:
+                    result.append((sosa, self.ids[idx]))
+                for parent, role in self.parents.neighbors_data(idx):
+                    if (idx, parent) in cycles:
+                        continue
+                    n = 2 * sosa if role == father else 2 * sosa + 1
+                    if first <= n <= last or _useful(n):
+                        next_frontier.append((n, parent))
+            frontier = next_frontier
+            generation += 1
+
+        result.sort()
+        return result
+
+    def get_relation(self, main_id1, main_id2, max_depth=None, max_paths=50):
+        """
+        How two persons are related by blood: their nearest common
+        ancestors, and all the shortest paths through them.
+
+        This is a bidirectional breadth-first search: the ancestors of both
+        persons are explored one generation at a time, always extending the
+        search that is the least advanced (or has the smallest frontier),
+        and it stops as soon as no unexplored ancestor could give a shorter
+        (or equally short) path.
+
+        :param max_paths: maximum number of paths returned, since implex
+           can make their number very large.
+        :returntype: None if the persons have no common ancestor, or a
+           Relation. `gen1` and `gen2` are the number of generations between
+           each person and their nearest common ancestors (0 if the person
+           is the common ancestor). Each path is a list of main_id, going up
+           from main_id1 to a common ancestor and then down to main_id2.
+           Common ancestors at the same total distance can have a different
+           split between gen1 and gen2 (for instance a double relationship,
+           first cousins and also aunt and nephew). The relation with the
+           closest ancestors (the smallest of max(gen1, gen2)) is returned,
+           and the other splits are in its `others` field, as a tuple of
+           Relation.
+        """
+        depth = max_depth or MAX_DEPTH
+        starts = (self.index.get(main_id1), self.index.get(main_id2))
+
+        if main_id1 == main_id2:
+            return Relation(0, 0, [main_id1], [[main_id1]])
+        if None in starts:
+            return None
+
+        class _Side:
+            def __init__(self, start):
+                self.gen = {start: 0}        # index -> generation
+                self.children = {start: []}  # index -> previous in the BFS
+                self.frontier = [start]
+                self.depth = 0
+
+            def bound(self):
+                # The minimal generation of ancestors not seen yet
+                if self.frontier and self.depth < depth:
+                    return self.depth + 1
+                return math.inf
+
+        sides = (_Side(starts[0]), _Side(starts[1]))
+        best = math.inf
+        common = []
+
+        while True:
+            bounds = [side.bound() for side in sides]
+            if min(bounds) > best or min(bounds) == math.inf:
+                break
+
+            current, other = sorted(
+                sides, key=lambda s: (s.bound(), len(s.frontier)))
+            next_frontier = []
+            for idx in current.frontier:
+                for parent in self.parents.neighbors(idx):
+                    g = current.gen.get(parent)
+                    if g is None:
+                        current.gen[parent] = current.depth + 1
+                        current.children[parent] = [idx]
+                        next_frontier.append(parent)
+
+                        g2 = other.gen.get(parent)
+                        if g2 is not None:
+                            total = current.depth + 1 + g2
+                            if total < best:
+                                best = total
+                                common = [parent]
+                            elif total == best:
+                                common.append(parent)
+
+                    elif g == current.depth + 1:
+                        current.children[parent].append(idx)
+
+            current.frontier = next_frontier
+            current.depth += 1
+
+        if not common:
+            return None
+
+        def _paths(side, idx):
+            # The paths from the start of side to idx, at most max_paths
+            if not side.children[idx]:
+                return [[idx]]
+            result = []
+            for child in side.children[idx]:
+                for p in _paths(side, child):
+                    result.append(p + [idx])
+                    if len(result) >= max_paths:
+                        return result
+            return result
+
+        ids = self.ids
+        splits = collections.defaultdict(list)   # (gen1, gen2) -> indexes
+        for idx in common:
+            splits[(sides[0].gen[idx], sides[1].gen[idx])].append(idx)
+
+        relations = []
+        for (gen1, gen2), ancestors in splits.items():
+            paths = []
+            for idx in ancestors:
+                for up in _paths(sides[0], idx):
+                    for down in _paths(sides[1], idx):
+                        if len(paths) < max_paths:
+                            paths.append(
+                                [ids[i] for i in up] +
+                                [ids[i] for i in reversed(down[:-1])])
+            relations.append(Relation(
+                gen1=gen1,
+                gen2=gen2,
+                ancestors=sorted(ids[idx] for idx in ancestors),
+                paths=paths))
+
+        relations.sort(key=lambda r: (max(r.gen1, r.gen2), r.gen1))
+        return relations[0]._replace(others=tuple(relations[1:]))
+
+
+global_graph = FamilyGraph()
@@ -0,0 +1,169 @@
+"""
+Maintains the lifespan table, which estimates when persons were alive
+"""
+
+import django.db
+from django.conf import settings
+import logging
+from .. import models
+from .sqlsets import SQLSet
+
+logger = logging.getLogger(__name__)
+
+
+def max_lifespan():
+    """
+    Maximum number of years a person can live, used to estimate the birth
+    or death of persons when they are unknown
+    """
+    return getattr(settings, 'GENEAPROVE_MAX_LIFESPAN', 110)
+
+
+def _year(date_sort):
+    """
+    The year part of a sort date, as computed by DateRange.sort_date()
+    """
+    return int(date_sort.split('-', 1)[0])
+
+
+class LifespanSet(SQLSet):
+    """
+    Estimates the lifespan of persons from the dates of their events.
+
+    If the birth date is known, the lifespan starts there, otherwise it starts
+    `max_lifespan()` years before the death or last known event. Likewise for
+    the end of the lifespan. This results in potentially over-optimistic
+    lifespans, but is enough to discard most persons when looking for who
+    was alive at a given time.
+    """
+
+    def update(self, main_ids=None):
+        """
+        Recompute the lifespan of the given persons, or of all persons in the
+        database if `main_ids` is None.
+        """
+        if main_ids is not None:
+            main_ids = set(m for m in main_ids if m is not None)
+            if not main_ids:
+                return
+
+        events = {}  # main_id -> [birth, death, first, last]
+        birth = models.Event_Type.PK_birth
+        death = models.Event_Type.PK_death
+        principal = models.Event_Type_Role.PK_principal
+
+        with django.db.connection.cursor() as cur:
+            where = ""
+            params = []
+            if main_ids is not None:
+                in_ids, params = self.sql_in("persona.main_id", main_ids)
+                where = f"AND {in_ids}"
+
+            cur.execute(
+                "SELECT persona.main_id, event.type_id, p2e.role_id, "
+                "event.date_sort "
+                "FROM p2e, event, persona "
+                "WHERE p2e.event_id=event.id "
+                "AND p2e.person_id=persona.id "
+                "AND NOT p2e.disproved "
+                "AND event.date_sort IS NOT NULL "
+                f"{where}",
+                params)
+
+            for main_id, type_id, role_id, date_sort in cur:
+                try:
+                    year = _year(date_sort)
+                except ValueError:
+                    continue
+
+                e = events.get(main_id)
+                if e is None:
+                    e = events[main_id] = [None, None, year, year]
+                else:
+                    e[2] = min(e[2], year)
+                    e[3] = max(e[3], year)
+
+                if role_id == principal:
+                    if type_id == birth:
+                        e[0] = year if e[0] is None else min(e[0], year)
+                    elif type_id == death:
+                        e[1] = year if e[1] is None else max(e[1], year)
+
+        lifespans = []
+        maxspan = max_lifespan()
+        for main_id, (b, d, first, last) in events.items():
+            start = b if b is not None else (
+                d if d is not None else last) - maxspan
+            end = d if d is not None else (
+                b if b is not None else first) + maxspan
+
+            # Protect against inconsistent data, e.g. events after the death
+            start = min(start, first)
+            end = max(end, last)
+
+            lifespans.append(models.Lifespan(
+                person_id=main_id, start=start, end=end, span=end - start,
+                birth_known=b is not None, death_known=d is not None))
+
+        with django.db.transaction.atomic():
+            if main_ids is None:
+                models.Lifespan.objects.all().delete()
+            else:
+                self.sqlin(models.Lifespan.objects,
+                           person_id__in=main_ids).delete()
+            models.Lifespan.objects.bulk_create(lifespans)
+
+    def query_alive(self, start, end, include_unknown=False, main_ids=None):
+        """
+        A query that returns the main_id of all persons that might have been
+        alive at some point between the years `start` and `end` (included).
+
+        Lifespans are stored with an index on their start, so we only need
+        to look at those that start at most `span` years before `start`,
+        where `span` is the longest lifespan in the table (itself an index
+        lookup).
+
+        :param include_unknown: whether to include persons for which we have
+           no date at all.
+        :param main_ids: if specified, only these persons are checked. They
+           are inserted in the query, which has no parameter.
+        """
+        span = models.Lifespan.objects.aggregate(
+            span=django.db.models.Max('span'))['span'] or 0
+
+        def _among(field):
+            if main_ids is None:
+                return ""
+            ids = ",".join(str(int(m)) for m in main_ids if m is not None)
+            return f" AND {field} IN ({ids or 'NULL'})"
+
+        q = ("SELECT lifespan.main_id FROM lifespan "
+             f"WHERE lifespan.start BETWEEN {int(start) - span} "
+             f"AND {int(end)} "
+             f"AND lifespan.end >= {int(start)}"
+             f"{_among('lifespan.main_id')}")
+
+        if include_unknown:
+            q += (" UNION SELECT persona.id FROM persona "
+                  "WHERE persona.main_id=persona.id "
+                  "AND NOT EXISTS (SELECT 1 FROM lifespan "
+                  "WHERE lifespan.main_id=persona.id)"
+                  f"{_among('persona.id')}")
+
+        return q
+
+    def get_alive(self, start, end, include_unknown=False, main_ids=None):
+        """
+        The set of main_ids of persons that might have been alive at some
+        point between the years `start` and `end`.
+        :param main_ids: if specified, only these persons are checked.
+        """
+        if main_ids is not None:
+            main_ids = set(m for m in main_ids if m is not None)
+            if not main_ids:
+                return set()
+
+        with django.db.connection.cursor() as cur:
+            cur.execute(
+                self.query_alive(start, end, include_unknown, main_ids))
+            return set(main_id for main_id, in cur.fetchall())
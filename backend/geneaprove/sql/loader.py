@@ -0,0 +1,75 @@
+"""
+Loading related objects in batches, with an identity map
+"""
+
+import collections
+from .sqlsets import SQLSet
+
+
+class Loader(SQLSet):
+    """
+    An identity map, to be used for the duration of one request: each object
+    is loaded at most once, and all objects that refer to it (through a
+    foreign key) share the same instance.
+
+    Related objects are loaded with one query per relation, for all the
+    objects that need them, instead of one query per object as done by
+    django when accessing a foreign key that was not fetched with
+    select_related.
+    """
+
+    def __init__(self):
+        self._objects = collections.defaultdict(dict)  # model -> pk -> obj
+
+    def add(self, instances):
+        """
+        Register already known instances, they will not be fetched again
+        """
+        for inst in instances:
+            if inst is not None:
+                self._objects[type(inst)].setdefault(inst.pk, inst)
+
+    def get(self, model, ids):
+        """
+        The instances of `model` for the given ids. Those that are not in the
+        identity map yet are fetched in one query.
+        :returntype: dict of pk -> instance
+        """
+        ids = set(i for i in ids if i is not None)
+        known = self._objects[model]
+        missing = ids.difference(known)
+        if missing:
+            for row in model._base_manager.filter(pk__in=self.id_set(missing)):
+                known[row.pk] = row
+        return {i: known[i] for i in ids if i in known}
+
+    def _prefetch_one(self, instances, name):
+        """
+        Override SQLSet._prefetch_one so that foreign keys are resolved
+        through the identity map
+        """
+        instances = [i for i in instances if i is not None]
+        if not instances:
+            return []
+
+        field = instances[0]._meta.get_field(name)
+        if not field.many_to_one:
+            return super()._prefetch_one(instances, name)
+
+        todo = []
+        for inst in instances:
+            if field.is_cached(inst):
+                self.add([field.get_cached_value(inst)])
+            else:
+                todo.append(inst)
+
+        if todo:
+            objects = self.get(
+                field.related_model,
+                (getattr(inst, field.attname) for inst in todo))
+            for inst in todo:
+                obj = objects.get(getattr(inst, field.attname))
+                if obj is not None:
+                    field.set_cached_value(inst, obj)
+
+        return [getattr(inst, name) for inst in instances]
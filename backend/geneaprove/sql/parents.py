@@ -0,0 +1,123 @@
+"""
+Maintains the parent_link table, the direct parent-child relationships
+"""
+
+import django.db
+import logging
+from .. import models
+from .sqlsets import SQLSet
+
+logger = logging.getLogger(__name__)
+
+MAX_DEPTH = 100
+# Maximum number of generations when looking for ancestors or
+# descendants. This ensures the queries terminate even when the database
+# contains cycles (a person being his own ancestor).
+
+
+class ParentLinkSet(SQLSet):
+    """
+    Computes the parent_link table from the birth events.
+    """
+
+    @staticmethod
+    def _query_get_sex(main_id):
+        """
+        A query that computes the sex of the person `main_id` (a SQL
+        expression)
+        """
+        return (
+            "(SELECT MAX(c.name) "
+            "FROM characteristic_part c, p2c, persona p "
+            "WHERE c.characteristic_id=p2c.characteristic_id "
+            f"AND c.type_id={models.Characteristic_Part_Type.PK_sex} "
+            "AND p2c.person_id=p.id "
+            "AND NOT p2c.disproved "
+            f"AND p.main_id={main_id})")
+
+    def update(self, main_ids=None):
+        """
+        Recompute the parents of the given persons (and the sex stored for
+        them when they are themselves parents), or all links in the database
+        if `main_ids` is None.
+
+        :returntype: None when all links were recomputed, or a tuple
+           (removed, added) of sets of (child, parent) tuples otherwise.
+        """
+        if main_ids is not None:
+            main_ids = set(m for m in main_ids if m is not None)
+            if not main_ids:
+                return (set(), set())
+
+        old_links = self._get_links(main_ids)
+
+        with django.db.transaction.atomic():
+            with django.db.connection.cursor() as cur:
+                where = ""
+                params = []
+                if main_ids is None:
+                    cur.execute("DELETE FROM parent_link")
+                else:
+                    in_ids, params = self.sql_in("child_main_id", main_ids)
+                    cur.execute(f"DELETE FROM parent_link WHERE {in_ids}",
+                                params)
+                    in_ids, params = self.sql_in("persona.main_id", main_ids)
+                    where = f"AND {in_ids}"
+
+                cur.execute(
+                    "INSERT INTO parent_link "
+                    "(child_main_id, parent_main_id, role_id, sex) "
+                    "SELECT DISTINCT persona.main_id, pp.main_id, "
+                    f"p2.role_id, {self._query_get_sex('pp.main_id')} "
+                    "FROM persona, p2e, event, p2e p2, persona pp "
+                    "WHERE event.id=p2e.event_id "
+                    f"AND p2e.role_id={models.Event_Type_Role.PK_principal} "
+                    f"AND event.type_id={models.Event_Type.PK_birth} "
+                    "AND p2.role_id IN "
+                    f"({models.Event_Type_Role.PK_birth__father}, "
+                    f"{models.Event_Type_Role.PK_birth__mother}) "
+                    "AND p2e.person_id=persona.id "
+                    "AND p2.event_id=event.id "
+                    "AND p2.person_id=pp.id "
+                    "AND NOT p2e.disproved "
+                    "AND NOT p2.disproved "
+                    f"{where}",
+                    params)
+
+                if main_ids is not None:
+                    self._update_sex(cur, main_ids)
+
+        if main_ids is None:
+            return None
+
+        new_links = self._get_links(main_ids)
+        return (old_links - new_links, new_links - old_links)
+
+    def _get_links(self, main_ids):
+        """
+        The set of (child, parent) links for the children in main_ids
+        """
+        if main_ids is None:
+            return None
+
+        return set(
+            self.sqlin(models.Parent_Link.objects, child_id__in=main_ids)
+            .values_list('child_id', 'parent_id'))
+
+    def update_sex(self, main_ids):
+        """
+        The sex of some persons has changed, update the links where they
+        are the parent.
+        """
+        main_ids = set(m for m in main_ids if m is not None)
+        if main_ids:
+            with django.db.connection.cursor() as cur:
+                self._update_sex(cur, main_ids)
+
+    def _update_sex(self, cur, main_ids):
+        in_ids, params = self.sql_in("parent_main_id", main_ids)
+        cur.execute(
+            "UPDATE parent_link "
+            f"SET sex={self._query_get_sex('parent_link.parent_main_id')} "
+            f"WHERE {in_ids}",
+            params)
@@ -3,28 +3,73 @@ Support for writing custom SQL queries
 """
 
 import collections
+import itertools
 from enum import Enum
 import django.db
-from django.db.models import F, Q
+from django.db.models import F
 import logging
 from .. import models
 from .asserts import AssertList
+from .closure import AncestorClosureSet
+from .derived import update_derived
+from .graph import global_graph
+from .lifespans import LifespanSet
+from .search import SearchIndexSet
+from . import parents
 from .sqlsets import SQLSet
+from .timeline import AssertionIndexSet
 
 logger = logging.getLogger(__name__)
 
 FolkLore = collections.namedtuple(
     'FolkLore', "main_id generation folks")
 
-class Relationship(Enum):
-    ANCESTORS = ('ancestors', 'parents', 'parent', ('p2e', 'p2'))
-    DESCENDANTS = ('descendants', 'children', 'child', ('p2', 'p2e'))
 
-    def __init__(self, relations, group, individual, query_tables):
+class PersonRow(object):
+    """
+    A read-only person, as returned by `PersonSet.add_ids` for a read-only
+    PersonSet. This provides the same attributes and JSON as a
+    models.Persona loaded by the PersonSet, but is much lighter to create.
+    """
+
+    __slots__ = ('id', 'main_id', 'display_name', 'description', 'sex',
+                 'birthISODate', 'deathISODate', 'marriageISODate',
+                 'generation', '_cursor')
+
+    def __init__(self, id, display_name, description, sex,
+                 birthISODate, deathISODate, marriageISODate):
+        self.id = id
+        self.main_id = id
+        self.display_name = display_name
+        self.description = description
+        self.sex = sex
+        self.birthISODate = birthISODate
+        self.deathISODate = deathISODate
+        self.marriageISODate = marriageISODate
+        self.generation = None
+        self._cursor = None
+
+    def __repr__(self):
+        return f'PersonRow({self.id},{self.display_name})'
+
+    def to_json(self):
+        # Same output as the Persona, which only reads the attributes above
+        return models.Persona.to_json(self)
+
+
+class Relationship(Enum):
+    ANCESTORS = ('ancestors', 'parents', 'parent',
+                 ('child_main_id', 'parent_main_id'))
+    DESCENDANTS = ('descendants', 'children', 'child',
+                   ('parent_main_id', 'child_main_id'))
+    KIN = ('kin', 'kin', 'relative', None)
+    # parents, children and spouses (see PersonSet.add_kin)
+
+    def __init__(self, relations, group, individual, link_columns):
         self.relations = relations
         self.group = group
         self.individual = individual
-        self.query_tables = query_tables
+        self.link_columns = link_columns  # (from, to) in parent_link
 
 class PersonSet(SQLSet):
     """
@@ -38,10 +83,20 @@ class PersonSet(SQLSet):
     # Cannot be computed immediately, since it needs a database lookup, and
     # the database might not event exist yet.
 
-    def __init__(self, styles=None):
+    MAX_DEPTH = parents.MAX_DEPTH
+    # Maximum number of generations when looking for ancestors or
+    # descendants.
+
+    def __init__(self, styles=None, readonly=False):
+        """
+        :param readonly: if True, persons are stored as PersonRow instead of
+           models.Persona. They cannot be modified or saved, and are not
+           shared with the assertions (`self.asserts`).
+        """
         self.asserts = AssertList() # All Assertions used to compute persons
         self.persons = collections.OrderedDict() # main_id -> Persona instance
         self.styles = styles
+        self.readonly = readonly
 
         # main_id -> parents and children
         self.layout = collections.defaultdict(
@@ -53,7 +108,7 @@ class PersonSet(SQLSet):
                              models.Event_Type.PK_marriage)
 
     def add_ids(self, ids=None, namefilter=None, offset=None, limit=None,
-                compute_sex=True):
+                compute_sex=True, alive=None, after=None):
         """
         Append to the list all persons for which one of the base personas has
         an id in `ids`.
@@ -63,7 +118,13 @@ class PersonSet(SQLSet):
               which could take a long time.
 
         The additional parameters can be used to restrict that subset to
-        [offset:offset+limit]
+        [offset:offset+limit]. Persons are sorted by name, and each of them
+        gets a `_cursor` attribute, which can be given as `after` to fetch
+        the following persons (this is much faster than a large offset).
+
+        :param alive: if specified, a (start, end) tuple of years. Only the
+           persons that might have been alive during that period are
+           returned (see LifespanSet).
         """
         assert ids is None or isinstance(ids, collections.abc.Iterable)
 
@@ -88,107 +149,139 @@ class PersonSet(SQLSet):
         #                "t2.main_id=persona.id"],
         #         params=(models.Characteristic_Part_Type.PK_sex,))
 
+        args = []
+        if ids is not None:
+            ids = list(ids)
+
         if ids:
             # Convert from ids to main ids
-            ids = ','.join('%d' % n for n in ids)
+            in_ids, args = self.sql_in("p.id", ids)
             id_to_main = (
                 f"persona.id IN ("
-                f"SELECT p.main_id FROM persona p WHERE p.id IN ({ids}))")
+                f"SELECT p.main_id FROM persona p WHERE {in_ids})")
         else:
             id_to_main = "persona.main_id=persona.id"
 
-        args = []
-        if namefilter:
-            args.append(f"%{namefilter}%")
+        if alive:
+            id_to_main += (
+                f" AND persona.id IN ({LifespanSet().query_alive(*alive)})")
 
-        if compute_sex:
-            sex_field = "sub1.sex"
-            sex_query = (
-                f"LEFT JOIN ({self._query_get_sex()}) sub1 ON "
-                f"sub1.main_id=persona.id "
-            )
-        else:
-            sex_field = "'?' as sex"
-            sex_query = ""
+        if namefilter:
+            # Uses the full-text index
+            match, params = SearchIndexSet().query_match(namefilter)
+            id_to_main += f" AND persona.id IN ({match})"
+            args.extend(params)
+
+        if after:
+            # Uses the persona_sort index
+            where, params = self.sql_after(
+                ["lower(persona.name)", "persona.id"],
+                self.decode_cursor(after))
+            id_to_main += f" AND {where}"
+            args.extend(params)
+            offset = None
+
+        # The sex and the dates are read from person_summary
+        sex_field = "summary.sex" if compute_sex else "'?'"
+
+        q = ("FROM persona "
+             "LEFT JOIN person_summary summary "
+             "ON summary.main_id=persona.id "
+             f"WHERE {id_to_main} "
+             "ORDER BY lower(persona.name) ASC, persona.id ASC " +
+             (f"LIMIT {int(limit)} " if limit is not None else "") +
+             (f"OFFSET {int(offset)} " if offset else ""))
+
+        if self.readonly:
+            with django.db.connection.cursor() as cur:
+                cur.execute(
+                    "SELECT persona.id, persona.name, persona.description, "
+                    f"{sex_field}, summary.birth, summary.death, "
+                    f"summary.marriage, lower(persona.name) {q}",
+                    args)
+                for *row, sort_name in cur.fetchall():
+                    p = PersonRow(*row)
+                    p._cursor = self.encode_cursor(sort_name, p.id)
+                    self.persons[p.id] = p
+            return
 
         pm = models.Persona.objects.raw(
-            f"SELECT persona.*, {sex_field} "
-            f"FROM persona {sex_query}"
-            f"WHERE {id_to_main} " +
-            (f"AND persona.name LIKE %s " if namefilter else "") +
-            "ORDER BY lower(persona.name) ASC " +
-            (f"LIMIT {int(limit)} " if limit is not None else "") +
-            (f"OFFSET {int(offset)} " if offset else ""),
+            f"SELECT persona.*, {sex_field} AS sex, "
+            "summary.birth AS birthISODate, "
+            "summary.death AS deathISODate, "
+            "summary.marriage AS marriageISODate, "
+            f"lower(persona.name) AS sort_name {q}",
             args)
 
-        self.persons.update({p.id: p for p in pm.iterator()})
+        for p in pm.iterator():
+            p._cursor = self.encode_cursor(p.sort_name, p.id)
+            self.persons[p.id] = p
 
         # Do not fetch them again
         self.asserts.add_known(persons=self.persons.values())
 
-    @staticmethod
-    def _query_get_sex():
-        """
-        A query to compute the sex of persons
-        """
-        return (
-            "SELECT p.main_id, c.name AS sex "
-            "FROM characteristic_part c, p2c, persona p "
-            "WHERE c.characteristic_id=p2c.characteristic_id "
-            f"AND c.type_id={models.Characteristic_Part_Type.PK_sex} "
-            "AND p2c.person_id=p.id "
-            "AND NOT p2c.disproved "
-            "GROUP BY p.main_id, c.name")
-
-    @staticmethod
-    def _query_get_folks(relationship):
-        """
-        A query that computes the list of direct parents or children
-        for a person
-        """
-
-        return (
-            f"SELECT DISTINCT persona.main_id, pp.main_id as {relationship.individual} "
-            "FROM persona, p2e, event, p2e p2, persona pp "
-            "WHERE event.id=p2e.event_id "
-            f"AND {relationship.query_tables[0]}.role_id={models.Event_Type_Role.PK_principal} "
-            f"AND event.type_id={models.Event_Type.PK_birth} "
-            f"AND {relationship.query_tables[1]}.role_id IN ({models.Event_Type_Role.PK_birth__father}, "
-            f"{models.Event_Type_Role.PK_birth__mother}) "
-            "AND p2e.person_id=persona.id "
-            "AND p2.event_id=event.id "
-            "AND p2.person_id=pp.id")
-
     def get_folks(self, relationship, person_id, max_depth=None, skip=0):
         """
         :returntype: list of FolkLore
            This includes person_id itself, at generation 0
+        This uses the in-memory family graph, unless the ancestor_closure
+        table is maintained.
+        For Relationship.KIN, the generation is the distance to person_id,
+        and the folks are all the relatives found.
         """
         assert isinstance(person_id, int)
 
+        if relationship == Relationship.KIN:
+            global_graph.update_if_needed()
+            kin = global_graph.get_kin(
+                person_id, 2 if max_depth is None else max_depth)
+            return [
+                FolkLore(main_id, distance,
+                         [k for k in itertools.chain(
+                             global_graph.get_parents(main_id),
+                             global_graph.get_children(main_id),
+                             global_graph.get_spouses(main_id))
+                          if k in kin])
+                for main_id, distance in kin.items()
+                if distance >= skip]
+
+        if not AncestorClosureSet.enabled():
+            global_graph.update_if_needed()
+            return [
+                FolkLore(*f)
+                for f in global_graph.get_folks(
+                    relationship.group, person_id, max_depth, skip)]
+
         with django.db.connection.cursor() as cur:
             pid = self.cast(person_id, 'bigint')
             zero = self.cast(0, 'bigint')  # ??? do we really need to cast
-            initial = f"VALUES({pid}, {zero})"
-            md = f"AND {relationship.relations}.generation<={max_depth} " if max_depth else ""
-            sk = f"WHERE {relationship.relations}.generation>{skip} " if skip else ""
+            rel = relationship.relations
+            fr, to = relationship.link_columns
+            depth = max_depth or self.MAX_DEPTH
+            sk = f"WHERE {rel}.generation>{skip} " if skip else ""
+
+            if relationship == Relationship.ANCESTORS:
+                c_to, c_fr = 'ancestor_main_id', 'descendant_main_id'
+            else:
+                c_to, c_fr = 'descendant_main_id', 'ancestor_main_id'
+
             q = (
-                f"WITH RECURSIVE {relationship.group}(main_id, {relationship.individual}) "
-                f"AS ({self._query_get_folks(relationship)}), "
-                f"{relationship.relations}(main_id,generation) "
-                    f"AS ({initial} "
-                    "UNION "
-                    f"SELECT {relationship.group}.{relationship.individual}, {relationship.relations}.generation + 1 "
-                    f"FROM {relationship.group}, {relationship.relations} "
-                    f"WHERE {relationship.group}.main_id = {relationship.relations}.main_id "
-                    f"{md}) "
-                f"SELECT {relationship.relations}.main_id, {relationship.relations}.generation, "
-                f"{self.group_concat(f'{relationship.group}.{relationship.individual}')} AS {relationship.group} "
-                f"FROM {relationship.relations} "
-                f"LEFT JOIN {relationship.group} "
-                f"ON {relationship.group}.main_id={relationship.relations}.main_id "
+                f"WITH {rel}(main_id,generation) AS ("
+                    f"VALUES({pid}, {zero}) "
+                    "UNION ALL "
+                    f"SELECT {c_to}, generation "
+                    "FROM ancestor_closure "
+                    f"WHERE {c_fr}={person_id:d} "
+                    f"AND generation<={depth + 1}) "
+                f"SELECT {rel}.main_id, {rel}.generation, "
+                f"{self.group_concat(f'parent_link.{to}')} "
+                    f"AS {relationship.group} "
+                f"FROM {rel} "
+                "LEFT JOIN parent_link "
+                f"ON parent_link.{fr}={rel}.main_id "
                 f"{sk}"
-                f"GROUP BY {relationship.relations}.main_id, {relationship.relations}.generation"            )
+                f"GROUP BY {rel}.main_id, {rel}.generation"
+            )
             cur.execute(q)
 
             return [
@@ -213,6 +306,31 @@ class PersonSet(SQLSet):
         for f in folks:
             self.layout[f.main_id][relationship.group] = f.folks
 
+    def add_kin(self, person_id, max_depth=2):
+        """
+        Fetch the relatives of `person_id` (by main_id): ancestors,
+        descendants, siblings, cousins, in-laws,... up to `max_depth`
+        parent, child or spouse links away (siblings are two links away,
+        first cousins four).
+        The layout of each person gives their parents, children and spouses
+        among those relatives, and their distance to `person_id`.
+        """
+        assert isinstance(person_id, int)
+
+        global_graph.update_if_needed()
+        kin = global_graph.get_kin(person_id, max_depth)
+        self.add_ids(ids=kin.keys())
+
+        for main_id, distance in kin.items():
+            lay = self.layout[main_id]
+            lay['distance'] = distance
+            lay['parents'] = [
+                p for p in global_graph.get_parents(main_id) if p in kin]
+            lay['children'] = [
+                p for p in global_graph.get_children(main_id) if p in kin]
+            lay['spouses'] = [
+                p for p in global_graph.get_spouses(main_id) if p in kin]
+
     def get_unique_person(self):
         """
         If the set contains a single person, return it
@@ -232,16 +350,25 @@ class PersonSet(SQLSet):
         assert main_ids is None or isinstance(main_ids, list)
         assert sex is None or isinstance(sex, str)
 
+        fr, to = relationship.link_columns
+        if relationship == Relationship.ANCESTORS:
+            sex_field = "parent_link.sex"
+        else:
+            sex_field = (
+                "(SELECT summary.sex FROM person_summary summary "
+                f"WHERE summary.main_id=parent_link.{to})")
+
         with django.db.connection.cursor() as cur:
             args = []
             where = []
 
             if main_ids:
-                ids = ','.join(f"{d:d}" for d in main_ids)
-                where.append(f"parents.main_id IN ({ids})")
+                in_ids, params = self.sql_in(f"parent_link.{fr}", main_ids)
+                where.append(in_ids)
+                args.extend(params)
 
             if sex:
-                where.append(f"sex.sex=%s")
+                where.append(f"{sex_field}=%s")
                 args.append(sex)
 
             if where:
@@ -251,12 +378,8 @@ class PersonSet(SQLSet):
                 where = ""
 
             cur.execute(
-                f"WITH parents AS ({self._query_get_folks(relationship)}), "
-                f"sex AS ({self._query_get_sex()}) "
-                "SELECT parents.main_id, sex.sex "
-                "FROM parents "
-                "LEFT JOIN sex "
-                f"ON parents.parent=sex.main_id {where}",
+                f"SELECT parent_link.{fr}, {sex_field} "
+                f"FROM parent_link {where}",
                 args)
 
             result = collections.defaultdict(str)
@@ -290,27 +413,41 @@ class PersonSet(SQLSet):
         people in `gen_0_ids` are at generation 0 (parents are one generation
         above, children one below.
         This assumes you have called `add_folks()`to add the persons.
+        A person reached through several paths (implex, or cycles in the
+        database) keeps the generation of the shortest one.
         """
         generations = {}
-        queue = [(self.get_from_id(g).main_id, 0) for g in gen_0_ids]
+        queue = collections.deque()
+        for g in gen_0_ids:
+            main_id = self.get_from_id(g).main_id
+            if main_id not in generations:
+                generations[main_id] = 0
+                queue.append(main_id)
+
         while queue:
-            main_id, gen = queue.pop(0)
-            generations[main_id] = gen
+            main_id = queue.popleft()
+            gen = generations[main_id]
 
             lay = self.layout.get(main_id)
             if lay is not None:
-                queue.extend((p, gen + 1) for p in lay['parents'])
-                queue.extend((p, gen - 1) for p in lay['children'])
+                for folks, g in ((lay['parents'], gen + 1),
+                                 (lay['children'], gen - 1)):
+                    for p in folks:
+                        if p not in generations:
+                            generations[p] = g
+                            queue.append(p)
 
         return generations
 
-    def fetch_p2e(self, event_types=BMD):
+    def fetch_p2e(self, event_types=None):
         """
         Fetch all person-to-event relationships for the persons.
-        As a side-effect, this sets the birth, death and marriage dates for the
-        persons.
+        The birth, death and marriage dates of the persons do not need this,
+        they were read from person_summary in `add_ids()`, so this is only
+        needed when the styles or the caller look at the assertions.
 
         :param event_types: restricts the types of events that are retrieved
+           (all events by default)
         """
         related = ['event', 'role', *models.P2E.related_json_fields()]
         if self.styles and self.styles.need_places:
@@ -318,33 +455,13 @@ class PersonSet(SQLSet):
 
         events = models.P2E.objects \
             .filter(disproved=False) \
-            .annotate(person_main_id=F('person__main_id'),
-                      event_type=F('event__type_id'))
+            .annotate(person_main_id=F('person__main_id'))
         if event_types:
             events = events.filter(event__type__in=event_types)
 
-        for qs in self.sqlin(events, person__main_id__in=self.persons.keys()):
-            for p2e in self.prefetch_related(qs.all(), *related):
-                self.asserts.add(p2e)
-
-                if not p2e.disproved \
-                   and p2e.role_id == models.Event_Type_Role.PK_principal:
-
-                    e = p2e.event
-                    person = self.persons[p2e.person_main_id]
-
-                    if not e.date_sort:
-                        pass
-                    elif p2e.event_type == models.Event_Type.PK_birth:
-                        if person.birthISODate is None or \
-                                e.date_sort < person.birthISODate:
-                            person.birthISODate = e.date_sort
-                    elif p2e.event_type == models.Event_Type.PK_death:
-                        if person.deathISODate is None or \
-                                e.date_sort > person.deathISODate:
-                            person.deathISODate = e.date_sort
-                    elif p2e.event_type == models.Event_Type.PK_marriage:
-                        person.marriageISODate = e.date_sort
+        events = self.sqlin(events, person__main_id__in=self.persons.keys()) \
+            .select_related(*related)
+        self.asserts.extend(events)
 
     def fetch_p2c(self):
         """
@@ -353,13 +470,12 @@ class PersonSet(SQLSet):
         Each assertion receives an extra `person_main_id` field.
         """
         pm = models.P2C.objects \
-            .prefetch_related(*models.P2C.related_json_fields()) \
+            .select_related(*models.P2C.related_json_fields()) \
             .filter(disproved=False) \
             .annotate(person_main_id=F('person__main_id'))
-
-        for p2c_set in self.sqlin(pm, person__main_id__in=self.persons.keys()):
-            self.asserts.extend(
-                self.prefetch_related(p2c_set.all(), 'characteristic__parts'))
+        pm = self.sqlin(pm, person__main_id__in=self.persons.keys())
+        self.asserts.extend(
+            self.prefetch_related(pm, 'characteristic__parts'))
 
     def fetch_p2p(self):
         """
@@ -372,7 +488,7 @@ class PersonSet(SQLSet):
         # the same main_id
         pm = models.P2P.objects \
             .filter(person1__in=models.Persona.objects
-                       .filter(main_id__in=self.persons.keys())) \
+                       .filter(main_id__in=self.id_set(self.persons.keys()))) \
             .select_related(*models.P2P.related_json_fields())
         self.asserts.extend(pm)
 
@@ -419,24 +535,15 @@ class PersonSet(SQLSet):
             finally:
                 cur.execute("pragma foreign_keys=%s" % previous)
 
-    def _query_asserts(self):
-        return [
-            table.objects.filter(person__main_id__in=self.persons.keys())
-            for table in (models.P2C, models.P2E, models.P2G)
-        ] + [models.P2P.objects \
-            .filter(Q(person1__main_id__in=self.persons.keys())
-                    | Q(person2__main_id__in=self.persons.keys()))
-        ]
+        # Derived tables are indexed on main_id
+        update_derived()
 
     def count_asserts(self):
-        total = 0
-        for a in self._query_asserts():
-            total += a.count()
-        return total
+        return AssertionIndexSet().count('person', self.persons.keys())
 
     def fetch_asserts_subset(self, offset=None, limit=None):
         self.asserts.fetch_asserts_subset(
-            self._query_asserts(), offset=offset, limit=limit)
+            'person', self.persons.keys(), offset=offset, limit=limit)
         return self.asserts
 
     def to_json(self):
@@ -1,6 +1,6 @@
-from .. import models
 from .asserts import AssertList
 from .sqlsets import SQLSet
+from .timeline import AssertionIndexSet
 
 
 class PlaceSet(SQLSet):
@@ -12,21 +12,10 @@ class PlaceSet(SQLSet):
         self.place_ids.update(ids)
 
     def count_asserts(self):
-        p2c = models.P2C.objects \
-                .filter(characteristic__place_id__in=self.place_ids) \
-                .count()
-        p2e = models.P2E.objects \
-                .filter(event__place_id__in=self.place_ids) \
-                .count()
-        return p2c + p2e
+        return AssertionIndexSet().count('place', self.place_ids)
 
     def fetch_asserts(self, offset=None, limit=None):
         result = AssertList()
         result.fetch_asserts_subset(
-            [models.P2C.objects
-                .filter(characteristic__place__in=self.place_ids),
-             models.P2E.objects
-                .filter(event__place__in=self.place_ids)],
-            offset=offset,
-            limit=limit)
+            'place', self.place_ids, offset=offset, limit=limit)
         return result
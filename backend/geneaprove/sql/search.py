@@ -0,0 +1,297 @@
+"""
+Maintains search_index, a full-text index on the names of persons, places
+and sources
+"""
+
+import collections
+import django.db
+import logging
+from .. import models
+from .sqlsets import SQLSet
+
+logger = logging.getLogger(__name__)
+
+
+class SearchIndexSet(SQLSet):
+    """
+    A full-text index (sqlite's FTS5) on the names of persons, places and
+    sources. Each row is a document identified by its rowid, computed from
+    the kind of the object and its id (see `rowid()`). The columns are:
+       - name: the names of all personas of a person (and the name parts
+         of their characteristics that are neither given names nor
+         surnames), the name of a place and of its parts, the abbreviation
+         and title of a source.
+       - given, surname: for persons only.
+       - details: the bibliography of a source.
+
+    Other databases do not have FTS5, and fall back to a slower LIKE.
+    """
+
+    KINDS = ('person', 'place', 'source')
+    PERSON = 0
+    PLACE = 1
+    SOURCE = 2
+
+    WEIGHTS = (10.0, 5.0, 5.0, 1.0)
+    # Weight of each column when ranking results (bm25)
+
+    @staticmethod
+    def enabled():
+        """Whether the full-text index is available"""
+        return django.db.connection.vendor == 'sqlite'
+
+    @staticmethod
+    def create(schema_editor):
+        """Create the index (for migrations)"""
+        if schema_editor.connection.vendor == 'sqlite':
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE search_index USING fts5("
+                "name, given, surname, details, "
+                "tokenize='unicode61 remove_diacritics 2', "
+                "prefix='1 2 3')")
+
+    @staticmethod
+    def rowid(kind, id):
+        """The rowid of the document for the object `id`"""
+        return (id << 2) + kind
+
+    def update(self, main_ids=None):
+        """
+        Recompute the documents for the given persons, or for all persons,
+        places and sources in the database if `main_ids` is None.
+        """
+        if main_ids is not None:
+            main_ids = set(m for m in main_ids if m is not None)
+            if not main_ids:
+                return
+
+        self._update(self.PERSON, main_ids)
+        if main_ids is None:
+            self._update(self.PLACE, None)
+            self._update(self.SOURCE, None)
+
+    def update_places(self, ids):
+        """Recompute the documents for the given places"""
+        self._update(self.PLACE, set(i for i in ids if i is not None))
+
+    def update_sources(self, ids):
+        """Recompute the documents for the given sources"""
+        self._update(self.SOURCE, set(i for i in ids if i is not None))
+
+    def _update(self, kind, ids):
+        """
+        Only the documents that have changed are written, so that the
+        whole-database update done after an import only has to index the new
+        objects, which is the slow part.
+        """
+        if not self.enabled() or (ids is not None and not ids):
+            return
+
+        logger.debug('update search_index for %s', self.KINDS[kind])
+
+        with django.db.transaction.atomic():
+            with django.db.connection.cursor() as cur:
+                docs = self._documents(cur, kind, ids)
+
+                if ids is None:
+                    cur.execute(
+                        "SELECT rowid, name, given, surname, details "
+                        f"FROM search_index WHERE (rowid & 3) = {kind}")
+                else:
+                    if kind == self.PERSON:
+                        # The personas merged into these persons used to be
+                        # persons themselves, and their documents are stale
+                        in_main, params = self.sql_in("main_id", ids)
+                        cur.execute(
+                            "SELECT id FROM persona "
+                            f"WHERE {in_main} AND id<>main_id",
+                            params)
+                        ids = ids.union(row[0] for row in cur.fetchall())
+
+                    in_ids, params = self.sql_in(
+                        "rowid", (self.rowid(kind, i) for i in ids))
+                    cur.execute(
+                        "SELECT rowid, name, given, surname, details "
+                        f"FROM search_index WHERE {in_ids}",
+                        params)
+
+                stale = []
+                for rowid, *doc in cur.fetchall():
+                    if docs.get(rowid) == tuple(doc):
+                        del docs[rowid]   # up-to-date
+                    else:
+                        stale.append(rowid)
+
+                if stale:
+                    in_ids, params = self.sql_in("rowid", stale)
+                    cur.execute(
+                        f"DELETE FROM search_index WHERE {in_ids}", params)
+
+                cur.executemany(
+                    "INSERT INTO search_index "
+                    "(rowid, name, given, surname, details) "
+                    "VALUES (%s, %s, %s, %s, %s)",
+                    [(rowid, *doc) for rowid, doc in docs.items()])
+
+    def _documents(self, cur, kind, ids):
+        """
+        Compute the documents for the given objects.
+        :returntype: dict of rowid -> (name, given, surname, details)
+        """
+        # id -> [names, given names, surnames, details]
+        docs = collections.defaultdict(lambda: ([], [], [], []))
+
+        def _query(q, column):
+            where = ""
+            params = []
+            if ids is not None:
+                in_ids, params = self.sql_in(column, ids)
+                where = f"AND {in_ids}"
+            cur.execute(q.format(where=where), params)
+            return cur.fetchall()
+
+        if kind == self.PERSON:
+            given = models.Characteristic_Part_Type.PK_given_name
+            surname = models.Characteristic_Part_Type.PK_surname
+
+            for main_id, name in _query(
+                    "SELECT persona.main_id, persona.name FROM persona "
+                    "WHERE persona.main_id IS NOT NULL {where}",
+                    "persona.main_id"):
+                docs[main_id][0].append(name)
+
+            for main_id, type_id, name in _query(
+                    "SELECT persona.main_id, part.type_id, part.name "
+                    "FROM persona, p2c, characteristic_part part, "
+                    "characteristic_part_type t "
+                    "WHERE p2c.person_id=persona.id "
+                    "AND NOT p2c.disproved "
+                    "AND part.characteristic_id=p2c.characteristic_id "
+                    "AND part.type_id=t.id "
+                    "AND t.is_name_part "
+                    "AND persona.main_id IS NOT NULL {where}",
+                    "persona.main_id"):
+                d = docs[main_id]
+                if type_id == given:
+                    d[1].append(name)
+                elif type_id == surname:
+                    d[2].append(name)
+                else:
+                    d[0].append(name)   # nickname, prefix,...
+
+        elif kind == self.PLACE:
+            for id, name in _query(
+                    "SELECT place.id, place.name FROM place WHERE 1=1 {where}",
+                    "place.id"):
+                docs[id][0].append(name)
+            for id, name in _query(
+                    "SELECT place_part.place_id, place_part.name "
+                    "FROM place_part WHERE 1=1 {where}",
+                    "place_part.place_id"):
+                docs[id][0].append(name)
+
+        else:
+            for id, abbrev, title, biblio in _query(
+                    "SELECT source.id, source.abbrev, source.title, "
+                    "source.biblio FROM source WHERE 1=1 {where}",
+                    "source.id"):
+                docs[id][0].extend(n for n in (abbrev, title) if n)
+                if biblio:
+                    docs[id][3].append(biblio)
+
+        # Sort and remove duplicates, so that documents can be compared
+        return {
+            self.rowid(kind, id): tuple(
+                ' '.join(sorted(set(n))) for n in doc)
+            for id, doc in docs.items()}
+
+    @staticmethod
+    def match_expression(text):
+        """
+        Convert the text typed by the user into a query for the full-text
+        index: all terms must be found, and each of them can be the prefix
+        of a word, as in
+            "mar* smi*"
+        """
+        return " ".join(
+            '"' + term.replace('"', '""') + '"*' for term in text.split())
+
+    def query_match(self, text):
+        """
+        A query that returns the main_id of all persons with a name that
+        matches `text`.
+        :returntype: (sql, params)
+        """
+        if self.enabled() and text.split():
+            return ("SELECT rowid >> 2 FROM search_index "
+                    "WHERE search_index MATCH %s "
+                    f"AND (rowid & 3) = {self.PERSON}",
+                    [self.match_expression(text)])
+        else:
+            return ("SELECT main_id FROM persona WHERE name LIKE %s",
+                    [f"%{text}%"])
+
+    def search(self, text, kinds=None, limit=20):
+        """
+        Search all objects matching text.
+        :param kinds: the kinds of objects to search (see KINDS), or None
+           for all of them.
+        :returntype: a tuple (counts, results), where counts is a dict
+           giving the number of matches for each kind, and results is a list
+           of the `limit` best matches, as (kind, id, rank) tuples (the lower
+           the rank, the better the match).
+        """
+        kinds = [self.KINDS.index(k) for k in kinds or self.KINDS]
+        counts = {self.KINDS[k]: 0 for k in kinds}
+        results = []
+
+        if not text.split():
+            return counts, results
+
+        if not self.enabled():
+            return self._search_like(text, kinds, limit)
+
+        match = self.match_expression(text)
+        in_kinds = ", ".join(str(k) for k in kinds)
+        weights = ", ".join(str(w) for w in self.WEIGHTS)
+
+        with django.db.connection.cursor() as cur:
+            cur.execute(
+                "SELECT (rowid & 3), COUNT(*) FROM search_index "
+                f"WHERE search_index MATCH %s AND (rowid & 3) IN ({in_kinds}) "
+                "GROUP BY (rowid & 3)",
+                [match])
+            for kind, count in cur.fetchall():
+                counts[self.KINDS[kind]] = count
+
+            cur.execute(
+                f"SELECT rowid, bm25(search_index, {weights}) AS rank "
+                "FROM search_index "
+                f"WHERE search_index MATCH %s AND (rowid & 3) IN ({in_kinds}) "
+                "ORDER BY rank "
+                f"LIMIT {int(limit)}",
+                [match])
+            for rowid, rank in cur.fetchall():
+                results.append((self.KINDS[rowid & 3], rowid >> 2, rank))
+
+        return counts, results
+
+    def _search_like(self, text, kinds, limit):
+        """Same as search, when the full-text index is not available"""
+        querysets = {
+            self.PERSON: models.Persona.objects
+                .filter(id=django.db.models.F('main_id'))
+                .filter(display_name__icontains=text),
+            self.PLACE: models.Place.objects.filter(name__icontains=text),
+            self.SOURCE: models.Source.objects.filter(
+                django.db.models.Q(abbrev__icontains=text)
+                | django.db.models.Q(title__icontains=text)),
+        }
+        counts = {}
+        results = []
+        for k in kinds:
+            counts[self.KINDS[k]] = querysets[k].count()
+            results.extend(
+                (self.KINDS[k], id, 0)
+                for id in querysets[k].values_list('id', flat=True)[:limit])
+        return counts, results[:limit]
@@ -2,9 +2,12 @@ import collections
 import django.db
 from django.db.models import F, IntegerField, TextField, Value, Count
 import logging
+import threading
 from .. import models
+from ..utils.citations import Citations
 from .sqlsets import SQLSet
 from .asserts import AssertList
+from .timeline import AssertionIndexSet
 
 
 logger = logging.getLogger(__name__)
@@ -14,6 +17,118 @@ CitationDetails = collections.namedtuple(
     'CitationDetails', 'name value fromHigh')
 
 
+class HigherSourcesCache(SQLSet):
+    """
+    The higher sources of each source (recursively), and its citation parts
+    including those inherited from the higher sources, cached in memory for
+    the sources that have been looked at. The cache is cleared whenever
+    the "citations" change counter is incremented in the database (see
+    `touch()`), possibly from another process.
+    """
+
+    COUNTER = "citations"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._higher = {}     # id -> list of higher source ids, nearest first
+        self._citations = {}  # id -> list of CitationDetails
+        self._medium = {}     # id -> medium of the nearest higher source
+        self._type_names = {}  # citation part type id -> name
+
+    @staticmethod
+    def touch():
+        """
+        Invalidate all caches, in all processes, after a change to the
+        higher source or the citation parts of a source.
+        """
+        models.Change_Counter.increment(HigherSourcesCache.COUNTER)
+
+    def get(self, ids):
+        """
+        The higher sources of the sources `ids`, and their citation parts
+        (their own parts first, then those of the higher sources).
+        :returntype: a tuple of four dicts, source id -> list of higher
+           source ids, source id -> list of CitationDetails, source id ->
+           the medium inherited from the higher sources (or None), and
+           citation part type id -> name
+        """
+        ids = set(ids)
+        version = models.Change_Counter.get(self.COUNTER)
+
+        with self._lock:
+            if version != self._version:
+                self._higher = {}
+                self._citations = {}
+                self._medium = {}
+                self._type_names = {}
+                self._version = version
+
+            missing = ids.difference(self._higher)
+            if missing:
+                self._load(missing)
+
+            return ({i: self._higher[i] for i in ids},
+                    {i: self._citations[i] for i in ids},
+                    {i: self._medium[i] for i in ids},
+                    self._type_names)
+
+    def _load(self, ids):
+        logger.debug('HigherSourcesCache._load')
+        higher = {i: [] for i in ids}
+        medium = {i: None for i in ids}
+
+        with django.db.connection.cursor() as cur:
+            # Start from the requested sources, rather than from all sources
+            # that have a higher source. The parent is read with a subquery,
+            # since with a join sqlite builds a bloom filter on the whole
+            # source table at each step.
+            in_ids, params = self.sql_in("id", ids)
+            cur.execute(
+                "WITH RECURSIVE higher(source_id, parent) AS ("
+                    "SELECT id, higher_source_id FROM source "
+                        f"WHERE {in_ids} "
+                        "AND higher_source_id IS NOT NULL "
+                    "UNION "
+                    "SELECT higher.source_id, "
+                        "(SELECT s.higher_source_id FROM source s "
+                        "WHERE s.id=higher.parent) "
+                        "FROM higher "
+                        "WHERE higher.parent IS NOT NULL"
+                ") SELECT higher.source_id, higher.parent, "
+                    "(SELECT s.medium FROM source s "
+                    "WHERE s.id=higher.parent) "
+                "FROM higher "
+                "WHERE higher.parent IS NOT NULL",
+                params)
+            for s, parent, parent_medium in cur.fetchall():
+                higher[s].append(parent)
+                if medium[s] is None:
+                    medium[s] = parent_medium
+
+        parts = collections.defaultdict(list)  # id -> list of (type, value)
+        all_ids = set(ids).union(h for lst in higher.values() for h in lst)
+        for source_id, type_id, type_name, value in self.sqlin(
+                models.Citation_Part.objects, source_id__in=all_ids) \
+                .values_list('source_id', 'type_id', 'type__name', 'value'):
+            parts[source_id].append((type_id, value))
+            self._type_names[type_id] = type_name
+
+        for s, lst in higher.items():
+            self._higher[s] = lst
+            self._medium[s] = medium[s]
+            self._citations[s] = [
+                CitationDetails(name=name, value=value, fromHigh=False)
+                for name, value in parts[s]
+            ] + [
+                CitationDetails(name=name, value=value, fromHigh=True)
+                for h in lst
+                for name, value in parts[h]]
+
+
+higher_sources = HigherSourcesCache()
+
+
 class SourceSet(SQLSet):
 
     def __init__(self):
@@ -21,6 +136,8 @@ class SourceSet(SQLSet):
         self.asserts = AssertList()
         self._higher = None  # id -> list of higher source ids, recursively
         self._citations = None  # id -> list of CitationDetails
+        self._medium = None  # id -> medium inherited from higher sources
+        self._type_names = None  # citation part type id -> name
 
     def add_ids(self, ids=None, offset=None, limit=None):
         """
@@ -32,9 +149,8 @@ class SourceSet(SQLSet):
         pm = models.Source.objects.select_related()
         pm = self.limit_offset(pm, offset=offset, limit=limit)
 
-        for chunk in self.sqlin(pm, id__in=ids):
-            for s in chunk:
-                self.sources[s.id] = s
+        for s in self.sqlin(pm, id__in=ids):
+            self.sources[s.id] = s
 
         self._higher = None
         self._citations = None
@@ -43,44 +159,22 @@ class SourceSet(SQLSet):
 
     def fetch_higher_sources(self):
         """
-        Fetch the 'higher' source relationships. This only gets the ids
+        Fetch the 'higher' source relationships, and the citation parts of
+        the sources (see HigherSourcesCache)
         """
         if self._higher is not None:
             return   # already computed
 
         logger.debug('SourceSet.fetch_higher_sources')
-        with django.db.connection.cursor() as cur:
-            ids = ", ".join(str(k) for k in self.sources.keys())
-            q = (
-                "WITH RECURSIVE higher(source_id, parent) AS ("
-                    "SELECT id, higher_source_id FROM source "
-                        "WHERE higher_source_id IS NOT NULL "
-                    "UNION "
-                    "SELECT higher.source_id, source.higher_source_id "
-                        "FROM source, higher "
-                        "WHERE source.id=higher.parent "
-                        "AND source.higher_source_id IS NOT NULL"
-                ") SELECT higher.source_id, higher.parent "
-                "FROM higher "
-                f"WHERE higher.source_id IN ({ids}) "
-            )
-            cur.execute(q)
-
-            self._higher = collections.defaultdict(list)
-            for s, parent in cur.fetchall():
-                self._higher[s].append(parent)
+        self._higher, self._citations, self._medium, self._type_names = \
+            higher_sources.get(self.sources.keys())
 
     def count_asserts(self):
         """
         Count all asserts for the sources, but doesn't fetch them
         """
         assert len(self.sources) == 1
-        sid = next(iter(self.sources))
-
-        count = 0
-        for table in (models.P2E, models.P2C, models.P2P, models.P2G):
-            count += table.objects.filter(source=sid).count()
-        return count
+        return AssertionIndexSet().count('source', self.sources.keys())
 
     def fetch_asserts(self, offset=None, limit=None):
         """
@@ -89,39 +183,15 @@ class SourceSet(SQLSet):
         logger.debug('SourceSet.fetch_asserts')
 
         assert len(self.sources) == 1
-        sid = next(iter(self.sources))
-
         self.asserts.fetch_asserts_subset(
-            [models.P2E.objects.filter(source=sid),
-             models.P2C.objects.filter(source=sid),
-             models.P2P.objects.filter(source=sid),
-             models.P2G.objects.filter(source=sid)],
-            offset=offset,
-            limit=limit)
+            'source', self.sources.keys(), offset=offset, limit=limit)
 
     def fetch_citations(self):
         """
         Fetch all citation parts for all sources and their higher sources
         """
-        if self._citations is not None:
-            return   # already computed
-
         self.fetch_higher_sources()
 
-        logger.debug('SourceSet.fetch_citations')
-        all_ids = set(self.sources.keys())
-        all_ids.update(
-            h
-            for higher_list in self._higher.values()
-            for h in higher_list)
-
-        self._citations = collections.defaultdict(list)
-        for p in models.Citation_Part.objects.filter(source__in=all_ids):
-            self._citations[p.source_id].append(CitationDetails(
-                name=p.type_id,
-                value=p.value,
-                fromHigh=False))
-
     def get_citations(self, source):
         """
         Return the citations for a given source, recursively looking at
@@ -135,12 +205,34 @@ class SourceSet(SQLSet):
             self.add_ids([source])
 
         self.fetch_citations()
-        result = list(self._citations[source])
+        return list(self._citations[source])
+
+    def cite(self, unknown_as_text=True):
+        """
+        Compute the citation of all sources from their citation parts,
+        including those inherited from their higher sources. This only
+        needs the queries done by `fetch_citations`, whatever the number of
+        sources.
+        :returntype: dict of source id -> Source_Citation
+        """
+        logger.debug('SourceSet.cite')
+        self.fetch_citations()
+
+        result = {}
+        for id, source in self.sources.items():
+            parts = {
+                '_title': source.title,
+                '_abbrev': source.abbrev,
+                '_biblio': source.biblio,
+            }
+            # The parts of the source override those of higher sources
+            for c in reversed(self._citations[id]):
+                parts[self._type_names[c.name]] = c.value
+
+            result[id] = Citations.get_citation(
+                source.medium or self._medium[id]
+            ).expand(parts, unknown_as_text=unknown_as_text)
 
-        for h in self._higher[source]:
-            for c in self._citations[h]:
-                result.append(CitationDetails(
-                    name=c.name, value=c.value, fromHigh=True))
         return result
 
     def get_higher_sources(self, source):
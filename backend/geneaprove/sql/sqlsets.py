@@ -1,5 +1,10 @@
 from django.db.models import prefetch_related_objects
+from django.db.models.expressions import RawSQL
 from django.conf import settings
+import base64
+import binascii
+import collections
+import json
 import logging
 from .. import models
 
@@ -8,12 +13,20 @@ logger = logging.getLogger(__name__)
 # Add max query size for other database backends
 CHUNK_SIZE = settings.DATABASES['default']['CHUNK_SIZE']
 
+
+class Invalid_Cursor(ValueError):
+    """A pagination cursor that was not created by `encode_cursor`"""
+
+
 class SQLSet(object):
     """
     Helpers to fetch related objects.
     By default, django doesn't properly handle sqlite because it easily
     generate queries with more than 1000 parameters.
-    These various helpers can be used to break those into multiple queries.
+    These various helpers pass sets of ids as a single parameter instead
+    (a JSON array with sqlite, an array with postgresql), so that a single
+    query is needed whatever the number of ids, and the text of the query
+    does not depend on them.
     """
 
     ENGINE = settings.DATABASES['default']['ENGINE']
@@ -30,18 +43,114 @@ class SQLSet(object):
             for i in range(0, len(ids), chunk_size):
                 yield ids[i:i + chunk_size]
 
+    def sql_id_set(self, ids):
+        """
+        A subquery that returns all the given ids.
+        :returntype: (sql, params)
+        """
+        ids = [int(i) for i in ids if i is not None]
+        if 'postgresql' in self.ENGINE:
+            return ("SELECT unnest(%s::bigint[])", [ids])
+        else:
+            return ("SELECT value FROM json_each(%s)", [json.dumps(ids)])
+
+    def sql_in(self, field, ids):
+        """
+        A condition, for raw queries, that checks whether field is one of
+        the ids.
+        :returntype: (sql, params)
+        """
+        if 'postgresql' in self.ENGINE:
+            ids = [int(i) for i in ids if i is not None]
+            return (f"{field} = ANY(%s)", [ids])
+        else:
+            sql, params = self.sql_id_set(ids)
+            return (f"{field} IN ({sql})", params)
+
+    def id_set(self, ids):
+        """
+        An expression for querysets, to be used as in
+            queryset.filter(id__in=self.id_set(ids))
+        """
+        return RawSQL(*self.sql_id_set(ids))
+
     def prefetch_related(self, objects, *attrs):
         """
-        Performs a prefetch_related_objects on the list, and splits into chunks
-        to make it compatible with sqlite.
+        Similar to prefetch_related_objects, but fetches all related objects
+        for one relation in a single query, whatever the number of objects.
+        Each of attrs is a path like "characteristic__parts", where all but
+        the last relation should be foreign keys.
         Returns `objects` again, as a list, after updating related objects.
         """
         logger.debug('prefetch related %s', attrs)
         obj = list(objects)
-        for chunk in self.sql_split(obj):
-            prefetch_related_objects(chunk, *attrs)
+        for attr in attrs:
+            instances = obj
+            for name in attr.split('__'):
+                instances = self._prefetch_one(instances, name)
         return obj
 
+    def _prefetch_one(self, instances, name):
+        """
+        Fetch the relation `name` for all instances.
+        :returntype: the list of related objects
+        """
+        instances = [i for i in instances if i is not None]
+        if not instances:
+            return []
+
+        field = instances[0]._meta.get_field(name)
+
+        if field.many_to_one:
+            # A foreign key: fetch all objects that are not already known
+            missing = collections.defaultdict(list)
+            for inst in instances:
+                fk = getattr(inst, field.attname)
+                if fk is not None and not field.is_cached(inst):
+                    missing[fk].append(inst)
+
+            if missing:
+                for row in field.related_model._base_manager.filter(
+                        pk__in=self.id_set(missing.keys())):
+                    for inst in missing[row.pk]:
+                        field.set_cached_value(inst, row)
+
+            return [getattr(inst, name) for inst in instances]
+
+        elif field.one_to_many:
+            # A reverse foreign key, for which we set the same cache as
+            # django's prefetch_related_objects
+            remote = field.field
+            cache_name = remote.remote_field.get_cache_name()
+            todo = {
+                inst.pk: inst
+                for inst in instances
+                if cache_name not in getattr(
+                    inst, '_prefetched_objects_cache', {})}
+            related = collections.defaultdict(list)
+            if todo:
+                for row in field.related_model._base_manager.filter(
+                        **{f'{remote.attname}__in': self.id_set(todo.keys())}):
+                    related[getattr(row, remote.attname)].append(row)
+
+            result = []
+            for inst in instances:
+                if inst.pk in todo:
+                    qs = getattr(inst, name).all()
+                    qs._result_cache = related[inst.pk]
+                    qs._prefetch_done = True
+                    if not hasattr(inst, '_prefetched_objects_cache'):
+                        inst._prefetched_objects_cache = {}
+                    inst._prefetched_objects_cache[cache_name] = qs
+                result.extend(getattr(inst, name).all())
+            return result
+
+        else:
+            for chunk in self.sql_split(instances):
+                prefetch_related_objects(chunk, name)
+            return [r for inst in instances
+                    for r in getattr(inst, name).all()]
+
     def group_concat(self, field):
         """
         An aggregate function for the database, that takes all values for
@@ -61,28 +170,95 @@ class SQLSet(object):
 
     def sqlin(self, queryset, **kwargs):
         """
-        Return one or more querysets, after adding additional:
+        Return the queryset, after adding additional:
              WHERE  param_name IN param_value
         As opposed to django's builtin support, this works with sqlite even
-        when there are more than 1000 values.
+        when there are more than 1000 values. If the value is None, no
+        filter is added.
 
         example:
-            for q in sqlin(model.Table.objects, ids__in=[...]):
-                for row in q;
-                   ...
+            for row in sqlin(model.Table.objects, ids__in=[...]):
+                ...
         """
         assert len(kwargs) == 1
 
-        for k in kwargs:
+        for k, v in kwargs.items():
             if not k.endswith('__in'):
                 raise Exception(f'Invalid parameter {k}')
-
-        for k, v in kwargs.items():
             if v is None:
-                yield queryset
-            else:
-                for chunk in self.sql_split(v):
-                    yield queryset.filter(**{k: chunk})
+                return queryset
+            return queryset.filter(**{k: self.id_set(v)})
+
+    @staticmethod
+    def encode_cursor(*values):
+        """
+        An opaque cursor, used for keyset pagination. It encodes the sort
+        key of the last row that was returned, and is passed back by the
+        client to get the rows that come after it.
+        """
+        return base64.urlsafe_b64encode(
+            json.dumps(values).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Decode a cursor created by `encode_cursor`
+        :returntype: list of values
+        """
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (binascii.Error, ValueError):   # also UnicodeDecodeError
+            raise Invalid_Cursor(f'Invalid cursor {cursor!r}')
+        if not isinstance(values, list):
+            raise Invalid_Cursor(f'Invalid cursor {cursor!r}')
+        return values
+
+    def sql_after(self, keys, values):
+        """
+        A condition that selects the rows that sort after `values`.
+        :param keys: list of SQL expressions, the sort order
+        :param values: the values of keys for the last row already seen
+        :returntype: (sql, params)
+        """
+        if len(values) != len(keys):
+            raise Invalid_Cursor(
+                f'Expected {len(keys)} values in cursor, got {len(values)}')
+        placeholders = ", ".join(["%s"] * len(keys))
+
+        # The first test is redundant, but lets sqlite search the index,
+        # which it doesn't do for row values on expression indexes.
+        return (
+            f"{keys[0]} >= %s AND ({', '.join(keys)}) > ({placeholders})",
+            [values[0], *values])
+
+    def keyset(self, queryset, keys, *, after=None, offset=None, limit=None):
+        """
+        Keyset pagination: order the queryset on the SQL expressions in
+        `keys` (which should end with a unique column, and be backed by an
+        index), and return the rows that come after the cursor. This is much
+        faster than an offset far down the list, which needs to scan all the
+        rows before it. `offset` is only used when there is no cursor.
+        The rows are annotated with a `_cursor` attribute, to be given as
+        `after` to get the next rows.
+        """
+        table = queryset.model._meta.db_table
+        keys = [k.format(table=table) for k in keys]
+        queryset = queryset.extra(
+            select={f'_key{idx}': k for idx, k in enumerate(keys)},
+            order_by=[f'_key{idx}' for idx in range(len(keys))])
+
+        if after:
+            where, params = self.sql_after(keys, self.decode_cursor(after))
+            queryset = queryset.extra(where=[where], params=params)
+            offset = None
+
+        queryset = self.limit_offset(queryset, offset=offset, limit=limit)
+
+        result = list(queryset)
+        for r in result:
+            r._cursor = self.encode_cursor(
+                *(getattr(r, f'_key{idx}') for idx in range(len(keys))))
+        return result
 
     def limit_offset(self, queryset, *, offset=None, limit=None):
         if limit is not None:
@@ -0,0 +1,112 @@
+"""
+Maintains the person_summary table, the data needed to display persons
+"""
+
+import django.db
+import logging
+from .. import models
+from .parents import ParentLinkSet
+from .sqlsets import SQLSet
+
+logger = logging.getLogger(__name__)
+
+
+class PersonSummarySet(SQLSet):
+    """
+    Computes the sex, the birth, death and marriage dates, and the number
+    of assertions, of persons.
+
+    Only the events where the person is the principal, and that are not
+    disproved, are taken into account. When a person has several births, the
+    earliest one is used (and the latest death).
+    """
+
+    @staticmethod
+    def _query_dates(where):
+        """
+        A query that computes the birth, death and marriage dates of persons,
+        in a single pass on their events.
+        :param where: restricts the set of personas, as a condition on `p`
+        :returntype: a SQL query, returning (main_id, birth, death, marriage)
+        """
+        birth = models.Event_Type.PK_birth
+        death = models.Event_Type.PK_death
+        marriage = models.Event_Type.PK_marriage
+        return (
+            "SELECT p.main_id, "
+            f"MIN(CASE WHEN event.type_id={birth} "
+            "THEN event.date_sort END), "
+            f"MAX(CASE WHEN event.type_id={death} "
+            "THEN event.date_sort END), "
+            f"MIN(CASE WHEN event.type_id={marriage} "
+            "THEN event.date_sort END) "
+            "FROM p2e, event, persona p "
+            "WHERE p2e.event_id=event.id "
+            "AND p2e.person_id=p.id "
+            f"AND event.type_id IN ({birth}, {death}, {marriage}) "
+            f"AND p2e.role_id={models.Event_Type_Role.PK_principal} "
+            "AND NOT p2e.disproved "
+            "AND event.date_sort IS NOT NULL "
+            "AND event.date_sort <> '' "
+            f"AND {where} "
+            "GROUP BY p.main_id")
+
+    @staticmethod
+    def _query_count(table, main_id):
+        """
+        A query that counts the assertions of the person `main_id` in
+        `table` (a SQL expression)
+        """
+        return (
+            f"(SELECT COUNT(*) FROM {table}, persona p "
+            f"WHERE {table}.person_id=p.id "
+            f"AND NOT {table}.disproved "
+            f"AND p.main_id={main_id})")
+
+    def update(self, main_ids=None):
+        """
+        Recompute the summary of the given persons, or of all persons in the
+        database if `main_ids` is None.
+        """
+        if main_ids is not None:
+            main_ids = set(m for m in main_ids if m is not None)
+            if not main_ids:
+                return
+
+        logger.debug('update person_summary')
+
+        with django.db.transaction.atomic():
+            with django.db.connection.cursor() as cur:
+                where = ""
+                params = []
+                dates_where = "p.main_id IS NOT NULL"
+                dates_params = []
+                if main_ids is None:
+                    cur.execute("DELETE FROM person_summary")
+                else:
+                    in_ids, params = self.sql_in("main_id", main_ids)
+                    cur.execute(
+                        f"DELETE FROM person_summary WHERE {in_ids}", params)
+                    dates_where, dates_params = self.sql_in(
+                        "p.main_id", main_ids)
+                    in_ids, params = self.sql_in("persona.id", main_ids)
+                    where = f"AND {in_ids}"
+
+                cur.execute(
+                    "WITH dates(main_id, birth, death, marriage) AS ("
+                    f"{self._query_dates(dates_where)}) "
+                    "INSERT INTO person_summary "
+                    "(main_id, sex, birth, death, marriage, personas, "
+                    "events, characteristics) "
+                    "SELECT persona.id, "
+                    f"{ParentLinkSet._query_get_sex('persona.id')}, "
+                    "dates.birth, dates.death, dates.marriage, "
+                    "(SELECT COUNT(*) FROM persona p "
+                    "WHERE p.main_id=persona.id), "
+                    f"{self._query_count('p2e', 'persona.id')}, "
+                    f"{self._query_count('p2c', 'persona.id')} "
+                    "FROM persona "
+                    "LEFT JOIN dates ON dates.main_id=persona.id "
+                    "WHERE persona.main_id=persona.id "
+                    f"{where}",
+                    dates_params + params)
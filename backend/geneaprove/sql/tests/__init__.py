@@ -0,0 +1,3 @@
+"""
+unittest-based framework for testing units in GeneaProve.sql
+"""
@@ -0,0 +1,54 @@
+"""
+Create persons, events and assertions for the tests, one object at a time,
+so that the signals maintaining the derived tables are sent.
+"""
+
+from geneaprove import models
+
+
+class Factory(object):
+
+    def __init__(self):
+        self.researcher = models.Researcher.objects.create(name='tester')
+        self.surety = models.Surety_Scheme_Part.objects.first()
+
+    def _common(self):
+        return dict(researcher=self.researcher, surety=self.surety)
+
+    def person(self, name, sex=None):
+        """A persona, which is its own person"""
+        p = models.Persona.objects.create(display_name=name)
+        p.main_id = p.id
+        p.save()
+        if sex is not None:
+            c = models.Characteristic.objects.create(name='Sex')
+            models.Characteristic_Part.objects.create(
+                characteristic=c, name=sex,
+                type_id=models.Characteristic_Part_Type.PK_sex)
+            self.p2c(p, c)
+        return p
+
+    def event(self, type_id, date=None, place=None, name='event'):
+        return models.Event.objects.create(
+            type_id=type_id, date=date, place=place, name=name)
+
+    def p2e(self, person, event, role_id=None, source=None):
+        return models.P2E.objects.create(
+            person=person, event=event, source=source,
+            role_id=role_id or models.Event_Type_Role.PK_principal,
+            **self._common())
+
+    def p2c(self, person, characteristic, source=None):
+        return models.P2C.objects.create(
+            person=person, characteristic=characteristic, source=source,
+            **self._common())
+
+    def birth(self, child, father=None, mother=None, date=None):
+        """A birth event, with its assertions"""
+        event = self.event(models.Event_Type.PK_birth, date=date)
+        self.p2e(child, event)
+        if father is not None:
+            self.p2e(father, event, models.Event_Type_Role.PK_birth__father)
+        if mother is not None:
+            self.p2e(mother, event, models.Event_Type_Role.PK_birth__mother)
+        return event
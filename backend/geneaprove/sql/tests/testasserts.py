@@ -0,0 +1,103 @@
+"""
+unittest-based framework for testing geneaprove.sql.asserts and
+geneaprove.sql.loader
+"""
+
+import django.test
+import json
+from django.test.utils import CaptureQueriesContext
+from geneaprove import models
+from geneaprove.views.to_json import to_json
+from ..asserts import AssertList
+from ..loader import Loader
+from .factory import Factory
+
+
+class LoaderTestCase(django.test.TestCase):
+
+    def setUp(self):
+        self.f = Factory()
+
+    def test_identity(self):
+        """Objects are loaded once, and shared"""
+        f = self.f
+        place = models.Place.objects.create(name='Paris')
+        events = [f.event(models.Event_Type.PK_birth, place=place)
+                  for _ in range(3)]
+        events = list(models.Event.objects.filter(
+            id__in=[e.id for e in events]))
+
+        loader = Loader()
+        with self.assertNumQueries(1):
+            loader.prefetch_related(events, 'place')
+        with self.assertNumQueries(0):
+            self.assertEqual(len({id(e.place) for e in events}), 1)
+            self.assertIs(
+                loader.get(models.Place, [place.id])[place.id],
+                events[0].place)
+
+        # Known objects are not fetched again
+        loader = Loader()
+        loader.add([place])
+        events = list(models.Event.objects.filter(
+            id__in=[e.id for e in events]))
+        with self.assertNumQueries(0):
+            loader.prefetch_related(events, 'place')
+            self.assertIs(events[0].place, place)
+            self.assertEqual(loader.get(models.Place, [None]), {})
+
+
+class AssertListTestCase(django.test.TestCase):
+
+    def setUp(self):
+        self.f = Factory()
+        self.researcher = self.f.researcher
+
+    def create(self, count):
+        """
+        Create `count` persons, with their birth (in its own place and
+        source) and their occupation
+        """
+        f = self.f
+        for idx in range(count):
+            person = f.person(f'person{idx}')
+            place = models.Place.objects.create(name=f'place{idx}')
+            source = models.Source.objects.create(
+                title=f'source{idx}', researcher=self.researcher,
+                higher_source=models.Source.objects.create(
+                    title=f'higher{idx}', researcher=self.researcher))
+            f.p2e(person,
+                  f.event(models.Event_Type.PK_birth, date='1900',
+                          place=place),
+                  source=source)
+            c = models.Characteristic.objects.create(
+                name='Occupation', place=place)
+            models.Characteristic_Part.objects.create(
+                characteristic=c, name='farmer',
+                type=models.Characteristic_Part_Type.objects.first())
+            f.p2c(person, c, source=source)
+
+    def queries(self):
+        """Number of queries to fetch and convert all the assertions"""
+        with CaptureQueriesContext(django.db.connection) as queries:
+            asserts = AssertList()
+            asserts.fetch_asserts_subset(
+                'person',
+                models.Persona.objects.values_list('id', flat=True))
+            result = to_json(asserts)
+        return len(queries), result
+
+    def test_queries(self):
+        """The number of queries does not depend on the number of asserts"""
+        self.create(2)
+        self.queries()   # fill the caches of types
+        few, _ = self.queries()
+        self.create(8)
+        many, result = self.queries()
+        self.assertEqual(few, many)
+
+        result = json.loads(result)
+        self.assertEqual(len(result['asserts']), 20)
+        self.assertEqual(len(result['persons']), 10)
+        self.assertEqual(len(result['events']), 10)
+        self.assertEqual(len(result['places']), 10)
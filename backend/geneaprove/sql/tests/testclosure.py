@@ -0,0 +1,103 @@
+"""
+unittest-based framework for testing geneaprove.sql.closure
+"""
+
+import django.test
+import random
+from geneaprove import models
+from ..closure import AncestorClosureSet
+
+
+@django.test.override_settings(GENEAPROVE_ANCESTOR_CLOSURE=True)
+class AncestorClosureTestCase(django.test.TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        models.Persona.objects.bulk_create(
+            models.Persona(id=i, main_id=i, display_name=f'p{i}')
+            for i in range(1, 21))
+
+    def setUp(self):
+        self.closure = AncestorClosureSet()
+        self.closure.update()
+
+    def table(self):
+        return sorted(
+            models.Ancestor_Closure.objects.values_list(
+                'ancestor', 'descendant', 'generation', 'path_count'))
+
+    def change(self, removed=(), added=()):
+        """
+        Change the parent links, and check that the incremental update of
+        the closure gives the same table as a full update.
+        :param removed: list of (child, parent)
+        :param added: list of (child, parent)
+        """
+        for child, parent in removed:
+            models.Parent_Link.objects.filter(
+                child=child, parent=parent).delete()
+        models.Parent_Link.objects.bulk_create(
+            models.Parent_Link(
+                child_id=child, parent_id=parent,
+                role_id=models.Event_Type_Role.PK_birth__father)
+            for child, parent in added)
+
+        self.closure.apply(set(removed), set(added))
+        incremental = self.table()
+        self.closure.update()
+        self.assertEqual(incremental, self.table())
+        return incremental
+
+    def test_add(self):
+        """Links added one at a time, or together"""
+        self.assertEqual(self.change(added=[(1, 2)]), [(2, 1, 1, 1)])
+        self.change(added=[(2, 3)])
+        self.change(added=[(4, 1), (3, 5), (6, 5)])
+        self.assertIn((5, 4, 4, 1), self.table())
+
+    def test_remove(self):
+        """Links removed in the middle of a chain"""
+        self.change(added=[(1, 2), (2, 3), (3, 4), (5, 3)])
+        self.assertEqual(
+            self.change(removed=[(2, 3)]),
+            [(2, 1, 1, 1), (3, 5, 1, 1), (4, 3, 1, 1), (4, 5, 2, 1)])
+        self.assertEqual(self.change(removed=[(1, 2), (5, 3)]),
+                         [(4, 3, 1, 1)])
+
+    def test_implex(self):
+        """Ancestors reached through several paths"""
+        # 1's parents 2 and 3 are siblings, children of 4
+        self.change(added=[(1, 2), (1, 3), (2, 4), (3, 4), (4, 5)])
+        table = self.table()
+        self.assertIn((4, 1, 2, 2), table)
+        self.assertIn((5, 1, 3, 2), table)
+
+        self.change(removed=[(3, 4)])
+        self.assertIn((4, 1, 2, 1), self.table())
+
+        self.change(removed=[(4, 5)], added=[(3, 4), (2, 5), (3, 5)])
+        self.change(removed=[(1, 2), (1, 3)])
+
+    def test_cycle(self):
+        """A link that creates a cycle rebuilds the whole table"""
+        self.change(added=[(1, 2), (2, 3)])
+        self.change(added=[(3, 1)])
+        self.assertIn((1, 1, 3, 1), self.table())
+        self.change(removed=[(3, 1)])
+        self.assertNotIn((1, 1, 3, 1), self.table())
+
+    def test_random(self):
+        """Random changes to a tree with implex"""
+        rand = random.Random(1)
+        links = set()
+        for _ in range(30):
+            removed = rand.sample(sorted(links), min(len(links), 2))
+            added = set()
+            for _ in range(rand.randint(0, 3)):
+                child = rand.randint(1, 19)
+                parent = rand.randint(child + 1, 20)
+                if (child, parent) not in links:
+                    added.add((child, parent))
+            links.difference_update(removed)
+            links.update(added)
+            self.change(removed=removed, added=sorted(added))
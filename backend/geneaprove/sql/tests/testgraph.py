@@ -0,0 +1,179 @@
+"""
+unittest-based framework for testing geneaprove.sql.graph
+"""
+
+import unittest
+from geneaprove import models
+from ..graph import FamilyGraph
+
+
+def _graph(parents=(), spouses=()):
+    """
+    A graph built in memory.
+    :param parents: list of (child, father, mother), where father or mother
+       can be None.
+    :param spouses: list of (person1, person2)
+    """
+    father = models.Event_Type_Role.PK_birth__father
+    mother = models.Event_Type_Role.PK_birth__mother
+    rows = []
+    for child, f, m in parents:
+        if f is not None:
+            rows.append((0, child, f, father))
+        if m is not None:
+            rows.append((0, child, m, mother))
+    for p1, p2 in spouses:
+        rows.append((1, p1, p2, 0))
+        rows.append((1, p2, p1, 0))
+
+    graph = FamilyGraph()
+    graph._build(rows)
+    return graph
+
+
+class SosaTestCase(unittest.TestCase):
+
+    def test_sosa(self):
+        """Sosa numbers follow the role of the parents"""
+        g = _graph(parents=[(1, 2, 3), (2, 4, 5), (3, None, 7)])
+        self.assertEqual(
+            g.get_sosa(1),
+            [(1, 1), (2, 2), (3, 3), (4, 4), (5, 5), (7, 7)])
+        self.assertEqual(g.get_implex(1), {1: 1, 2: 1, 3: 1, 4: 1, 5: 1, 7: 1})
+        self.assertEqual(g.get_cycles(1), [])
+
+        # Not in the graph
+        self.assertEqual(g.get_sosa(100), [(1, 100)])
+        self.assertEqual(g.get_sosa(100, first=2), [])
+        self.assertEqual(g.get_implex(100), {100: 1})
+
+    def test_implex(self):
+        """The parents of the decujus are cousins"""
+        g = _graph(parents=[
+            (1, 2, 3), (2, 4, 5), (3, 6, 7), (4, 8, 9), (6, 8, 9)])
+        self.assertEqual(
+            g.get_sosa(1),
+            [(1, 1), (2, 2), (3, 3), (4, 4), (5, 5), (6, 6), (7, 7),
+             (8, 8), (9, 9), (12, 8), (13, 9)])
+        implex = g.get_implex(1)
+        self.assertEqual(implex[8], 2)
+        self.assertEqual(implex[9], 2)
+        self.assertEqual(implex[4], 1)
+        self.assertEqual(sum(implex.values()), 11)
+
+        self.assertEqual(g.get_implex(1, max_depth=1), {1: 1, 2: 1, 3: 1})
+
+    def test_implex_cached(self):
+        """The implex is only computed once per version of the graph"""
+        g = _graph(parents=[(1, 2, 3)])
+        implex = g.get_implex(1)
+        self.assertIs(g.get_implex(1), implex)
+        self.assertIsNot(g.get_implex(2), implex)
+
+        g._build([])
+        self.assertEqual(g.get_implex(1), {1: 1})
+
+    def test_range(self):
+        """Only the requested Sosa numbers are returned"""
+        g = _graph(parents=[
+            (1, 2, 3), (2, 4, 5), (3, 6, 7), (4, 8, 9), (6, 8, 9)])
+        self.assertEqual(g.get_sosa(1, first=4, last=7),
+                         [(4, 4), (5, 5), (6, 6), (7, 7)])
+        self.assertEqual(g.get_sosa(1, first=12, last=20),
+                         [(12, 8), (13, 9)])
+        self.assertEqual(g.get_sosa(1, first=10, last=11), [])
+        self.assertEqual(g.get_sosa(1, first=3, last=2), [])
+        self.assertEqual(g.get_sosa(1, max_depth=1),
+                         [(1, 1), (2, 2), (3, 3)])
+
+    def test_cycle(self):
+        """A person who is their own ancestor does not loop"""
+        g = _graph(parents=[(1, 6, None), (6, 7, None), (7, None, 15),
+                            (15, 1, None)])
+        self.assertEqual(g.get_cycles(1), [(15, 1)])
+        self.assertEqual(g.get_implex(1), {1: 1, 6: 1, 7: 1, 15: 1})
+        self.assertEqual(g.get_sosa(1), [(1, 1), (2, 6), (4, 7), (9, 15)])
+
+        # Starting from another person of the cycle
+        self.assertEqual(g.get_cycles(7), [(6, 7)])
+        self.assertEqual(g.get_sosa(7), [(1, 7), (3, 15), (6, 1), (12, 6)])
+
+
+class RelationTestCase(unittest.TestCase):
+
+    def test_siblings(self):
+        """Only the nearest common ancestors are returned"""
+        g = _graph(parents=[(1, 3, 4), (2, 3, 4), (3, 5, 6), (4, 7, 8)])
+        r = g.get_relation(1, 2)
+        self.assertEqual((r.gen1, r.gen2), (1, 1))
+        self.assertEqual(r.ancestors, [3, 4])
+        self.assertEqual(sorted(r.paths), [[1, 3, 2], [1, 4, 2]])
+        self.assertEqual(r.others, ())
+
+    def test_cousins(self):
+        """The search goes up on both sides"""
+        g = _graph(parents=[(1, 3, None), (2, 4, None), (3, 5, None),
+                            (4, 6, None), (6, 7, None), (5, 7, None)])
+        r = g.get_relation(1, 2)
+        self.assertEqual((r.gen1, r.gen2), (3, 3))
+        self.assertEqual(r.paths, [[1, 3, 5, 7, 6, 4, 2]])
+
+        # Not far enough
+        self.assertIsNone(g.get_relation(1, 2, max_depth=2))
+
+        # Removed cousins
+        r = g.get_relation(3, 2)
+        self.assertEqual((r.gen1, r.gen2), (2, 3))
+        self.assertEqual(r.paths, [[3, 5, 7, 6, 4, 2]])
+
+    def test_ancestor(self):
+        """One person is the common ancestor"""
+        g = _graph(parents=[(1, 2, None), (2, 3, None)])
+        r = g.get_relation(1, 3)
+        self.assertEqual((r.gen1, r.gen2), (2, 0))
+        self.assertEqual(r.paths, [[1, 2, 3]])
+
+        r = g.get_relation(3, 1)
+        self.assertEqual((r.gen1, r.gen2), (0, 2))
+        self.assertEqual(r.paths, [[3, 2, 1]])
+
+        r = g.get_relation(1, 1)
+        self.assertEqual((r.gen1, r.gen2), (0, 0))
+
+    def test_unrelated(self):
+        g = _graph(parents=[(1, 2, None), (3, 4, None)], spouses=[(2, 4)])
+        self.assertIsNone(g.get_relation(1, 3))
+        self.assertIsNone(g.get_relation(1, 100))
+
+    def test_splits(self):
+        """Common ancestors at the same distance, split differently"""
+        # 40 is the grandfather of 10 and the father of 20, and 50 is the
+        # mother of 10 and the grandmother of 20
+        g = _graph(parents=[(10, 30, 50), (30, 40, None), (20, 40, 60),
+                            (60, None, 50)])
+        r = g.get_relation(10, 20)
+        self.assertEqual((r.gen1, r.gen2), (1, 2))
+        self.assertEqual(r.ancestors, [50])
+        self.assertEqual(r.paths, [[10, 50, 60, 20]])
+        self.assertEqual(len(r.others), 1)
+        self.assertEqual((r.others[0].gen1, r.others[0].gen2), (2, 1))
+        self.assertEqual(r.others[0].ancestors, [40])
+        self.assertEqual(r.others[0].paths, [[10, 30, 40, 20]])
+
+    def test_max_paths(self):
+        """The number of paths is limited"""
+        # 1 and 2 are siblings, and each of their parents has the same
+        # parents
+        g = _graph(parents=[(1, 3, 4), (2, 3, 4), (3, 5, 6), (4, 5, 6)])
+        r = g.get_relation(1, 2)
+        self.assertEqual(r.ancestors, [3, 4])
+        self.assertEqual(len(g.get_relation(1, 2, max_paths=1).paths), 1)
+
+        # Now going through the implex
+        g = _graph(parents=[(1, 3, 4), (2, 7, None), (7, 5, None),
+                            (3, 5, 6), (4, 5, 6)])
+        r = g.get_relation(1, 2)
+        self.assertEqual((r.gen1, r.gen2), (2, 2))
+        self.assertEqual(r.ancestors, [5])
+        self.assertEqual(sorted(r.paths), [[1, 3, 5, 7, 2], [1, 4, 5, 7, 2]])
+        self.assertEqual(len(g.get_relation(1, 2, max_paths=1).paths), 1)
@@ -0,0 +1,104 @@
+"""
+unittest-based framework for testing geneaprove.sql.lifespans, and the
+signals that keep the lifespan table up-to-date
+"""
+
+import datetime
+import django.test
+from geneaprove import models
+from geneaprove.models.theme.checks import Check_Different
+from geneaprove.models.theme.rules import Alive
+from ..lifespans import LifespanSet
+from ..personas import PersonSet
+from .factory import Factory
+
+
+class LifespanTestCase(django.test.TestCase):
+
+    def setUp(self):
+        self.f = Factory()
+
+    def lifespan(self, person):
+        span = models.Lifespan.objects.get(person=person.main_id)
+        return (span.start, span.end, span.birth_known, span.death_known)
+
+    def test_estimates(self):
+        """Lifespans are estimated from the dated events"""
+        f = self.f
+        john = f.person('John')
+        f.birth(john, date='1900')
+        self.assertEqual(self.lifespan(john), (1900, 2010, True, False))
+
+        death = f.event(models.Event_Type.PK_death, date='1950')
+        f.p2e(john, death)
+        self.assertEqual(self.lifespan(john), (1900, 1950, True, True))
+
+        # Other events only give bounds
+        mary = f.person('Mary')
+        f.p2e(mary, f.event(models.Event_Type.PK_marriage, date='1920'))
+        f.p2e(mary, f.event(models.Event_Type.PK_marriage, date='1930'))
+        self.assertEqual(self.lifespan(mary), (1820, 2030, False, False))
+
+        with self.settings(GENEAPROVE_MAX_LIFESPAN=50):
+            LifespanSet().update()
+        self.assertEqual(self.lifespan(mary), (1880, 1970, False, False))
+
+    def test_signals(self):
+        """The table follows the changes to events and assertions"""
+        f = self.f
+        john = f.person('John')
+        birth = f.birth(john, date='1900')
+
+        birth.date = '1910'
+        birth.save()
+        self.assertEqual(self.lifespan(john)[0], 1910)
+
+        models.P2E.objects.get(event=birth).delete()
+        self.assertFalse(models.Lifespan.objects.filter(person=john.id))
+
+    def test_alive(self):
+        """Persons that might have been alive at some date"""
+        f = self.f
+        john = f.person('John')
+        mary = f.person('Mary')
+        unknown = f.person('Unknown')
+        f.birth(john, date='1900')
+        f.birth(mary, date='1990')
+
+        spans = LifespanSet()
+        self.assertEqual(spans.get_alive(1905, 1905), {john.id})
+        self.assertEqual(spans.get_alive(2000, 2005), {john.id, mary.id})
+        self.assertEqual(spans.get_alive(2020, 2020, include_unknown=True),
+                         {mary.id, unknown.id})
+
+        # Only some persons
+        self.assertEqual(
+            spans.get_alive(2000, 2000, include_unknown=True,
+                            main_ids=[john.id, unknown.id]),
+            {john.id, unknown.id})
+        self.assertEqual(
+            spans.get_alive(2000, 2000, main_ids=[mary.id]), {mary.id})
+        self.assertEqual(spans.get_alive(2000, 2000, main_ids=[]), set())
+
+    def test_rule(self):
+        """The Alive rule only checks the persons it displays"""
+        f = self.f
+        this_year = datetime.datetime.now().year
+        old = f.person('Old')
+        f.p2e(old, f.event(models.Event_Type.PK_marriage, date='1800'))
+        young = f.person('Young')
+        f.p2e(young, f.event(models.Event_Type.PK_marriage,
+                             date=str(this_year - 10)))
+        f.person('Unknown')
+
+        persons = PersonSet()
+        persons.add_ids(ids=[old.id, young.id])
+        precomputed = {}
+        rule = Alive(alive=Check_Different(False))
+        rule.prepare(persons, precomputed)
+        self.assertEqual(precomputed[rule.id], {young.id})
+
+        statuses = {rule.id: {}}
+        for p in persons.persons.values():
+            rule.initial(p, precomputed, statuses)
+        self.assertEqual(statuses[rule.id], {old.id: False, young.id: True})
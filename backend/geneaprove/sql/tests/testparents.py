@@ -0,0 +1,90 @@
+"""
+unittest-based framework for testing geneaprove.sql.parents, and the
+signals that keep parent_link up-to-date
+"""
+
+import django.test
+from geneaprove import models
+from .factory import Factory
+
+
+class ParentLinkTestCase(django.test.TestCase):
+
+    def setUp(self):
+        self.f = Factory()
+
+    def parents(self, child):
+        return sorted(
+            models.Parent_Link.objects
+            .filter(child=child.main_id)
+            .values_list('parent', 'role', 'sex'))
+
+    def test_birth(self):
+        """Links are created when the assertions are saved"""
+        f = self.f
+        john = f.person('John', sex='M')
+        peter = f.person('Peter', sex='M')
+        mary = f.person('Mary')
+        birth = f.birth(john, father=peter, date='1960')
+
+        father = models.Event_Type_Role.PK_birth__father
+        mother = models.Event_Type_Role.PK_birth__mother
+        self.assertEqual(self.parents(john), [(peter.id, father, 'M')])
+
+        p2e = f.p2e(mary, birth, mother)
+        self.assertEqual(
+            self.parents(john),
+            [(peter.id, father, 'M'), (mary.id, mother, None)])
+
+        # The sex of the parent is updated
+        c = models.Characteristic.objects.create(name='Sex')
+        models.Characteristic_Part.objects.create(
+            characteristic=c, name='F',
+            type_id=models.Characteristic_Part_Type.PK_sex)
+        f.p2c(mary, c)
+        self.assertIn((mary.id, mother, 'F'), self.parents(john))
+
+        p2e.delete()
+        self.assertEqual(self.parents(john), [(peter.id, father, 'M')])
+
+    def test_moved(self):
+        """An assertion moved to another event updates both events"""
+        f = self.f
+        john = f.person('John')
+        paul = f.person('Paul')
+        peter = f.person('Peter')
+        f.birth(paul)
+        birth = f.birth(john)
+        p2e = f.p2e(peter, birth, models.Event_Type_Role.PK_birth__father)
+        self.assertEqual(len(self.parents(john)), 1)
+
+        p2e.event = models.Event.objects.get(actors__person=paul)
+        p2e.save()
+        self.assertEqual(self.parents(john), [])
+        self.assertEqual(
+            [p for p, _, _ in self.parents(paul)], [peter.id])
+
+        # The child is moved to another person
+        child = models.P2E.objects.get(
+            event=p2e.event, role_id=models.Event_Type_Role.PK_principal)
+        child.person = john
+        child.save()
+        self.assertEqual(self.parents(paul), [])
+        self.assertEqual(
+            [p for p, _, _ in self.parents(john)], [peter.id])
+
+    def test_lifespan(self):
+        """The lifespans follow the assertions"""
+        f = self.f
+        john = f.person('John')
+        paul = f.person('Paul')
+        birth = f.birth(john, date='1960')
+        self.assertEqual(
+            models.Lifespan.objects.get(person=john.id).start, 1960)
+
+        p2e = models.P2E.objects.get(event=birth)
+        p2e.person = paul
+        p2e.save()
+        self.assertFalse(models.Lifespan.objects.filter(person=john.id))
+        self.assertEqual(
+            models.Lifespan.objects.get(person=paul.id).start, 1960)
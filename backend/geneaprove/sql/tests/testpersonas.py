@@ -0,0 +1,100 @@
+"""
+unittest-based framework for testing geneaprove.sql.personas
+"""
+
+import django.test
+import json
+from geneaprove import models
+from geneaprove.views.to_json import to_json
+from ..personas import PersonRow, PersonSet, Relationship
+from .factory import Factory
+
+
+class PersonRowTestCase(django.test.TestCase):
+    """The read-only persons give the same result as the personas"""
+
+    def setUp(self):
+        f = Factory()
+        self.john = f.person('John Smith', sex='M')
+        self.mary = f.person('Mary Smith', sex='F')
+        self.paul = f.person('Paul Smith')
+        self.paul.description = 'the younger'
+        self.paul.save()
+        f.birth(self.john, date='1900')
+        f.p2e(self.john, f.event(models.Event_Type.PK_death, date='1970'))
+        marriage = f.event(models.Event_Type.PK_marriage, date='1925')
+        f.p2e(self.john, marriage)
+        f.p2e(self.mary, marriage)
+        f.birth(self.paul, father=self.john, mother=self.mary, date='1930')
+        self.unknown = f.person('')
+
+        # Merged persona
+        johnny = f.person('Johnny Smith')
+        johnny.main_id = self.john.id
+        johnny.save()
+
+    def compare(self, fill, queries=1):
+        """Same JSON for a PersonSet and a read-only one"""
+        persons = PersonSet()
+        rows = PersonSet(readonly=True)
+        fill(persons)
+        with self.assertNumQueries(queries):
+            fill(rows)
+        self.assertTrue(rows.persons)
+        self.assertTrue(all(
+            isinstance(p, PersonRow) for p in rows.persons.values()))
+        expected = json.loads(to_json(persons))
+        with self.assertNumQueries(0):
+            self.assertEqual(json.loads(to_json(rows)), expected)
+        return expected
+
+    def test_add_ids(self):
+        everyone = self.compare(lambda s: s.add_ids())
+        self.assertEqual(len(everyone['persons']), 4)
+        john = [p for p in everyone['persons'] if p['id'] == self.john.id][0]
+        self.assertEqual(
+            (john['sex'], john['birthISODate'], john['deathISODate'],
+             john['marriageISODate']),
+            ('M', '1900-01-01', '1970-01-01', '1925-01-01'))
+
+        self.compare(lambda s: s.add_ids(ids=[self.paul.id, self.mary.id]))
+        self.compare(lambda s: s.add_ids(limit=2, offset=1))
+        self.compare(lambda s: s.add_ids(compute_sex=False))
+
+    def test_folks(self):
+        """The layout is the same"""
+        result = self.compare(
+            lambda s: s.add_folks(self.paul.id, Relationship.ANCESTORS),
+            queries=2)
+        self.assertEqual(
+            sorted(p['id'] for p in result['persons']),
+            [self.john.id, self.mary.id, self.paul.id])
+        self.assertEqual(
+            sorted(result['layout'][str(self.paul.id)]['parents']),
+            [self.john.id, self.mary.id])
+
+
+class FetchP2ETestCase(django.test.TestCase):
+
+    def test_fetch_p2e(self):
+        """All events by default, except the disproved assertions"""
+        f = Factory()
+        john = f.person('John')
+        f.birth(john, date='1900')
+        f.p2e(john, f.event(models.Event_Type.PK_death, date='1970'))
+        disproved = f.p2e(john, f.event(models.Event_Type.PK_marriage))
+        disproved.disproved = True
+        disproved.save()
+
+        def types(event_types=None):
+            persons = PersonSet()
+            persons.add_ids(ids=[john.id])
+            persons.fetch_p2e(event_types=event_types)
+            return sorted(a.event.type_id for a in persons.asserts)
+
+        self.assertEqual(
+            types(),
+            [models.Event_Type.PK_birth, models.Event_Type.PK_death])
+        self.assertEqual(
+            types([models.Event_Type.PK_death]),
+            [models.Event_Type.PK_death])
@@ -0,0 +1,121 @@
+"""
+unittest-based framework for testing geneaprove.sql.search, and the
+signals that keep search_index up-to-date
+"""
+
+import django.test
+import os
+from geneaprove import models
+from geneaprove.importers.gedcomimport import GedcomFileImporter
+from ..personas import PersonSet
+from ..search import SearchIndexSet
+
+
+def _person(name):
+    """Create a persona, which is its own person"""
+    p = models.Persona.objects.create(display_name=name)
+    p.main_id = p.id
+    p.save()
+    return p
+
+
+class SearchIndexTestCase(django.test.TestCase):
+
+    def found(self, text):
+        """The persons whose name matches text"""
+        _, results = SearchIndexSet().search(text, kinds=['person'])
+        return sorted(id for _, id, _ in results)
+
+    def documents(self):
+        """The rowids of all documents for persons"""
+        with django.db.connection.cursor() as cur:
+            cur.execute(
+                "SELECT rowid FROM search_index "
+                f"WHERE (rowid & 3) = {SearchIndexSet.PERSON}")
+            return sorted(row[0] for row in cur.fetchall())
+
+    def test_persons(self):
+        """Persons are indexed when they are saved"""
+        john = _person('John Smith')
+        mary = _person('Mary Smith')
+        self.assertEqual(self.found('smith'), [john.id, mary.id])
+        self.assertEqual(self.found('joh'), [john.id])
+
+        mary.display_name = 'Mary Jones'
+        mary.save()
+        self.assertEqual(self.found('smith'), [john.id])
+
+    def test_merge(self):
+        """Documents follow the personas when they change person"""
+        john = _person('John Smith')
+        johnny = _person('Johnny Smith')
+        rowid = SearchIndexSet.rowid
+
+        johnny.main_id = john.id
+        johnny.save()
+        self.assertEqual(self.found('johnny'), [john.id])
+        self.assertEqual(
+            self.documents(), [rowid(SearchIndexSet.PERSON, john.id)])
+
+        # Updating the new person also removes the old document
+        with django.db.connection.cursor() as cur:
+            cur.execute(
+                "INSERT INTO search_index (rowid, name) VALUES (%s, %s)",
+                [rowid(SearchIndexSet.PERSON, johnny.id), 'Johnny'])
+        SearchIndexSet().update([john.id])
+        self.assertEqual(
+            self.documents(), [rowid(SearchIndexSet.PERSON, john.id)])
+
+        # Unmerge
+        johnny.main_id = johnny.id
+        johnny.save()
+        self.assertEqual(self.found('johnny'), [johnny.id])
+        self.assertEqual(self.found('john'), [john.id, johnny.id])
+
+    def test_import(self):
+        """The import does not update the index for each object"""
+        with self.assertLogs('geneaprove', 'DEBUG') as logs:
+            success, msg = GedcomFileImporter().parse(os.path.join(
+                os.path.dirname(__file__), '..', '..', 'views', 'tests',
+                'family.ged'))
+        self.assertTrue(success, msg)
+        self.assertFalse(
+            [r for r in logs.output if 'update search_index' in r])
+        self.assertEqual(self.documents(), [])
+
+        PersonSet.recompute_main_ids()
+        self.assertEqual(len(self.found('smith')), 6)
+        self.assertEqual(SearchIndexSet().search('paris')[0]['place'], 1)
+
+    def test_places_sources(self):
+        """Places and sources are indexed when they are saved"""
+        def found(text, kind):
+            _, results = SearchIndexSet().search(text, kinds=[kind])
+            return sorted(id for _, id, _ in results)
+
+        paris = models.Place.objects.create(name='Paris')
+        self.assertEqual(found('paris', 'place'), [paris.id])
+
+        part = models.Place_Part.objects.create(
+            place=paris, name='Ile-de-France',
+            type=models.Place_Part_Type.objects.create(name='region'))
+        self.assertEqual(found('france', 'place'), [paris.id])
+        part.delete()
+        self.assertEqual(found('france', 'place'), [])
+
+        paris.name = 'Lutece'
+        paris.save()
+        self.assertEqual(found('paris', 'place'), [])
+        self.assertEqual(found('lutece', 'place'), [paris.id])
+
+        source = models.Source.objects.create(
+            abbrev='Register', title='Parish register of Lutece',
+            researcher=models.Researcher.objects.create(name='tester'))
+        self.assertEqual(found('parish', 'source'), [source.id])
+        self.assertEqual(
+            sorted(k for k, _, _ in SearchIndexSet().search('lutece')[1]),
+            ['place', 'source'])
+
+        source.delete()
+        paris.delete()
+        self.assertEqual(SearchIndexSet().search('lutece')[1], [])
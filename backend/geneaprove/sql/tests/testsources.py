@@ -0,0 +1,75 @@
+"""
+unittest-based framework for testing geneaprove.sql.sources
+"""
+
+import django.test
+from geneaprove import models
+from ..sources import HigherSourcesCache
+
+
+class HigherSourcesTestCase(django.test.TestCase):
+
+    def setUp(self):
+        researcher = models.Researcher.objects.create(name='tester')
+        self.page = models.Citation_Part_Type.objects.create(name='page')
+        self.book = models.Source.objects.create(
+            title='Book', medium='book', researcher=researcher)
+        self.chapter = models.Source.objects.create(
+            title='Chapter', higher_source=self.book, researcher=researcher)
+        self.page12 = models.Source.objects.create(
+            title='Page 12', higher_source=self.chapter,
+            researcher=researcher)
+        self.other = models.Source.objects.create(
+            title='Other', researcher=researcher)
+        models.Citation_Part.objects.create(
+            source=self.book, type=self.page, value='1-200')
+        models.Citation_Part.objects.create(
+            source=self.page12, type=self.page, value='12')
+        self.cache = HigherSourcesCache()
+
+    def test_higher(self):
+        """The higher sources, nearest first, and inherited parts"""
+        higher, citations, medium, names = self.cache.get(
+            [self.page12.id, self.other.id])
+        self.assertEqual(
+            higher,
+            {self.page12.id: [self.chapter.id, self.book.id],
+             self.other.id: []})
+        self.assertEqual(
+            [(names[c.name], c.value, c.fromHigh)
+             for c in citations[self.page12.id]],
+            [('page', '12', False), ('page', '1-200', True)])
+        self.assertEqual(
+            medium, {self.page12.id: 'book', self.other.id: None})
+
+    def test_cycle(self):
+        """A cycle in the higher sources does not loop forever"""
+        self.book.higher_source = self.page12
+        self.book.save()
+        higher, _, _, _ = self.cache.get([self.page12.id])
+        self.assertEqual(
+            set(higher[self.page12.id]),
+            {self.chapter.id, self.book.id, self.page12.id})
+
+    def test_cache(self):
+        """The cache is invalidated when sources or parts change"""
+        self.cache.get([self.page12.id])
+        with self.assertNumQueries(1):   # only the change counter
+            self.cache.get([self.page12.id])
+
+        # A new citation part in a higher source
+        models.Citation_Part.objects.create(
+            source=self.chapter, type=self.page, value='10-20')
+        _, citations, _, _ = self.cache.get([self.page12.id])
+        self.assertEqual(
+            [c.value for c in citations[self.page12.id]],
+            ['12', '10-20', '1-200'])
+
+        # A different higher source
+        self.page12.higher_source = self.other
+        self.page12.save()
+        higher, citations, medium, _ = self.cache.get([self.page12.id])
+        self.assertEqual(higher[self.page12.id], [self.other.id])
+        self.assertEqual(
+            [c.value for c in citations[self.page12.id]], ['12'])
+        self.assertIsNone(medium[self.page12.id])
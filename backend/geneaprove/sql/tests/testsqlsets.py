@@ -0,0 +1,172 @@
+"""
+unittest-based framework for testing geneaprove.sql.sqlsets
+"""
+
+import base64
+import django.test
+from geneaprove import models
+from ..personas import PersonSet
+from ..sqlsets import SQLSet, CHUNK_SIZE, Invalid_Cursor
+
+
+class IdSetTestCase(django.test.TestCase):
+    """Sets of ids larger than the limit on query parameters"""
+
+    COUNT = 3 * CHUNK_SIZE
+
+    @classmethod
+    def setUpTestData(cls):
+        models.Place.objects.bulk_create(
+            models.Place(id=i, name=f'place{i}')
+            for i in range(1, cls.COUNT + 1))
+        part_type = models.Place_Part_Type.objects.create(name='city')
+        models.Place_Part.objects.bulk_create(
+            models.Place_Part(place_id=i, type=part_type, name=f'city{i}')
+            for i in range(1, cls.COUNT + 1, 2))
+
+    def test_sqlin(self):
+        """A single query, whatever the number of ids"""
+        s = SQLSet()
+        ids = list(range(2, self.COUNT + 10, 2))   # some do not exist
+        with self.assertNumQueries(1):
+            found = list(
+                s.sqlin(models.Place.objects, id__in=ids)
+                .values_list('id', flat=True))
+        self.assertEqual(sorted(found), list(range(2, self.COUNT + 1, 2)))
+
+        self.assertEqual(
+            s.sqlin(models.Place.objects, id__in=None).count(), self.COUNT)
+        self.assertEqual(
+            s.sqlin(models.Place.objects, id__in=[]).count(), 0)
+        self.assertEqual(
+            s.sqlin(models.Place.objects, id__in=[None, '3']).count(), 1)
+        with self.assertRaises(Exception):
+            s.sqlin(models.Place.objects, id=[1])
+
+    def test_sql_in(self):
+        """Conditions for raw queries"""
+        s = SQLSet()
+        where, params = s.sql_in('id', range(1, self.COUNT + 1))
+        self.assertEqual(len(params), 1)
+        with django.db.connection.cursor() as cur:
+            cur.execute(f"SELECT COUNT(*) FROM place WHERE {where}", params)
+            self.assertEqual(cur.fetchone()[0], self.COUNT)
+
+            where, params = s.sql_in('id', [])
+            cur.execute(f"SELECT COUNT(*) FROM place WHERE {where}", params)
+            self.assertEqual(cur.fetchone()[0], 0)
+
+    def test_prefetch_related(self):
+        """One query per relation"""
+        s = SQLSet()
+        parts = list(models.Place_Part.objects.all())
+        with self.assertNumQueries(1):
+            s.prefetch_related(parts, 'place')
+        with self.assertNumQueries(0):
+            self.assertEqual(parts[0].place.name, 'place1')
+
+        places = list(models.Place.objects.all())
+        with self.assertNumQueries(1):
+            s.prefetch_related(places, 'parts')
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [len(p.parts.all()) for p in places[:4]], [1, 0, 1, 0])
+
+        # Already known objects are not fetched again
+        with self.assertNumQueries(0):
+            s.prefetch_related(places, 'parts')
+
+
+class KeysetTestCase(django.test.TestCase):
+    """Keyset pagination"""
+
+    @classmethod
+    def setUpTestData(cls):
+        researcher = models.Researcher.objects.create(name='tester')
+        # Duplicate and NULL sort keys
+        for abbrev, title in [('b', 'x'), (None, 'y'), ('A', None),
+                              ('a', 'z'), (None, None), ('b', 'x')]:
+            models.Source.objects.create(
+                abbrev=abbrev, title=title, researcher=researcher)
+        for name in ['Smith', 'jones', 'Smith', 'Adams', 'smith']:
+            p = models.Persona.objects.create(display_name=name)
+            p.main_id = p.id
+            p.save()
+
+    def pages(self, fetch, limit):
+        """
+        All the pages returned by `fetch(after, limit)`, following the
+        cursors
+        """
+        result = []
+        after = None
+        while True:
+            page = fetch(after, limit)
+            result.append([o.id for o in page])
+            if len(page) < limit:
+                return result
+            after = page[-1]._cursor
+
+    def test_cursor(self):
+        s = SQLSet()
+        self.assertEqual(
+            s.decode_cursor(s.encode_cursor('smith', 12)), ['smith', 12])
+        self.assertEqual(s.decode_cursor(s.encode_cursor('', None)),
+                         ['', None])
+
+        for invalid in ['foo', '!!!', s.encode_cursor()[:-2],
+                        base64.urlsafe_b64encode(b'{"a": 1}').decode(),
+                        base64.urlsafe_b64encode(b'\xff').decode()]:
+            with self.assertRaises(Invalid_Cursor, msg=invalid):
+                s.decode_cursor(invalid)
+
+        with self.assertRaises(Invalid_Cursor):
+            s.sql_after(['a', 'b'], ['x'])
+
+    def test_keyset(self):
+        s = SQLSet()
+        keys = ["COALESCE(lower({table}.abbrev), '')",
+                "COALESCE(lower({table}.title), '')",
+                "{table}.id"]
+        all_sources = [
+            o.id for o in s.keyset(models.Source.objects.all(), keys)]
+        self.assertEqual(len(all_sources), 6)
+        self.assertEqual(
+            [models.Source.objects.get(id=id).abbrev
+             for id in all_sources],
+            [None, None, 'A', 'a', 'b', 'b'])
+
+        for limit in (1, 2, 4, 6):
+            pages = self.pages(
+                lambda after, limit: s.keyset(
+                    models.Source.objects.all(), keys,
+                    after=after, limit=limit),
+                limit)
+            self.assertEqual(sum(pages, []), all_sources)
+
+        # The offset is ignored when there is a cursor
+        first = s.keyset(models.Source.objects.all(), keys, limit=2)
+        self.assertEqual(
+            [o.id for o in s.keyset(
+                models.Source.objects.all(), keys,
+                after=first[-1]._cursor, offset=3, limit=2)],
+            all_sources[2:4])
+
+    def test_persons(self):
+        def fetch(readonly):
+            def _fetch(after, limit):
+                persons = PersonSet(readonly=readonly)
+                persons.add_ids(after=after, limit=limit)
+                return list(persons.persons.values())
+            return _fetch
+
+        all_persons = [p.id for p in fetch(False)(None, None)]
+        self.assertEqual(
+            [models.Persona.objects.get(id=id).display_name.lower()
+             for id in all_persons],
+            ['adams', 'jones', 'smith', 'smith', 'smith'])
+
+        for readonly in (False, True):
+            for limit in (1, 2, 3):
+                pages = self.pages(fetch(readonly), limit)
+                self.assertEqual(sum(pages, []), all_persons)
@@ -0,0 +1,135 @@
+"""
+unittest-based framework for testing geneaprove.sql.summary, and the
+signals that keep person_summary up-to-date
+"""
+
+import collections
+import django.test
+import random
+from geneaprove import models
+from ..summary import PersonSummarySet
+from .factory import Factory
+
+
+class PersonSummaryTestCase(django.test.TestCase):
+
+    def setUp(self):
+        self.f = Factory()
+
+    def summary(self, person):
+        return models.Person_Summary.objects \
+            .filter(person=person.main_id) \
+            .values('sex', 'birth', 'death', 'marriage', 'personas',
+                    'events', 'characteristics') \
+            .get()
+
+    def test_dates(self):
+        """The dates follow the events and assertions"""
+        f = self.f
+        john = f.person('John', sex='M')
+        self.assertEqual(
+            self.summary(john),
+            {'sex': 'M', 'birth': None, 'death': None, 'marriage': None,
+             'personas': 1, 'events': 0, 'characteristics': 1})
+
+        f.birth(john, date='1910')
+        f.birth(john, date='1900')   # the earliest one is used
+        death = f.event(models.Event_Type.PK_death, date='1950')
+        p2e = f.p2e(john, death)
+        summary = self.summary(john)
+        self.assertEqual(
+            (summary['birth'], summary['death'], summary['events']),
+            ('1900-01-01', '1950-01-01', 3))
+
+        # Disproved assertions are ignored
+        p2e.disproved = True
+        p2e.save()
+        summary = self.summary(john)
+        self.assertEqual((summary['death'], summary['events']), (None, 2))
+
+        # A change in the date of the event
+        marriage = f.event(models.Event_Type.PK_marriage, date='1925')
+        f.p2e(john, marriage)
+        self.assertEqual(self.summary(john)['marriage'], '1925-01-01')
+        marriage.date = '1930'
+        marriage.save()
+        self.assertEqual(self.summary(john)['marriage'], '1930-01-01')
+
+        # Only principals
+        mary = f.person('Mary')
+        f.p2e(mary, marriage, models.Event_Type_Role.PK_birth__mother)
+        self.assertIsNone(self.summary(mary)['marriage'])
+
+    def test_personas(self):
+        """Merged personas"""
+        f = self.f
+        john = f.person('John')
+        johnny = f.person('Johnny', sex='M')
+        f.birth(johnny, date='1900')
+
+        johnny.main_id = john.id
+        johnny.save()
+        summary = self.summary(john)
+        self.assertEqual(
+            (summary['sex'], summary['birth'], summary['personas']),
+            ('M', '1900-01-01', 2))
+        self.assertFalse(
+            models.Person_Summary.objects.filter(person=johnny.id))
+
+        johnny.main_id = johnny.id
+        johnny.save()
+        self.assertEqual(self.summary(john)['personas'], 1)
+        self.assertEqual(self.summary(johnny)['birth'], '1900-01-01')
+
+    def test_update(self):
+        """Incremental updates give the same table as a full update"""
+        f = self.f
+        john = f.person('John', sex='M')
+        mary = f.person('Mary', sex='F')
+        f.birth(john, father=f.person('Peter'), mother=mary, date='1950')
+        expected = list(models.Person_Summary.objects.order_by('pk').values())
+        PersonSummarySet().update()
+        self.assertEqual(
+            list(models.Person_Summary.objects.order_by('pk').values()),
+            expected)
+
+    def test_aggregate(self):
+        """The dates are the same as computed from the assertions"""
+        f = self.f
+        rand = random.Random(1)
+        types = [models.Event_Type.PK_birth, models.Event_Type.PK_death,
+                 models.Event_Type.PK_marriage]
+        roles = [models.Event_Type_Role.PK_principal,
+                 models.Event_Type_Role.PK_birth__father]
+        persons = [f.person(f'p{idx}') for idx in range(10)]
+        for p in persons[5:]:   # merged personas
+            p.main_id = rand.choice(persons[:5]).id
+            p.save()
+        for _ in range(40):
+            date = rand.choice([None, '', f'{rand.randint(1800, 1900)}'])
+            p2e = f.p2e(rand.choice(persons),
+                        f.event(rand.choice(types), date=date),
+                        rand.choice(roles))
+            if rand.random() < 0.2:
+                p2e.disproved = True
+                p2e.save()
+
+        expected = collections.defaultdict(
+            lambda: {t: [] for t in types})
+        for p2e in models.P2E.objects.select_related('person', 'event'):
+            if p2e.role_id == models.Event_Type_Role.PK_principal \
+                    and not p2e.disproved and p2e.event.date_sort:
+                expected[p2e.person.main_id][p2e.event.type_id].append(
+                    p2e.event.date_sort)
+        self.assertTrue(all(
+            any(dates.values()) for dates in expected.values()))
+
+        PersonSummarySet().update()
+        for p in persons[:5]:
+            dates = expected[p.id]
+            summary = self.summary(p)
+            self.assertEqual(
+                (summary['birth'], summary['death'], summary['marriage']),
+                (min(dates[types[0]], default=None),
+                 max(dates[types[1]], default=None),
+                 min(dates[types[2]], default=None)))
@@ -0,0 +1,167 @@
+"""
+unittest-based framework for testing geneaprove.sql.timeline, and the
+signals that keep assertion_index up-to-date
+"""
+
+import django.test
+from geneaprove import models
+from ..timeline import AssertionIndexSet
+from .factory import Factory
+
+
+class AssertionIndexTestCase(django.test.TestCase):
+
+    def setUp(self):
+        self.f = Factory()
+
+    def page(self, about, ids, offset=None, limit=None):
+        return [
+            (model.__name__, id)
+            for model, id in AssertionIndexSet().get_page(
+                about, ids, offset=offset, limit=limit)]
+
+    def check_full_update(self):
+        """Incremental updates give the same table as a full update"""
+        def table():
+            return sorted(models.Assertion_Index.objects.values_list(
+                'kind', 'assertion_id', 'date_sort', 'person_id',
+                'source_id', 'place_id', 'event_id'))
+        incremental = table()
+        AssertionIndexSet().update()
+        self.assertEqual(incremental, table())
+
+    def test_order(self):
+        """Assertions are sorted by date"""
+        f = self.f
+        john = f.person('John')
+        mary = f.person('Mary')
+        f.birth(john, date='1900')
+        marriage = f.event(models.Event_Type.PK_marriage, date='1925')
+        m1 = f.p2e(john, marriage)
+        f.p2e(mary, marriage)
+        c = models.Characteristic.objects.create(name='Occupation',
+                                                 date='1910')
+        p2c = f.p2c(john, c)
+        p2p = models.P2P.objects.create(
+            person1=john, person2=mary,
+            type=models.P2P_Type.objects.create(name='friend'),
+            researcher=f.researcher, surety=f.surety)
+        birth = models.P2E.objects.get(event__type=models.Event_Type.PK_birth)
+        death = f.p2e(john, f.event(models.Event_Type.PK_death))
+
+        # Person-to-person assertions have no date, but come after undated
+        # events
+        expected = [('P2E', death.id), ('P2P', p2p.id), ('P2E', birth.id),
+                    ('P2C', p2c.id), ('P2E', m1.id)]
+        self.assertEqual(self.page('person', [john.id]), expected)
+        self.assertEqual(
+            self.page('person', [john.id], offset=1, limit=2),
+            expected[1:3])
+
+        # The person-to-person assertion is found for both persons, but
+        # only once for both
+        self.assertIn(('P2P', p2p.id), self.page('person', [mary.id]))
+        self.assertEqual(
+            len(self.page('person', [john.id, mary.id])), 6)
+
+        # A change of date moves the assertion
+        marriage.date = '1905'
+        marriage.save()
+        self.assertEqual(self.page('person', [john.id])[3], ('P2E', m1.id))
+        self.check_full_update()
+
+    def test_about(self):
+        """Assertions about sources and places"""
+        f = self.f
+        john = f.person('John')
+        place = models.Place.objects.create(name='Paris')
+        source = models.Source.objects.create(
+            title='Register', researcher=f.researcher)
+        event = f.event(models.Event_Type.PK_birth, date='1900', place=place)
+        p2e = f.p2e(john, event, source=source)
+        self.assertEqual(self.page('place', [place.id]), [('P2E', p2e.id)])
+        self.assertEqual(self.page('source', [source.id]), [('P2E', p2e.id)])
+
+        p2e.source = None
+        p2e.save()
+        event.place = None
+        event.save()
+        self.assertEqual(self.page('source', [source.id]), [])
+        self.assertEqual(self.page('place', [place.id]), [])
+        self.check_full_update()
+
+    def test_moved(self):
+        """Assertions follow the personas and persons they are about"""
+        f = self.f
+        john = f.person('John')
+        johnny = f.person('Johnny')
+        paul = f.person('Paul')
+        p2e = f.p2e(johnny, f.event(models.Event_Type.PK_birth))
+
+        johnny.main_id = john.id
+        johnny.save()
+        self.assertEqual(self.page('person', [john.id]), [('P2E', p2e.id)])
+        self.assertEqual(self.page('person', [johnny.id]), [])
+
+        p2e.person = paul
+        p2e.save()
+        self.assertEqual(self.page('person', [john.id]), [])
+        self.assertEqual(self.page('person', [paul.id]), [('P2E', p2e.id)])
+
+        p2e.delete()
+        self.assertEqual(self.page('person', [paul.id]), [])
+        self.check_full_update()
+
+    def test_count(self):
+        """The counters follow the assertions"""
+        f = self.f
+        john = f.person('John')
+        mary = f.person('Mary')
+        place = models.Place.objects.create(name='Paris')
+        source = models.Source.objects.create(
+            title='Register', researcher=f.researcher)
+        marriage = f.event(
+            models.Event_Type.PK_marriage, date='1925', place=place)
+        f.p2e(john, marriage, source=source)
+        p2e = f.p2e(mary, marriage, source=source)
+        models.P2P.objects.create(
+            person1=john, person2=mary,
+            type=models.P2P_Type.objects.create(name='friend'),
+            researcher=f.researcher, surety=f.surety)
+
+        def counts():
+            s = AssertionIndexSet()
+            result = (
+                s.count('person', [john.id]),
+                s.count('person', [mary.id]),
+                s.count('person', [john.id, mary.id]),
+                s.count('source', [source.id]),
+                s.count('place', [place.id]))
+            # Same as the number of assertions in the pages
+            self.assertEqual(
+                result,
+                (len(self.page('person', [john.id])),
+                 len(self.page('person', [mary.id])),
+                 len(self.page('person', [john.id, mary.id])),
+                 len(self.page('source', [source.id])),
+                 len(self.page('place', [place.id]))))
+            return result
+
+        self.assertEqual(counts(), (2, 2, 3, 2, 2))
+
+        p2e.person = john
+        p2e.save()
+        self.assertEqual(counts(), (3, 1, 3, 2, 2))
+
+        marriage.place = None
+        marriage.save()
+        p2e.delete()
+        self.assertEqual(counts(), (2, 1, 2, 1, 0))
+
+        incremental = sorted(models.Assertion_Count.objects.values_list(
+            'about', 'object_id', 'count'))
+        AssertionIndexSet().update()
+        self.assertEqual(
+            incremental,
+            sorted(models.Assertion_Count.objects.values_list(
+                'about', 'object_id', 'count')))
@@ -0,0 +1,289 @@
+"""
+Maintains the assertion_index table, used to paginate the assertions of
+persons, sources and places in date order, and the assertion_count table
+"""
+
+import collections
+import django.db
+import logging
+from .. import models
+from .sqlsets import SQLSet
+
+logger = logging.getLogger(__name__)
+
+
+class AssertionIndexSet(SQLSet):
+    """
+    Computes the assertion_index table from the assertions, and queries it.
+    The number of assertions of each person, source and place is stored in
+    the assertion_count table, and updated along with the index.
+
+    Assertions are sorted by the date of their event or characteristic.
+    Person-to-person and person-to-group assertions have no date, and are
+    sorted after the undated events.
+    """
+
+    KINDS = ('P2E', 'P2C', 'P2P', 'P2G')
+    # The assertion models. The value of the `kind` column is the index in
+    # this list. These are names, since geneaprove.models imports this
+    # module.
+
+    @staticmethod
+    def model(kind):
+        """The assertion model for a value of the `kind` column"""
+        return getattr(models, AssertionIndexSet.KINDS[kind])
+
+    COLUMNS = {
+        'person': 'person_main_id',
+        'source': 'source_id',
+        'place': 'place_id',
+    }
+    # The column of assertion_index for each kind of object assertions are
+    # about. The value of assertion_count.about is the index in this dict.
+
+    def _queries(self, kind):
+        """
+        The queries that compute the rows of the index for one kind of
+        assertions. Each of them has a `{where}` placeholder to restrict the
+        set of assertions.
+        Personas that have no main_id yet (while importing) are ignored,
+        their assertions are indexed when the main_id is computed.
+        :returntype: a tuple (id field, list of queries)
+        """
+        model = self.model(kind)
+        if model == models.P2E:
+            return ("p2e.id", [
+                f"SELECT {kind}, p2e.id, event.date_sort, persona.main_id, "
+                "p2e.source_id, event.place_id, p2e.event_id "
+                "FROM p2e, event, persona "
+                "WHERE p2e.event_id=event.id "
+                "AND p2e.person_id=persona.id "
+                "AND persona.main_id IS NOT NULL {where}"])
+        elif model == models.P2C:
+            return ("p2c.id", [
+                f"SELECT {kind}, p2c.id, c.date_sort, persona.main_id, "
+                "p2c.source_id, c.place_id, NULL "
+                "FROM p2c, characteristic c, persona "
+                "WHERE p2c.characteristic_id=c.id "
+                "AND p2c.person_id=persona.id "
+                "AND persona.main_id IS NOT NULL {where}"])
+        elif model == models.P2P:
+            return ("p2p.id", [
+                f"SELECT {kind}, p2p.id, '', p1.main_id, "
+                "p2p.source_id, NULL, NULL "
+                "FROM p2p, persona p1 "
+                "WHERE p2p.person1_id=p1.id "
+                "AND p1.main_id IS NOT NULL {where}",
+                f"SELECT {kind}, p2p.id, '', p2.main_id, NULL, NULL, NULL "
+                "FROM p2p, persona p1, persona p2 "
+                "WHERE p2p.person1_id=p1.id "
+                "AND p2p.person2_id=p2.id "
+                "AND p1.main_id<>p2.main_id {where}"])
+        else:
+            return ("p2g.id", [
+                f"SELECT {kind}, p2g.id, '', persona.main_id, "
+                "p2g.source_id, NULL, NULL "
+                "FROM p2g, persona "
+                "WHERE p2g.person_id=persona.id "
+                "AND persona.main_id IS NOT NULL {where}"])
+
+    def _insert(self, cur, kind, ids=None):
+        id_field, queries = self._queries(kind)
+        where = ""
+        params = []
+        if ids is not None:
+            in_ids, params = self.sql_in(id_field, ids)
+            where = f"AND {in_ids}"
+
+        for q in queries:
+            cur.execute(
+                "INSERT INTO assertion_index "
+                "(kind, assertion_id, date_sort, person_main_id, source_id, "
+                "place_id, event_id) " + q.format(where=where),
+                params)
+
+    def update(self, main_ids=None):
+        """
+        Recompute the index for all assertions of the given persons, or for
+        all assertions in the database if `main_ids` is None.
+        """
+        if main_ids is not None:
+            main_ids = set(m for m in main_ids if m is not None)
+            if not main_ids:
+                return
+
+        logger.debug('update assertion_index')
+
+        if main_ids is None:
+            with django.db.transaction.atomic():
+                with django.db.connection.cursor() as cur:
+                    cur.execute("DELETE FROM assertion_index")
+                    for kind in range(len(self.KINDS)):
+                        self._insert(cur, kind)
+                    self._update_counts(cur, None)
+            return
+
+        # The assertions currently indexed for the persons (in case they
+        # now belong to other persons) and those that now belong to them.
+        assertions = collections.defaultdict(set)  # kind -> set of ids
+        for kind, id in self.sqlin(
+                models.Assertion_Index.objects, person_id__in=main_ids) \
+                .values_list('kind', 'assertion_id'):
+            assertions[kind].add(id)
+
+        for kind in range(len(self.KINDS)):
+            model = self.model(kind)
+            if model == models.P2P:
+                for field in ('person1__main_id__in', 'person2__main_id__in'):
+                    assertions[kind].update(
+                        self.sqlin(model.objects, **{field: main_ids})
+                        .values_list('id', flat=True))
+            else:
+                assertions[kind].update(
+                    self.sqlin(model.objects, person__main_id__in=main_ids)
+                    .values_list('id', flat=True))
+
+        for kind, ids in assertions.items():
+            self.update_assertions(self.model(kind), ids)
+
+    def update_assertions(self, model, ids):
+        """
+        Recompute the index for some assertions, which might have been
+        created, modified or deleted.
+        :param model: the model of the assertions, one of KINDS
+        """
+        ids = set(ids)
+        if not ids:
+            return
+
+        kind = self.KINDS.index(model.__name__)
+        with django.db.transaction.atomic():
+            with django.db.connection.cursor() as cur:
+                in_ids, params = self.sql_in("assertion_id", ids)
+                where = f"WHERE kind={kind} AND {in_ids}"
+
+                # The objects that the assertions were and are about
+                about = collections.defaultdict(set)
+
+                def _add_about():
+                    cur.execute(
+                        f"SELECT {', '.join(self.COLUMNS.values())} "
+                        f"FROM assertion_index {where}",
+                        params)
+                    for row in cur.fetchall():
+                        for a, id in zip(self.COLUMNS, row):
+                            about[a].add(id)
+
+                _add_about()
+                cur.execute(f"DELETE FROM assertion_index {where}", params)
+                self._insert(cur, kind, ids)
+                _add_about()
+                self._update_counts(cur, about)
+
+    def _update_counts(self, cur, about):
+        """
+        Recompute the number of assertions of some objects, from the
+        assertion_index table.
+        :param about: a dict of "person", "source" or "place" to the set of
+           ids of such objects, or None to recompute all counts.
+        """
+        if about is None:
+            cur.execute("DELETE FROM assertion_count")
+
+        for idx, (a, column) in enumerate(self.COLUMNS.items()):
+            if about is None:
+                where = f"{column} IS NOT NULL"
+                params = []
+            else:
+                ids = set(id for id in about[a] if id is not None)
+                if not ids:
+                    continue
+                where, params = self.sql_in(column, ids)
+                in_ids, p = self.sql_in("object_id", ids)
+                cur.execute(
+                    "DELETE FROM assertion_count "
+                    f"WHERE about={idx} AND {in_ids}",
+                    p)
+
+            cur.execute(
+                "INSERT INTO assertion_count (about, object_id, count) "
+                f"SELECT {idx}, {column}, COUNT(*) FROM assertion_index "
+                f"WHERE {where} GROUP BY {column}",
+                params)
+
+    def update_events(self, event_ids):
+        """The date or place of some events has changed"""
+        self.update_assertions(
+            models.P2E,
+            self.sqlin(models.P2E.objects, event_id__in=event_ids)
+            .values_list('id', flat=True))
+
+    def update_characteristics(self, characteristic_ids):
+        """The date or place of some characteristics has changed"""
+        self.update_assertions(
+            models.P2C,
+            self.sqlin(models.P2C.objects,
+                       characteristic_id__in=characteristic_ids)
+            .values_list('id', flat=True))
+
+    def _where(self, column, ids):
+        """
+        A condition that checks whether column is one of the ids
+        :returntype: (sql, params)
+        """
+        if len(ids) == 1:
+            # Lets the database read the rows in the order of the index
+            return (f"{column}=%s", list(ids))
+        return self.sql_in(column, ids)
+
+    def count(self, about, ids):
+        """
+        The number of assertions about any of the `ids`.
+        :param str about: "person", "source" or "place"
+        """
+        ids = set(ids)
+
+        with django.db.connection.cursor() as cur:
+            if about == 'person' and len(ids) > 1:
+                # Cannot add the counters, a P2P between two of the persons
+                # would be counted twice
+                where, params = self._where(self.COLUMNS[about], ids)
+                cur.execute(
+                    "SELECT COUNT(*) FROM ("
+                    "SELECT DISTINCT kind, assertion_id "
+                    f"FROM assertion_index WHERE {where}) a",
+                    params)
+            else:
+                where, params = self._where("object_id", ids)
+                cur.execute(
+                    "SELECT COALESCE(SUM(count), 0) FROM assertion_count "
+                    f"WHERE about={list(self.COLUMNS).index(about)} "
+                    f"AND {where}",
+                    params)
+            return cur.fetchone()[0]
+
+    def get_page(self, about, ids, offset=None, limit=None):
+        """
+        The assertions about any of the `ids`, sorted by date.
+        :param str about: "person", "source" or "place"
+        :returntype: list of (model, assertion id)
+        """
+        ids = set(ids)
+        where, params = self._where(self.COLUMNS[about], ids)
+
+        # The same P2P might be found for two of the persons
+        distinct = about == 'person' and len(ids) > 1
+
+        q = (f"SELECT {'DISTINCT' if distinct else ''} "
+             "date_sort, kind, assertion_id "
+             f"FROM assertion_index WHERE {where} "
+             "ORDER BY date_sort, kind, assertion_id")
+        if limit is not None:
+            q += f" LIMIT {int(limit)}"
+            if offset:
+                q += f" OFFSET {int(offset)}"
+
+        with django.db.connection.cursor() as cur:
+            cur.execute(q, params)
+            return [(self.model(kind), id)
+                    for date_sort, kind, id in cur.fetchall()]
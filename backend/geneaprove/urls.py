@@ -16,7 +16,9 @@ from .views import pedigree
 from .views import persona
 from .views import places
 from .views import quilts
+from .views import relationship
 from .views import representation
+from .views import search
 from .views import sources
 from .views import stats
 from .views import themelist
@@ -93,6 +95,10 @@ urlpatterns = [
     path('data/theme/<negpos:theme_id>/save', themelist.ThemeSave.as_view()),
 
     path('data/pedigree/<int:id>', pedigree.PedigreeData.as_view()),
+    path('data/sosa/<int:id>', pedigree.SosaData.as_view()),
+    path('data/relationship/<int:a>/<int:b>',
+        relationship.RelationshipView.as_view()),
+    path('data/kin/<int:id>', relationship.KinView.as_view()),
     path('data/suretySchemes', persona.SuretySchemesList.as_view()),
     path('data/event/<int:id>', events.EventDetailsView.as_view()),
     path('data/stats/<int:id>', stats.StatsView.as_view()),
@@ -103,6 +109,7 @@ urlpatterns = [
     re_path(r'^data/repr/(?P<id>\d+)(?:/(?P<size>\d+))?$',
         representation.view),
     path('data/quilts/<int:id>', quilts.QuiltsView.as_view()),
+    path('data/search', search.SearchView.as_view()),
 
     # Getting the CSRF token
     path('data/csrf', send_csrf),
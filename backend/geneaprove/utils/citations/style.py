@@ -6,6 +6,32 @@ import re
 from geneaprove import models
 
 
+class Template(object):
+    """
+    A citation template, compiled once. Parts are written as "{name}" in
+    the templates (or "${name}").
+    """
+
+    PART = re.compile(r"\$?\{([^}]+)\}")
+
+    def __init__(self, template):
+        chunks = Template.PART.split(template)
+        self.parts = chunks[1::2]  # names of the parts, in order
+
+        # A format string where the parts are positional fields
+        self._format = "".join(
+            c.replace("{", "{{").replace("}", "}}") if idx % 2 == 0
+            else f"{{{idx // 2}}}"
+            for idx, c in enumerate(chunks))
+
+    def expand(self, subst):
+        """
+        Replace the parts with their value
+        :param subst: a dict of part name -> value
+        """
+        return self._format.format(*[subst[p] for p in self.parts])
+
+
 class Citation_Style(object):
     """This object describes a full citation for a source."""
 
@@ -30,6 +56,10 @@ class Citation_Style(object):
         self.full = full
         self.short = short
 
+        self._templates = (Template(biblio), Template(full), Template(short))
+        self._parts = frozenset(
+            p for t in self._templates for p in t.parts)
+
     def cite(self, source, unknown_as_text=True):
         """
         Compute the citation for a source. This function does not use the
@@ -41,56 +71,51 @@ class Citation_Style(object):
         :return: a Source_Citation.
         """
 
-        subst = {}
-        for part in self.required_parts():
-            subst[part] = f'unknown {part if unknown_as_text else ""}'
-
         if isinstance(source, models.Source):
-            subst['_title'] = source.title
-            subst['_abbrev'] = source.abbrev
-            subst['_biblio'] = source.biblio
-            for part in source.parts.select_related('type__name').all():
-                subst[part.type.name] = part.value
+            parts = {
+                '_title': source.title,
+                '_abbrev': source.abbrev,
+                '_biblio': source.biblio,
+            }
+            for name, value in source.parts.values_list('type__name', 'value'):
+                parts[name] = value
         elif isinstance(source, dict):
-            for k, v in source.items():
-                if v != '':
-                    subst[k] = v
+            parts = source
         else:
             raise Exception("Invalid parameter to cite()")
 
-        def __repl(repl):
-            return subst[repl.group(1)]
+        return self.expand(parts, unknown_as_text=unknown_as_text)
+
+    def expand(self, parts, unknown_as_text=True):
+        """
+        Compute the citation from the value of the citation parts.
+        :param parts: a dict of part name -> value. The title of the source,
+           used when the style has no template, is given as '_title' (and
+           its abbreviation as '_abbrev').
+        :return: a Source_Citation.
+        """
 
         # An unknown type ? use the explicit title from the user
 
         if self.biblio == "":
-            full = subst.get('_title', '')
-            abbrev = subst.get('_abbrev', '')
+            full = parts.get('_title', '')
+            abbrev = parts.get('_abbrev', '')
             return Source_Citation(full, full, abbrev)
 
         # Otherwise, only take those parts that are necessary
-        else:
-            r = re.compile(r"\$\{([^}]+)\}")
-            return Source_Citation(
-                r.sub(__repl, self.biblio),
-                r.sub(__repl, self.full),
-                r.sub(__repl, self.short))
+        subst = {}
+        for part in self._parts:
+            value = parts.get(part, '')
+            subst[part] = value if value != '' \
+                else f'unknown {part if unknown_as_text else ""}'
+
+        return Source_Citation(*(t.expand(subst) for t in self._templates))
 
     def required_parts(self):
         """Return the set of citation parts that are necessary to build the
            citation.
         """
-        parts = set()
-        r = re.compile(r"\$\{([^}]+)\}")
-
-        for word in r.findall(self.biblio):
-            parts.add(word)
-        for word in r.findall(self.full):   # Should be subset of biblio
-            parts.add(word)
-        for word in r.findall(self.short):  # Should be subset of biblio
-            parts.add(word)
-
-        return parts
+        return self._parts
 
 
 No_Citation_Style = Citation_Style("", "", "", "", "")
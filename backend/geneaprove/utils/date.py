@@ -25,12 +25,13 @@ except ImportError:
         return txt
 
 import datetime
+import functools
 import re
 import time
 
 __all__ = ["from_roman_literal", "to_roman_literal", "DateRange",
            "Calendar", "CalendarGregorian", "CalendarFrench",
-           "CalendarJulian"]
+           "CalendarJulian", "parse", "sort_date"]
 
 # The following strings indicate how to specify date ranges in your language.
 # These are regexp, and should not include parenthesis groups
@@ -1121,3 +1122,32 @@ class DateRange(object):
         """Return the day of week for the start date"""
         return self._from.day_of_week()
 
+
+##################
+# Caches
+##################
+
+# Number of distinct date strings whose parsed value is kept in memory.
+# Genealogical databases tend to reuse the same few thousand dates (years
+# alone, or the dates of a census), so this is mostly a hot cache.
+DATE_CACHE_SIZE = 20000
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse(text):
+    """Return a DateRange for text, reusing a previously parsed instance
+       when possible.
+       The returned object is shared and must not be modified."""
+    return DateRange(text)
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def sort_date(text):
+    """Return the sort date (see DateRange.sort_date) for text, or None"""
+    return parse(text).sort_date()
+
+
+def cache_clear():
+    """Discard all cached dates"""
+    sort_date.cache_clear()
+    parse.cache_clear()
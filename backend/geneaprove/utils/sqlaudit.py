@@ -0,0 +1,127 @@
+"""
+Recording the SQL queries executed while running some code, to detect
+N+1 query patterns (the same query executed once per object instead of
+once for all objects), and to enforce a maximal number of queries.
+"""
+
+import collections
+import django.db
+import re
+import sys
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised when some code executes more queries than allowed. This is an
+    AssertionError so that it is reported as a failure by unittest.
+    """
+
+
+class QueryRecorder(object):
+    """
+    A context manager that records all queries executed on a database
+    connection, along with the place in the code that executed them::
+
+        with QueryRecorder() as rec:
+            ...
+        for count, sql, site in rec.repeated():
+            print(f'{count} x {sql} at {site}')
+
+    Queries are grouped by their normalized text (where literal values,
+    which change from one execution to the next, are replaced with "?"),
+    and by their call site.
+    """
+
+    SKIP = ("django.", "json", "contextlib", __name__)
+    # The modules whose frames are ignored when looking for the call site
+
+    _LITERALS = re.compile(
+        r"'(?:[^']|'')*'"            # strings
+        r"|\b\d+(?:\.\d+)?\b"        # numbers
+        r"|%s")                      # parameters
+    _LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+    _SPACES = re.compile(r"\s+")
+
+    def __init__(self, connection=None, skip=()):
+        """
+        :param skip: additional module names (or prefixes) to ignore when
+           looking for the call site.
+        """
+        self.connection = connection or django.db.connection
+        self.skip = self.SKIP + tuple(skip)
+        self.queries = []   # list of (normalized sql, call site)
+        self.statements = {}   # normalized sql -> (sql, params) of one run
+        self._wrapper = None
+
+    @classmethod
+    def normalize(cls, sql):
+        """
+        Normalize a query, so that executions with different values give
+        the same text
+        """
+        sql = cls._LITERALS.sub("?", sql)
+        sql = cls._LISTS.sub("(...)", sql)
+        return cls._SPACES.sub(" ", sql).strip()
+
+    def _call_site(self):
+        frame = sys._getframe(2)
+        while frame.f_back and frame.f_globals.get(
+                '__name__', '').startswith(self.skip):
+            frame = frame.f_back
+        code = frame.f_code
+        return f"{code.co_filename}:{frame.f_lineno} ({code.co_name})"
+
+    def __call__(self, execute, sql, params, many, context):
+        """Called by django for each query (see `execute_wrapper`)"""
+        normalized = self.normalize(sql)
+        self.queries.append((normalized, self._call_site()))
+        if normalized not in self.statements:
+            sample = params
+            if many:
+                # Only keep the first set of parameters, when available
+                sample = None
+                if isinstance(params, (list, tuple)) and params:
+                    sample = params[0]
+            self.statements[normalized] = (sql, sample)
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = self.connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self._wrapper.__exit__(*exc)
+        self._wrapper = None
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated(self, threshold=2):
+        """
+        The queries that were executed at least `threshold` times from the
+        same call site, most frequent first.
+        :returntype: list of (count, normalized sql, call site)
+        """
+        return sorted(
+            ((count, sql, site)
+             for (sql, site), count in
+             collections.Counter(self.queries).items()
+             if count >= threshold),
+            reverse=True)
+
+    def report(self, threshold=2):
+        """A description of the repeated queries, for logs"""
+        return "\n".join(
+            f"   {count} x {sql}\n      at {site}"
+            for count, sql, site in self.repeated(threshold))
+
+    def check_budget(self, budget, name=''):
+        """
+        Raise QueryBudgetExceeded if more than `budget` queries were
+        executed.
+        """
+        if budget is not None and len(self.queries) > budget:
+            raise QueryBudgetExceeded(
+                f"{name} executed {len(self.queries)} queries,"
+                f" budget is {budget}\n{self.report()}")
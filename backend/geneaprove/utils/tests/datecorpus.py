@@ -0,0 +1,112 @@
+"""
+A corpus of date strings, as found in real GEDCOM files, used to measure
+the performance of the date parser.
+
+The corpus is made of the DATE values found in the GEDCOM files of this
+directory (including the stress tests), followed by synthetic variants
+that reproduce the distribution we see in user databases: mostly plain
+gregorian dates, with a fair amount of imprecise dates, ranges, French
+republican dates, julian dual years and free text.
+"""
+
+import os
+import random
+import re
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+DATE_LINE_RE = re.compile(r"^\s*\d+\s+DATE\s+(.+?)\s*$")
+
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN",
+          "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+FRENCH_MONTHS = ["vendemiaire", "brumaire", "frimaire", "nivose",
+                 "pluviose", "ventose", "germinal", "floreal",
+                 "prairial", "messidor", "thermidor", "fructidor"]
+ROMAN = ["I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X",
+         "XI", "XII", "XIII", "XIV"]
+FREE_TEXT = ["unknown", "young", "stillborn", "in infancy",
+             "during the war", "after the census", "see notes", "?"]
+
+
+def gedcom_dates(directory=DIRECTORY):
+    """
+    Return the list of DATE values found in the GEDCOM files of directory
+    and its subdirectories, in file order (duplicates are kept, since they
+    are part of the distribution we want to measure).
+    """
+    result = []
+    for root, dirs, files in sorted(os.walk(directory)):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith(".ged"):
+                continue
+            with open(os.path.join(root, name),
+                      encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    m = DATE_LINE_RE.match(line)
+                    if m:
+                        result.append(m.group(1))
+    return result
+
+
+def _day_month_year(rand, low=1600, high=1950):
+    return f"{rand.randint(1, 28)} {rand.choice(MONTHS)} " \
+        f"{rand.randint(low, high)}"
+
+
+def synthetic_dates(count, seed=0):
+    """
+    Return count synthetic date strings. The same seed always returns the
+    same list, so that results can be compared across runs.
+    """
+    rand = random.Random(seed)
+
+    def gregorian():
+        return _day_month_year(rand)
+
+    def month_year():
+        return f"{rand.choice(MONTHS)} {rand.randint(1600, 1950)}"
+
+    def year():
+        return str(rand.randint(1600, 1950))
+
+    def imprecise():
+        return f"{rand.choice(['ABT', 'EST', 'CAL', 'BEF', 'AFT'])} " \
+            f"{rand.choice([year, month_year, gregorian])()}"
+
+    def between():
+        y = rand.randint(1600, 1940)
+        return f"BET {y} AND {y + rand.randint(1, 10)}"
+
+    def period():
+        return f"FROM {gregorian()} TO {gregorian()}"
+
+    def julian():
+        y = rand.randint(1582, 1751)
+        return f"{rand.randint(1, 28)} {rand.choice(MONTHS[:3])} " \
+            f"{y}/{(y + 1) % 100:02} (julian)"
+
+    def french():
+        return f"{rand.randint(1, 30)} {rand.choice(FRENCH_MONTHS)} " \
+            f"an {rand.choice(ROMAN)}"
+
+    def free_text():
+        return rand.choice(FREE_TEXT)
+
+    # Relative weights, roughly matching what we see in user databases
+    kinds = [(gregorian, 40), (month_year, 8), (year, 15), (imprecise, 12),
+             (between, 6), (period, 3), (julian, 5), (french, 6),
+             (free_text, 5)]
+    generators = [k for k, _ in kinds]
+    weights = [w for _, w in kinds]
+
+    # Real databases reuse the same dates (census, years alone...), so
+    # draw from a pool smaller than the number of dates we return
+    pool = [rand.choices(generators, weights)[0]()
+            for _ in range(max(1, count // 3))]
+    return [rand.choice(pool) for _ in range(count)]
+
+
+def corpus(synthetic=5000, seed=0):
+    """The full benchmark corpus"""
+    return gedcom_dates() + synthetic_dates(synthetic, seed=seed)
@@ -0,0 +1,49 @@
+"""
+unittest-based framework for testing units in GeneaProve.utils
+"""
+
+import unittest
+from ..citations import Citations
+from ..citations.style import Citation_Style, Template
+
+
+class CitationsTestCase(unittest.TestCase):
+
+    def test_template(self):
+        """Templates are compiled once, literal braces are preserved"""
+        t = Template('{Author}, "{Title}" ${Page}. {Author} }')
+        self.assertEqual(t.parts, ['Author', 'Title', 'Page', 'Author'])
+        self.assertEqual(
+            t.expand({'Author': 'A{1}', 'Title': 'T', 'Page': '4'}),
+            'A{1}, "T" 4. A{1} }')
+        self.assertEqual(Template('no part').expand({}), 'no part')
+
+    def test_cite(self):
+        """Expansion of all templates, and parts that have no value"""
+        style = Citation_Style(
+            category='', type='',
+            biblio='{Author}. {Title}.', full='{Author}, {Title}, {Page}.',
+            short='{Title}, {Page}.')
+        self.assertEqual(style.required_parts(), {'Author', 'Title', 'Page'})
+
+        c = style.cite({'Author': 'Me', 'Title': 'Book', 'Page': ''})
+        self.assertEqual(
+            c.to_json(),
+            {'biblio': 'Me. Book.',
+             'full': 'Me, Book, unknown Page.',
+             'short': 'Book, unknown Page.'})
+        c = style.cite({'Title': 'Book'}, unknown_as_text=False)
+        self.assertEqual(c.short, 'Book, unknown .')
+
+        c = Citations.get_citation('no such style').cite(
+            {'_title': 'The title', '_abbrev': 'Title'})
+        self.assertEqual(
+            c.to_json(),
+            {'biblio': 'The title', 'full': 'The title', 'short': 'Title'})
+
+    def test_evidence_style(self):
+        """The parts used in the templates of the style guide"""
+        style = Citations.get_citation('ESM95')
+        self.assertEqual(
+            style.cite({'Collection': 'C', 'Repository': 'R'}).biblio,
+            'C. R, unknown Repository Location.')
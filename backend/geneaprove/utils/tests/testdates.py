@@ -4,6 +4,7 @@ unittest-based framework for testing units in GeneaProve.utils
 
 import unittest
 from .. import date
+from . import datecorpus
 
 JAN_1_2008 = 2454467
 JAN_1_2008_ELEVEN = 2454466
@@ -267,3 +268,16 @@ class DateTestCase(unittest.TestCase):
             date.DateRange("2000-01-01").day_of_week(), "Saturday")
         self.assertEqual(  # in the future
             date.DateRange("2054-06-19").day_of_week(), "Friday")
+
+    def test_cache(self):
+        """The cached parser must return the same as the uncached one"""
+        date.cache_clear()
+        dates = datecorpus.corpus(synthetic=500)
+        self.assertGreater(len(dates), 500)
+        for d in dates:
+            self.assertEqual(
+                date.DateRange(d).sort_date(), date.sort_date(d), d)
+            self.assertEqual(
+                str(date.DateRange(d)), str(date.parse(d)), d)
+        self.assertGreater(date.sort_date.cache_info().hits, 0)
+        self.assertIs(date.parse("1700"), date.parse("1700"))
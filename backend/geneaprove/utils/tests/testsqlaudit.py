@@ -0,0 +1,39 @@
+"""
+unittest-based framework for testing units in GeneaProve.utils
+"""
+
+import django.db
+import unittest
+from ..sqlaudit import QueryRecorder, QueryBudgetExceeded
+
+
+class SQLAuditTestCase(unittest.TestCase):
+
+    def test_normalize(self):
+        """Literal values are ignored when comparing queries"""
+        n = QueryRecorder.normalize
+        self.assertEqual(
+            n("SELECT name FROM persona WHERE id=12 AND name='O''Neil'"),
+            "SELECT name FROM persona WHERE id=? AND name=?")
+        self.assertEqual(
+            n("SELECT 1 FROM p2e WHERE id IN (1, 2,3)"),
+            n("SELECT 1 FROM p2e   WHERE id IN (%s)"))
+
+    def test_repeated(self):
+        """Queries executed in a loop are reported"""
+        with QueryRecorder() as rec:
+            with django.db.connection.cursor() as cur:
+                cur.execute("SELECT 1")
+                for i in range(3):
+                    cur.execute("SELECT %s", [i])
+
+        self.assertEqual(len(rec), 4)
+        repeated = rec.repeated()
+        self.assertEqual(len(repeated), 1)
+        self.assertEqual(repeated[0][:2], (3, "SELECT ?"))
+        self.assertIn("testsqlaudit.py", repeated[0][2])
+        self.assertEqual(rec.repeated(threshold=4), [])
+
+        rec.check_budget(4)
+        with self.assertRaises(QueryBudgetExceeded):
+            rec.check_budget(3)
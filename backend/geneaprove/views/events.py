@@ -17,6 +17,8 @@ def extended_events(ids):
 
 
 class EventDetailsView(JSONView):
+    query_budget = 15
+
     def get_json(self, params, id):
         """JSON data for a specific event"""
 
@@ -3,14 +3,9 @@ Handles merging of personas.
 """
 
 
-import heapq
 import datetime
-from geneaprove.views.graph import global_graph
-from geneaprove.views.queries import PersonSet
-
-
-# Maximum number of years in a typical lifespan, when we have to guess
-maximum_lifespan = 100
+from geneaprove import models
+from geneaprove.sql import PersonSet, global_graph
 
 
 def debug(msg):
@@ -141,12 +136,10 @@ def find_candidate():
     for p in [(p1, p2), (p2, p1), (p3, p4), (p5, p6), (p6, p5)]:
         score = compare(persons[p[0]], persons[p[1]])
 
-    # Get all persons from the database with a guess at their lifespan.
-    # If we know the birth date, lifespan starts there, otherwise it starts
-    #   some years before the first event
-    # Likewise for death date.
-    # This results is potentially over-optimistic lifespans, but still reduces
-    # the number of comparisons to do.
+    # Get all persons from the database with a guess at their lifespan
+    # (see LifespanSet). The lifespans are sorted on their start year, and
+    # persons without any known date are not returned, since we don't really
+    # want to merge them.
     # The following query (and its processing) might take a while on big
     # databases, but we'll need access to the whole information for persons
     # anyway, so we might as well query everything from the start)
@@ -156,32 +149,12 @@ def find_candidate():
     persons = extended_personas(
         nodes=None, styles=None, graph=global_graph, query_groups=False)
 
-    # A temporary structure ordered by the first date in lifespan
-
     births = []
-    delta = datetime.timedelta(days=maximum_lifespan * 365)
-
-    for p in persons.values():
-        birth = death = None
-
-        if p.birth is not None:
-            birth = p.birth.date_sort
-        if p.death is not None:
-            death = p.death.date_sort
-        if birth is None or death is None:
-            h = [a.event.date_sort
-                 for a in p.all_events.values()
-                 if a.event.date_sort is not None]
-            if h:
-                h.sort()
-                birth = birth or h[0] - delta
-                death = death or h[-1] + delta
-
-        # If birth is None, that means there are no events, and we don't
-        # really want to merge that person then.
-        if birth:
-            p.max_lifespan = death
-            heapq.heappush(births, (birth, p))
+    for lifespan in models.Lifespan.objects.order_by('start', 'end'):
+        p = persons.get(lifespan.person_id)
+        if p is not None:
+            p.max_lifespan = lifespan.end
+            births.append((lifespan.start, p))
 
     # Now we traverse the list and only compare persons that were alive at
     # the same time (otherwise we assume they cannot be merged)
@@ -192,13 +165,11 @@ def find_candidate():
     comparisons = 0
     same = 0
 
-    while births:
-        date, person = heapq.heappop(births)
-
-        for a in alive:
+    for date, person in births:
+        for a in list(alive):
             if a.max_lifespan < date:
                 alive.remove(a)
-            elif date.year < 1970:
+            elif date < 1970:
                 continue
             else:
                 # print(f"Compare {person.name} and {a.name}")
@@ -206,7 +177,7 @@ def find_candidate():
                 score = compare(a, person)
                 if score >= 150:
                     print(
-                        f"{date.year} Might be the same: {person.id} {person.name} and {a.id} {a.name}, score={score} {compare(person, a)}")
+                        f"{date} Might be the same: {person.id} {person.name} and {a.id} {a.name}, score={score} {compare(person, a)}")
                     same += 1
 
         alive.append(person)
@@ -3,7 +3,7 @@ Various views related to displaying the pedgree of a person graphically
 """
 
 from django.db import transaction
-from ..sql import PersonSet, Relationship
+from ..sql import PersonSet, Relationship, global_graph
 from .styles import Styles
 from .to_json import JSONView
 import logging
@@ -14,6 +14,8 @@ logger = logging.getLogger('geneaprove.pedigree')
 class PedigreeData(JSONView):
     """Return the data for the Pedigree or Fanchart views."""
 
+    query_budget = 30
+
     @transaction.atomic
     def get_json(self, params, id):
         logger.debug('get pedigree data')
@@ -21,7 +23,8 @@ class PedigreeData(JSONView):
         id = int(id)
         theme_id = int(params.get("theme", -1))
 
-        persons = PersonSet(styles=Styles(theme_id, decujus=id))
+        persons = PersonSet(
+            styles=Styles(theme_id, decujus=id), readonly=True)
         persons.add_folks(
             person_id=id,
             relationship=Relationship.ANCESTORS,
@@ -32,7 +35,8 @@ class PedigreeData(JSONView):
             relationship=Relationship.DESCENDANTS,
             max_depth=int(params.get("descendant_gens", 1)),
             skip=int(params.get("desc_known", 0)))
-        persons.fetch_p2e()
+        if persons.styles.need_p2e:
+            persons.fetch_p2e()
 
         if theme_id >= 0:
             persons.fetch_p2c()  # for custom styles
@@ -40,3 +44,48 @@ class PedigreeData(JSONView):
         result = persons.to_json()
         result['decujus'] = persons.get_from_id(id).main_id
         return result
+
+
+class SosaData(JSONView):
+    """
+    The ancestors of a person with their Sosa (Ahnentafel) numbers, for a
+    range of numbers given by the "from" and "to" parameters.
+    """
+
+    query_budget = 10
+
+    PAGE_SIZE = 256
+    # Number of Sosa numbers returned when "to" is not specified
+
+    def get_json(self, params, id):
+        first = int(params.get('from', 1))
+        last = int(params.get('to', first + SosaData.PAGE_SIZE - 1))
+
+        persons = PersonSet(readonly=True)
+        decujus = persons.get_from_id(id).main_id
+
+        global_graph.update_if_needed()
+        sosa = global_graph.get_sosa(decujus, first=first, last=last)
+        implex = global_graph.get_implex(decujus)
+        persons.add_ids(ids=set(main_id for _, main_id in sosa))
+
+        return {
+            "decujus": decujus,
+            "sosa": sosa,
+            "persons": [persons.persons[main_id] for main_id in
+                        sorted(set(main_id for _, main_id in sosa))],
+
+            # The number of Sosa numbers of the persons in this page, when
+            # they have more than one
+            "implex": {main_id: implex[main_id]
+                       for _, main_id in sosa if implex[main_id] > 1},
+
+            # For the whole tree: the number of distinct ancestors, and the
+            # number of Sosa numbers they have
+            "ancestors": len(implex) - 1,
+            "numbers": sum(implex.values()) - 1,
+
+            # The (child, parent) links ignored because they make a person
+            # their own ancestor
+            "cycles": global_graph.get_cycles(decujus),
+        }
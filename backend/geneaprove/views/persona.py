@@ -3,14 +3,17 @@ Various views related to displaying the pedgree of a person graphically
 """
 
 from django.db.models import F, Count
+from django.db.models.expressions import RawSQL
 from .. import models
-from ..sql import AssertList, PersonSet
+from ..sql import AssertList, PersonSet, SearchIndexSet
 from .to_json import JSONView
 from .styles import Styles
 
 class PersonaView(JSONView):
     """Display all details known about persona ID"""
 
+    query_budget = 10
+
     def get_json(self, params, id):
         persons = PersonSet()
         persons.add_ids(ids=[int(id)])
@@ -50,7 +53,9 @@ class PersonCount(JSONView):
             .filter(id=F('main_id')) \
 
         if namefilter:
-            r = r.filter(display_name__icontains=namefilter)
+            # Uses the full-text index
+            r = r.filter(id__in=RawSQL(
+                *SearchIndexSet().query_match(namefilter)))
 
         r = r.aggregate(count=Count('id'))
         return int(r['count'])
@@ -59,18 +64,26 @@ class PersonCount(JSONView):
 class PersonaList(JSONView):
     """View the list of all personas"""
 
+    query_budget = 25
+
     def get_json(self, params, decujus=1):
         theme_id = int(params.get('theme', -1))
         ids = params.get('ids', None)
 
-        persons = PersonSet(styles=Styles(theme_id, decujus=decujus))
+        limit = params.get('limit', None)
+
+        persons = PersonSet(
+            styles=Styles(theme_id, decujus=decujus), readonly=True)
         persons.add_ids(
             ids=[int(d) for d in ids.split(',')] if ids else None,
             compute_sex=theme_id >= 0,
             namefilter=params.get('filter', None),
             offset=params.get('offset', None),
-            limit=params.get('limit', None))
-        persons.fetch_p2e()
+            after=params.get('after', None),
+            limit=limit)
+        self.set_next_cursor(list(persons.persons.values()), limit)
+        if persons.styles.need_p2e:
+            persons.fetch_p2e()
         return persons
 
 
@@ -82,6 +95,8 @@ class PersonAssertsCount(JSONView):
 
 
 class PersonAsserts(JSONView):
+    query_budget = 20
+
     def get_json(self, params, id):
         p = PersonSet()
         p.add_ids([id])
@@ -3,7 +3,6 @@ Event-related views
 """
 
 from django.db.models import Count
-from django.db.models.functions import Lower
 from .. import models
 from ..sql import AssertList, PlaceSet
 from .to_json import JSONView
@@ -11,27 +10,26 @@ from .to_json import JSONView
 class PlaceList(JSONView):
     """View the list of a all known places"""
 
+    query_budget = 5
+
     def get_json(self, params):
         offset = params.get('offset', None)
         limit = params.get('limit', None)
         namefilter = params.get('filter', None)
         ids = params.get('ids', None)
-        pm = models.Place.objects.order_by(Lower('name'))
+        pm = models.Place.objects.all()
 
         if namefilter:
             pm = pm.filter(name__icontains=namefilter)
         if ids:
             pm = pm.filter(id__in=ids.split(','))
 
-        if limit:
-            li = int(limit)
-            if offset:
-                off = int(offset)
-                pm = pm[off:off + li]
-            else:
-                pm = pm[:li]
-
-        return pm.all()
+        # Uses the place_sort index
+        places = PlaceSet().keyset(
+            pm, ["lower({table}.name)", "{table}.id"],
+            after=params.get('after', None), offset=offset, limit=limit)
+        self.set_next_cursor(places, limit)
+        return places
 
 
 class PlaceCount(JSONView):
@@ -54,6 +52,8 @@ class PlaceAssertsCount(JSONView):
 
 
 class PlaceAsserts(JSONView):
+    query_budget = 15
+
     def get_json(self, params, id):
         places = PlaceSet()
         places.add_ids([id])
@@ -68,6 +68,8 @@ class PlaceView(JSONView):
     JSON data for a specific place
     """
 
+    query_budget = 5
+
     def get_json(self, params, id):
         place = models.Place.objects.get(id=id)
         return place
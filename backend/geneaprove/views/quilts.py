@@ -4,7 +4,7 @@ from geneaprove import models
 from grandalf.graphs import Vertex,Edge,Graph
 from grandalf.layouts import SugiyamaLayout
 from .to_json import JSONView
-from ..sql import PersonSet, Relationship
+from ..sql import PersonSet, Relationship, global_graph
 
 
 class BirthEvent:
@@ -26,14 +26,6 @@ class BirthEvent:
     def __repr__(self):
         return f"(birth {self.child} from {self.fathers} and {self.mothers})"
 
-class MarriageEvent:
-    def __init__(self):
-        self.spouses = []
-
-    def add_spouse(self, main_id):
-        self.spouses.append(int(main_id))
-
-
 class NodeLayout:
     def __init__(self):
         self.w = 10
@@ -41,36 +33,36 @@ class NodeLayout:
 
 
 class QuiltsView(JSONView):
+    query_budget = 10
 
     def get_json(self, params, id):
-        persons = PersonSet()
+        persons = PersonSet(readonly=True)
         persons.add_folks(int(id), Relationship.ANCESTORS)
         persons.add_folks(int(id), Relationship.DESCENDANTS)
-        persons.fetch_p2e(
-            event_types=(models.Event_Type.PK_birth,
-                         models.Event_Type.PK_marriage))
 
         decujus = persons.get_from_id(int(id))
 
         # Recreate the birth events, we need child, father and mother to build
-        # the links. Likewise for marriage events.
+        # the links. Likewise for marriages. Only the persons in the set are
+        # taken into account.
 
+        global_graph.update_if_needed()
         births = collections.defaultdict(BirthEvent)
-        marriages = collections.defaultdict(MarriageEvent)
-
-        for a in persons.asserts:
-            if isinstance(a, models.P2E) and not a.disproved:
-                if a.event.type_id == models.Event_Type.PK_birth:
-                    if a.role_id == models.Event_Type_Role.PK_principal:
-                        births[a.event.id].set_child(a.person_id)
-                    elif a.role_id == models.Event_Type_Role.PK_birth__father:
-                        births[a.event.id].add_father(a.person_id)
-                    elif a.role_id == models.Event_Type_Role.PK_birth__mother:
-                        births[a.event.id].add_mother(a.person_id)
-
-                elif a.event.type_id == models.Event_Type.PK_marriage:
-                    if a.role_id == models.Event_Type_Role.PK_principal:
-                        marriages[a.event.id].add_spouse(a.person_id)
+        spouses = set()   # (main_id, spouse), ordered by id
+
+        for main_id in persons.persons:
+            for parent, role in global_graph.get_parents_with_role(main_id):
+                if parent in persons.persons:
+                    b = births[main_id]
+                    b.child = main_id
+                    if role == models.Event_Type_Role.PK_birth__father:
+                        b.add_father(parent)
+                    else:
+                        b.add_mother(parent)
+
+            for spouse in global_graph.get_spouses(main_id):
+                if main_id < spouse and spouse in persons.persons:
+                    spouses.add((main_id, spouse))
 
         # Organize persons into layers, based on child->parent relationships
         nodes = {main_id: Vertex(person)
@@ -109,11 +101,15 @@ class QuiltsView(JSONView):
                         if f is not None or m is not None:
                             children[(f, m)].append(b.child)
 
+        # Couples are (father, mother), as for births. Those without
+        # children are ordered by sex when it is known.
         couples = set(children.keys())
-        for event in marriages.values():
-            for idx, p1 in enumerate(event.spouses):
-                for p2 in event.spouses[idx + 1:]:
-                    couples.add((p1, p2))
+        for p1, p2 in spouses:
+            if (p1, p2) not in couples and (p2, p1) not in couples:
+                if persons.persons[p1].sex == 'F' \
+                        or persons.persons[p2].sex == 'M':
+                    p1, p2 = p2, p1
+                couples.add((p1, p2))
 
         families_by_layer = collections.defaultdict(list)
         for c in couples:
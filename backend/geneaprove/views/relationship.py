@@ -0,0 +1,153 @@
+"""
+How two persons are related
+"""
+
+from ..sql import PersonSet, global_graph
+from .to_json import JSONView
+
+
+ORDINALS = ('', 'first', 'second', 'third', 'fourth', 'fifth', 'sixth',
+            'seventh', 'eighth', 'ninth', 'tenth')
+
+TIMES = ('', 'once', 'twice', 'three times')
+
+
+def _ordinal(n):
+    return ORDINALS[n] if n < len(ORDINALS) else f'{n}th'
+
+
+def _times(n):
+    return TIMES[n] if n < len(TIMES) else f'{n} times'
+
+
+def _greats(n, word):
+    """
+    Add "great-" prefixes to word: n=0 gives word, n=1 gives "great-word",
+    n=2 "great-great-word", and then "3x great-word",...
+    """
+    if n <= 2:
+        return 'great-' * n + word
+    return f'{n}x great-{word}'
+
+
+def describe(gen1, gen2, sex=None):
+    """
+    The name of the relationship of a person to another one, given the
+    number of generations between each of them and their nearest common
+    ancestor, as in "second cousin once removed".
+    :param sex: the sex of the first person ('M' or 'F'), to choose
+       between "father" and "mother" for instance.
+    """
+    def _word(male, female, neutral):
+        return male if sex == 'M' else female if sex == 'F' else neutral
+
+    if gen1 == 0 and gen2 == 0:
+        return 'self'
+    elif gen1 == 0:
+        word = _word('father', 'mother', 'parent')
+        if gen2 == 1:
+            return word
+        return _greats(gen2 - 2, f'grand{word}')
+    elif gen2 == 0:
+        word = _word('son', 'daughter', 'child')
+        if gen1 == 1:
+            return word
+        return _greats(gen1 - 2, f'grand{word}')
+    elif gen1 == 1 and gen2 == 1:
+        return _word('brother', 'sister', 'sibling')
+    elif gen1 == 1:
+        return _greats(gen2 - 2, _word('uncle', 'aunt', 'aunt or uncle'))
+    elif gen2 == 1:
+        return _greats(
+            gen1 - 2, _word('nephew', 'niece', 'niece or nephew'))
+
+    degree = min(gen1, gen2) - 1
+    removed = abs(gen1 - gen2)
+    name = f'{_ordinal(degree)} cousin'
+    if removed:
+        name += f' {_times(removed)} removed'
+    return name
+
+
+def _relationship(relation, sex):
+    """The description of a Relation, for json"""
+    return {
+        "generations": [relation.gen1, relation.gen2],
+        "degree": max(0, min(relation.gen1, relation.gen2) - 1),
+        "removed": abs(relation.gen1 - relation.gen2),
+        "name": describe(relation.gen1, relation.gen2, sex),
+    }
+
+
+class RelationshipView(JSONView):
+    """
+    How person `a` is related to person `b`: their nearest common ancestors,
+    the shortest paths through them, and the name of the relationship.
+    """
+
+    query_budget = 12
+
+    def get_json(self, params, a, b):
+        persons = PersonSet(readonly=True)
+        main1 = persons.get_from_id(a).main_id
+        main2 = persons.get_from_id(b).main_id
+
+        global_graph.update_if_needed()
+        relation = global_graph.get_relation(main1, main2)
+
+        if relation is None:
+            return {
+                "a": main1,
+                "b": main2,
+                "persons": [persons.persons[main1], persons.persons[main2]],
+                "ancestors": [],
+                "paths": [],
+                "relationship": None,
+                "others": [],
+            }
+
+        relations = [relation, *relation.others]
+        persons.add_ids(ids=set(
+            main_id for r in relations for path in r.paths
+            for main_id in path))
+        sex = persons.persons[main1].sex
+
+        return {
+            "a": main1,
+            "b": main2,
+            "persons": list(persons.persons.values()),
+            "ancestors": relation.ancestors,
+            "paths": relation.paths,
+            "relationship": _relationship(relation, sex),
+
+            # Common ancestors at the same distance, but with a different
+            # number of generations on each side
+            "others": [
+                {"ancestors": r.ancestors,
+                 "paths": r.paths,
+                 "relationship": _relationship(r, sex)}
+                for r in relation.others],
+        }
+
+
+class KinView(JSONView):
+    """
+    The relatives of a person (blood relatives and in-laws), up to "degree"
+    parent, child or spouse links away, with the distance of each of them.
+    """
+
+    query_budget = 10
+
+    MAX_DEGREE = 12
+    # Beyond that, the result is most of the database for large trees
+
+    def get_json(self, params, id):
+        degree = min(int(params.get('degree', 2)), KinView.MAX_DEGREE)
+
+        persons = PersonSet(readonly=True)
+        main_id = persons.get_from_id(id).main_id
+        persons.add_kin(main_id, max_depth=degree)
+
+        result = persons.to_json()
+        result['decujus'] = main_id
+        return result
@@ -0,0 +1,77 @@
+"""
+Searching persons, places and sources
+"""
+
+from .. import models
+from ..sql import SearchIndexSet
+from .to_json import JSONView
+
+
+class SearchView(JSONView):
+    """
+    Search all persons, places and sources whose name matches the `q`
+    parameter. This returns the number of matches of each kind, and the best
+    matches of all kinds, ranked together.
+    Parameters:
+       - q: the text to search.
+       - kinds: comma-separated list of the kinds of objects to search
+         (person, place or source), all of them by default.
+       - limit: the maximal number of results (at most MAX_LIMIT).
+    """
+
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 200
+
+    def get_json(self, params):
+        kinds = params.get('kinds', None)
+        if kinds:
+            kinds = [
+                k for k in kinds.split(',') if k in SearchIndexSet.KINDS]
+            if not kinds:
+                # Only unknown kinds: nothing can match
+                return {"counts": {}, "results": []}
+
+        try:
+            limit = int(params.get('limit', self.DEFAULT_LIMIT))
+        except ValueError:
+            limit = self.DEFAULT_LIMIT
+        limit = max(0, min(limit, self.MAX_LIMIT))
+
+        counts, found = SearchIndexSet().search(
+            params.get('q', ''), kinds=kinds, limit=limit)
+
+        # Fetch the names to display, one query per kind
+        ids = {kind: [] for kind in SearchIndexSet.KINDS}
+        for kind, id, rank in found:
+            ids[kind].append(id)
+
+        names = {}
+        if ids['person']:
+            names.update(
+                (('person', id), name)
+                for id, name in models.Persona.objects
+                .filter(id__in=ids['person'])
+                .values_list('id', 'display_name'))
+        if ids['place']:
+            names.update(
+                (('place', id), name)
+                for id, name in models.Place.objects
+                .filter(id__in=ids['place'])
+                .values_list('id', 'name'))
+        if ids['source']:
+            names.update(
+                (('source', id), abbrev or title)
+                for id, abbrev, title in models.Source.objects
+                .filter(id__in=ids['source'])
+                .values_list('id', 'abbrev', 'title'))
+
+        return {
+            "counts": counts,
+            "results": [
+                {"kind": kind,
+                 "id": id,
+                 "name": names.get((kind, id), ""),
+                 "rank": rank}
+                for kind, id, rank in found
+            ],
+        }
@@ -0,0 +1,38 @@
+"""
+Functions converting objects to a version suitable for json, registered by
+exact type, so that ModelEncoder finds them with a single dict lookup
+instead of a series of isinstance() checks.
+The registry is built from the to_json() method of the models, which
+remain the only description of their json format.
+"""
+
+import datetime
+from .. import models
+from ..models.theme.styles import Style
+from ..sql import PersonRow
+
+SERIALIZERS = {}
+# Exact type -> function(obj), returning a version of obj suitable for json
+# (which might need further encoding).
+
+
+def register(*types):
+    """A decorator that registers a serializer for the given types"""
+    def _wrapped(func):
+        for t in types:
+            SERIALIZERS[t] = func
+        return func
+    return _wrapped
+
+
+def register_models(*types):
+    """Register the to_json() method of each type as its serializer"""
+    for t in types:
+        register(t)(t.to_json)
+
+
+register(datetime.datetime)(datetime.datetime.isoformat)
+register_models(
+    models.Place, models.Event, models.Source, models.Persona, PersonRow,
+    Style, models.P2E, models.P2P, models.P2G, models.P2C,
+    models.Characteristic)
@@ -5,7 +5,6 @@ Source-related views
 import logging
 import os
 from django.db.models import Count
-from django.db.models.functions import Lower
 from django.conf import settings
 from .. import models
 from ..sql import SourceSet
@@ -68,6 +67,8 @@ class SourceAsserts(JSONView):
     Retrieve all asserts for a view
     """
 
+    query_budget = 15
+
     def get_json(self, params, id):
         sources = SourceSet()
         sources.add_ids(ids=[id])
@@ -94,6 +95,8 @@ class SourceView(JSONView):
     View a specific source by id
     """
 
+    query_budget = 10
+
     def get_json(self, params, id):
         sources = SourceSet()
         sources.add_ids(ids=[id])
@@ -199,6 +202,8 @@ class SourcesList(JSONView):
     View the list of all sources
     """
 
+    query_budget = 5
+
     def get_json(self, params):
         offset = params.get('offset', None)
         limit = params.get('limit', None)
@@ -206,7 +211,6 @@ class SourcesList(JSONView):
         ids = params.get('ids', None)
 
         pm = models.Source.objects \
-            .order_by(Lower('abbrev'), Lower('title')) \
             .select_related( 'subject_place', 'jurisdiction_place')
 
         if namefilter:
@@ -214,15 +218,16 @@ class SourcesList(JSONView):
         if ids is not None:
             pm = pm.filter(id__in=ids.split(','))
 
-        if limit:
-            li = int(limit)
-            if offset:
-                off = int(offset)
-                pm = pm[off:off + li]
-            else:
-                pm = pm[:li]
-
-        return pm.all()
+        # Uses the source_sort index. NULL cannot be compared in the cursor
+        # condition, so it is sorted as an empty string.
+        sources = SourceSet().keyset(
+            pm,
+            ["COALESCE(lower({table}.abbrev), '')",
+             "COALESCE(lower({table}.title), '')",
+             "{table}.id"],
+            after=params.get('after', None), offset=offset, limit=limit)
+        self.set_next_cursor(sources, limit)
+        return sources
 
 
 class SourceRepresentations(JSONView):
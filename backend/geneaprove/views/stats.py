@@ -28,10 +28,9 @@ class StatsView(JSONView):
         # gedcom import for the purpose of preserving families. Will be fixed
         # when we store children differently (for instance in a group)
 
-        persons = PersonSet()
+        persons = PersonSet(readonly=True)
         persons.add_folks(person_id=int(id), relationship=Relationship.ANCESTORS)
         persons.add_folks(person_id=int(id), relationship=Relationship.DESCENDANTS)
-        persons.fetch_p2e()   # compute births and deaths
 
         logger.debug('count persons in tree')
         fathers = [p for p in persons.persons.values() if p.sex == 'M']
@@ -97,12 +97,14 @@ class Styles(object):
         status = defaultdict(dict)
 
         for r in self.rules:
+            r.prepare(persons, self.precomputed)
             for p in persons.persons.values():
                 r.initial(p, self.precomputed, status)
 
-        # Apply each assertions
+        # Apply each assertions. They were fetched with the main_id of their
+        # person, so there is no need to query it
         for a in persons.asserts:
-            p = persons.get_from_id(a.person_id)
+            p = persons.persons[a.person_main_id]
             for r in self.rules:
                 r.merge(
                     assertion=a,
@@ -0,0 +1,205 @@
+"""
+unittest-based framework for testing the derived tables and the views,
+on a small family imported from a GEDCOM file
+"""
+
+import django.test
+import json
+import os
+from geneaprove import models
+from geneaprove.importers.gedcomimport import GedcomFileImporter
+from geneaprove.sql import AncestorClosureSet, AssertionIndexSet, PersonSet, \
+    global_graph
+from ..to_json import JSONView, decode_columnar
+
+
+class FamilyTestCase(django.test.TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        success, msg = GedcomFileImporter().parse(
+            os.path.join(os.path.dirname(__file__), 'family.ged'))
+        assert success, msg
+        PersonSet.recompute_main_ids()   # also computes the derived tables
+
+        # The change counters were rolled back with the previous tests
+        global_graph.invalidate()
+
+        cls.ids = {
+            p.display_name.split()[0]: p.main_id
+            for p in models.Persona.objects.all()}
+
+    def get(self, url, **kwargs):
+        """Query a view, and return the response and its decoded json"""
+        response = self.client.get(url, **kwargs)
+        if response.streaming:
+            content = b''.join(response.streaming_content)
+        else:
+            content = response.content
+        return response, json.loads(content.decode())
+
+    def test_derived(self):
+        """The derived tables are computed after the import"""
+        ids = self.ids
+
+        lifespan = models.Lifespan.objects.get(person=ids['John'])
+        self.assertEqual(lifespan.start, 1960)
+        self.assertTrue(lifespan.birth_known)
+        self.assertTrue(
+            models.Lifespan.objects.get(person=ids['George']).death_known)
+
+        self.assertEqual(
+            sorted(models.Parent_Link.objects
+                   .filter(child=ids['John'])
+                   .values_list('parent', 'sex')),
+            sorted([(ids['Peter'], 'M'), (ids['Mary'], 'F')]))
+        self.assertFalse(
+            models.Parent_Link.objects.filter(child=ids['George']).exists())
+
+        summary = models.Person_Summary.objects.get(person=ids['John'])
+        self.assertEqual(summary.sex, 'M')
+        self.assertTrue(summary.birth.startswith('1960-05-03'))
+        self.assertEqual(
+            models.Person_Summary.objects.get(person=ids['Peter'])
+            .marriage[:4], '1955')
+
+        asserts = (
+            models.P2E.objects.filter(person__main_id=ids['John']).count()
+            + models.P2C.objects.filter(person__main_id=ids['John']).count())
+        self.assertEqual(
+            models.Assertion_Index.objects.filter(person=ids['John']).count(),
+            asserts)
+        self.assertEqual(
+            models.Assertion_Count.objects
+            .get(about=list(AssertionIndexSet.COLUMNS).index('person'),
+                 object_id=ids['John']).count,
+            asserts)
+        census = models.Source.objects.get(title='Census of Paris')
+        self.assertEqual(
+            models.Assertion_Index.objects.filter(source=census).count(), 1)
+
+        # Only maintained when enabled in the settings
+        self.assertFalse(models.Ancestor_Closure.objects.exists())
+        with self.settings(GENEAPROVE_ANCESTOR_CLOSURE=True):
+            AncestorClosureSet().update()
+        self.assertEqual(
+            dict(models.Ancestor_Closure.objects
+                 .filter(descendant=ids['John'])
+                 .values_list('ancestor', 'generation')),
+            {ids['Peter']: 1, ids['Mary']: 1, ids['George']: 2,
+             ids['Anna']: 2})
+
+    def test_persona_list(self):
+        """Persons are paginated with a cursor"""
+        response, all_persons = self.get('/data/persona/list')
+        self.assertNotIn(JSONView.NEXT_CURSOR_HEADER, response)
+        self.assertEqual(
+            len(all_persons['persons']), models.Persona.objects.count())
+
+        seen = []
+        url = '/data/persona/list?limit=3'
+        while True:
+            response, page = self.get(url)
+            self.assertLessEqual(len(page['persons']), 3)
+            seen.extend(p['id'] for p in page['persons'])
+            cursor = response.get(JSONView.NEXT_CURSOR_HEADER)
+            if cursor is None:
+                break
+            url = f'/data/persona/list?limit=3&after={cursor}'
+        self.assertEqual(seen, [p['id'] for p in all_persons['persons']])
+
+        # Invalid cursors
+        response = self.client.get('/data/persona/list?limit=3&after=foo')
+        self.assertEqual(response.status_code, 400)
+
+    def test_sources_list(self):
+        """Sources are paginated with a cursor"""
+        _, all_sources = self.get('/data/sources/list')
+        seen = []
+        url = '/data/sources/list?limit=2'
+        while url:
+            response, page = self.get(url)
+            seen.extend(s['id'] for s in page)
+            cursor = response.get(JSONView.NEXT_CURSOR_HEADER)
+            url = cursor and f'/data/sources/list?limit=2&after={cursor}'
+        self.assertEqual(seen, [s['id'] for s in all_sources])
+
+    def test_columnar(self):
+        """The columnar format decodes to the usual format"""
+        _, expected = self.get('/data/persona/list')
+        response, columnar = self.get(
+            '/data/persona/list',
+            HTTP_ACCEPT=JSONView.COLUMNAR_TYPE)
+        self.assertEqual(columnar['format'], 'columnar')
+        self.assertEqual(decode_columnar(columnar), expected)
+
+        # Clients that do not ask for it get the usual format
+        _, usual = self.get('/data/persona/list', HTTP_ACCEPT='*/*')
+        self.assertEqual(usual, expected)
+
+    def test_search(self):
+        """Persons, places and sources are found by name"""
+        _, result = self.get('/data/search?q=smith')
+        self.assertEqual(result['counts'].get('person'), 6)
+        self.assertTrue(all(r['kind'] == 'person' for r in result['results']))
+
+        _, result = self.get('/data/search?q=paris')
+        self.assertIn('place', result['counts'])
+        self.assertIn('source', result['counts'])
+
+        _, result = self.get('/data/search?q=smith&kinds=person&limit=2')
+        self.assertEqual(len(result['results']), 2)
+
+        _, result = self.get('/data/search?q=smith&kinds=unknown')
+        self.assertEqual(result, {"counts": {}, "results": []})
+
+    def test_sosa(self):
+        """The ancestors of a person, with their Sosa numbers"""
+        ids = self.ids
+        _, result = self.get(f'/data/sosa/{ids["John"]}')
+        self.assertEqual(
+            [tuple(s) for s in result['sosa']],
+            [(1, ids['John']), (2, ids['Peter']), (3, ids['Mary']),
+             (4, ids['George']), (5, ids['Anna'])])
+        self.assertEqual(result['cycles'], [])
+
+        _, result = self.get(f'/data/sosa/{ids["John"]}?from=4&to=4')
+        self.assertEqual([tuple(s) for s in result['sosa']],
+                         [(4, ids['George'])])
+
+    def test_relationship(self):
+        """The relationship between two persons"""
+        ids = self.ids
+        _, result = self.get(
+            f'/data/relationship/{ids["John"]}/{ids["Lucy"]}')
+        self.assertEqual(
+            sorted(result['ancestors']), sorted([ids['George'], ids['Anna']]))
+        self.assertEqual(
+            result['paths'][0],
+            [ids['John'], ids['Peter'], result['paths'][0][2], ids['Jack'],
+             ids['Lucy']])
+        self.assertEqual(result['others'], [])
+
+        _, result = self.get(
+            f'/data/relationship/{ids["John"]}/{ids["Paul"]}')
+        self.assertEqual(
+            sorted(result['ancestors']), sorted([ids['Peter'], ids['Mary']]))
+
+        _, result = self.get(
+            f'/data/relationship/{ids["Mary"]}/{ids["Anna"]}')
+        self.assertIsNone(result['relationship'])
+
+    def test_kin(self):
+        """The relatives of a person"""
+        ids = self.ids
+        _, result = self.get(f'/data/kin/{ids["John"]}?degree=1')
+        self.assertEqual(result['decujus'], ids['John'])
+        self.assertEqual(
+            set(p['id'] for p in result['persons']),
+            {ids['John'], ids['Peter'], ids['Mary']})
+
+        _, result = self.get(f'/data/kin/{ids["John"]}?degree=2')
+        found = set(p['id'] for p in result['persons'])
+        self.assertIn(ids['Paul'], found)
+        self.assertIn(ids['George'], found)
+        self.assertNotIn(ids['Lucy'], found)
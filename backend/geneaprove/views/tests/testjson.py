@@ -0,0 +1,304 @@
+"""
+unittest-based framework for testing geneaprove.views.to_json
+"""
+
+import datetime
+import django.test
+import json
+import unittest
+from geneaprove import models
+from geneaprove.models.theme.styles import Style
+from ..serializers import SERIALIZERS
+from geneaprove.sql import PersonRow, PersonSet
+from ..persona import PersonaList
+from ..to_json import JSONView, ModelEncoder, decode_columnar, evaluate
+
+
+ASSERTION = {'id', 'disproved', 'rationale', 'researcher', 'last_change',
+             'source_id', 'surety'}
+
+
+class SerializersTestCase(django.test.TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        surety = models.Surety_Scheme_Part.objects.first()
+        researcher = models.Researcher.objects.create(name='me')
+        common = dict(surety=surety, researcher=researcher)
+        place = models.Place.objects.create(name='Paris')
+        source = models.Source.objects.create(
+            title='Census 1870', abbrev=None, medium='book',
+            researcher=researcher, subject_place=place)
+        john = models.Persona.objects.create(display_name='John Smith')
+        mary = models.Persona.objects.create(
+            display_name='Mary Smith', description='the elder')
+        birth = models.Event.objects.create(
+            name='Birth of John', type_id=models.Event_Type.PK_birth,
+            place=place, date='1870-05-03', date_sort='1870-05-03')
+        group = models.Group.objects.create(
+            name='Regiment',
+            type=models.Group_Type.objects.create(name='army'))
+        occupation = models.Characteristic.objects.create(
+            name='Occupation', date='1870')
+        models.Characteristic_Part.objects.create(
+            characteristic=occupation, name='farmer',
+            type=models.Characteristic_Part_Type.objects.get(gedcom='OCCU'))
+
+        models.P2E.objects.create(
+            person=john, event=birth, source=source,
+            role_id=models.Event_Type_Role.PK_principal,
+            rationale='found in census', **common)
+        models.P2E.objects.create(
+            person=mary, event=birth,
+            role_id=models.Event_Type_Role.PK_birth__mother, **common)
+        models.P2P.objects.create(
+            person1=john, person2=mary, type_id=models.P2P_Type.sameAs,
+            disproved=True, **common)
+        models.P2G.objects.create(person=john, group=group, **common)
+        models.P2C.objects.create(
+            person=john, characteristic=occupation, **common)
+
+    def assertSameEncoding(self, objects):
+        """The registry gives the same result as the generic encoding"""
+        self.assertTrue(objects)
+        self.assertIn(type(objects[0]), SERIALIZERS)
+        self.assertEqual(
+            ModelEncoder().encode(objects),
+            ModelEncoder(serializers={}).encode(objects))
+
+    def test_models(self):
+        """Instances read from the database"""
+        self.assertSameEncoding(list(models.Persona.objects.all()))
+        self.assertSameEncoding(list(models.Place.objects.all()))
+        self.assertSameEncoding(list(models.Event.objects.all()))
+        self.assertSameEncoding(list(models.Source.objects.all()))
+        self.assertSameEncoding(list(models.P2E.objects.all()))
+        self.assertSameEncoding(list(models.P2P.objects.all()))
+        self.assertSameEncoding(list(models.P2G.objects.all()))
+        self.assertSameEncoding(list(
+            models.P2C.objects.select_related('characteristic')
+            .prefetch_related('characteristic__parts')))
+
+        # Deferred fields are read from the database
+        self.assertSameEncoding(
+            list(models.Event.objects.only('id', 'name')))
+
+    FIELDS = {
+        models.Place: {'id', 'date', 'date_sort', 'parent_place_id', 'name'},
+        models.Event: {'id', 'name', 'type', 'place', 'date', 'date_sort'},
+        models.Source: {
+            'id', 'higher_source_id', 'subject_place', 'jurisdiction_place',
+            'researcher', 'subject_date', 'medium', 'title', 'abbrev',
+            'biblio', 'last_change', 'comments'},
+        models.Characteristic: {'name', 'date', 'date_sort', 'place'},
+        models.P2E: ASSERTION | {'p1', 'p2'},
+        models.P2P: ASSERTION | {'p1', 'p2', 'type'},
+        models.P2G: ASSERTION | {'p1', 'p2'},
+        models.P2C: ASSERTION | {'p1', 'p2'},
+    }
+    # The keys in the json for each registered type. The persons and styles
+    # omit the keys with no value (see test_persons).
+
+    def test_fields(self):
+        """Each registered type gives the expected keys"""
+        self.assertEqual(
+            set(SERIALIZERS),
+            set(self.FIELDS) | {models.Persona, PersonRow, Style,
+                                datetime.datetime})
+        for t, fields in self.FIELDS.items():
+            instances = list(t.objects.all())
+            self.assertTrue(instances, t)
+            for obj in instances:
+                self.assertEqual(set(SERIALIZERS[t](obj)), fields, t)
+
+        source = SERIALIZERS[models.Source](models.Source.objects.get())
+        self.assertIsInstance(source['subject_place'], models.Place)
+        self.assertIsNone(source['jurisdiction_place'])
+
+        p2c = models.P2C.objects.get()
+        self.assertEqual(
+            SERIALIZERS[models.P2C](p2c)['p2']['parts'],
+            [{'type': p.type_id, 'value': 'farmer'}
+             for p in p2c.characteristic.parts.all()])
+
+        self.assertEqual(
+            Style(font_weight='bold', color='red', stroke='blue',
+                  fill='white').to_json(),
+            {'fontWeight': 'bold', 'color': 'red', 'stroke': 'blue',
+             'fill': 'white'})
+        self.assertEqual(Style(fill='red').to_json(), {'fill': 'red'})
+
+    def test_persons(self):
+        """Persons with the fields computed by PersonSet"""
+        john = models.Persona.objects.get(display_name='John Smith')
+        john.birthISODate = '1870-05-03'
+        john.sex = 'M'
+        john.generation = 0
+        self.assertSameEncoding([john])
+        self.assertEqual(
+            ModelEncoder().encode(john),
+            f'{{"id":{john.id},"display_name":"John Smith",'
+            '"birthISODate":"1870-05-03","sex":"M","generation":0}')
+
+        self.assertSameEncoding([Style(font_weight='bold', fill='red')])
+
+
+class IterchunksTestCase(unittest.TestCase):
+
+    def encode(self, obj, **kwargs):
+        """Check that iterchunks gives the same result as json.dumps"""
+        chunks = list(ModelEncoder().iterchunks(obj, **kwargs))
+        self.assertEqual(
+            ''.join(chunks), json.dumps(obj, separators=(',', ':')))
+        return chunks
+
+    def test_values(self):
+        """Top-level values that are not lists or dicts"""
+        self.encode(1)
+        self.encode('a "quoted" string')
+        self.encode(None)
+        self.encode([])
+        self.encode({})
+        self.encode({'a': [], 'b': {}, 'c': None})
+
+    def test_keys(self):
+        """Keys that are not strings are converted as json does"""
+        self.encode({1: [1, 2], 2.5: 'a', True: 'b', None: [3]})
+        self.encode({'é': [1], '"': [2]})
+
+    def test_batches(self):
+        """Lists are encoded in batches, whatever their length"""
+        for length in (1, 255, 256, 257, 512, 513, 1000):
+            items = [{'id': i, 'name': f'p{i}'} for i in range(length)]
+            self.encode(items)
+            self.encode({'persons': items, 'tuple': tuple(range(length))})
+            self.encode(items, batch=1)
+
+    def test_chunks(self):
+        """The result is split in chunks of about chunk_size"""
+        items = list(range(10000))
+        chunks = self.encode(items, chunk_size=1024, batch=100)
+        self.assertGreater(len(chunks), 10)
+        self.assertTrue(all(len(c) < 2048 for c in chunks))
+
+        self.assertEqual(len(self.encode(items)), 1)
+
+    def test_evaluate(self):
+        """Nested querysets are evaluated"""
+        value = evaluate({
+            'a': models.Surety_Scheme.objects.all(),
+            'b': [(1, models.Surety_Scheme.objects.none())]})
+        self.assertIsInstance(value['a'], list)
+        self.assertEqual(value['b'], [(1, [])])
+
+
+class _Failing(object):
+    """An object that cannot be converted to json"""
+
+    def to_json(self):
+        raise ValueError('cannot convert')
+
+
+class _LargeView(JSONView):
+
+    def get_json(self, params):
+        return {"rows": ['x' * 1000] * 1000 + [_Failing()]}
+
+
+class StreamTestCase(unittest.TestCase):
+
+    def test_error(self):
+        """An error while streaming is logged and aborts the response"""
+        request = django.test.RequestFactory().get('/')
+        response = _LargeView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+
+        with self.assertLogs('geneaprove.JSON', 'ERROR'):
+            with self.assertRaises(ValueError):
+                b''.join(response.streaming_content)
+
+
+class PersonSetStreamTestCase(django.test.TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        models.Persona.objects.bulk_create(
+            models.Persona(display_name=f'Person number {i} ' + 'x' * 100)
+            for i in range(1000))
+        PersonSet.recompute_main_ids()
+
+    def test_chunks(self):
+        """The list of persons in a PersonSet is split in chunks"""
+        request = django.test.RequestFactory().get('/')
+        response = PersonaList.as_view()(request)
+        self.assertTrue(response.streaming)
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+
+        persons = json.loads(b''.join(chunks))['persons']
+        self.assertEqual(len(persons), 1000)
+
+    def test_iterchunks(self):
+        """Objects are converted before the lists they contain are split"""
+        persons = PersonSet(readonly=True)
+        persons.add_ids()
+        encoder = ModelEncoder()
+        chunks = list(encoder.iterchunks(persons))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(chunks), encoder.encode(persons))
+
+    def test_evaluate(self):
+        """Objects are converted to json when evaluated"""
+        persons = PersonSet(readonly=True)
+        persons.add_ids(ids=[models.Persona.objects.first().id])
+        value = evaluate({'set': persons})
+        self.assertIsInstance(value['set'], dict)
+        self.assertEqual(len(value['set']['persons']), 1)
+
+
+class ColumnarTestCase(unittest.TestCase):
+
+    def roundtrip(self, obj):
+        """Check that the columnar format decodes to the usual encoding"""
+        encoder = ModelEncoder()
+        columnar = json.loads(encoder.encode(encoder.columnar(obj)))
+        self.assertEqual(columnar["format"], "columnar")
+        self.assertEqual(
+            decode_columnar(columnar), json.loads(encoder.encode(obj)))
+        return columnar
+
+    def test_roundtrip(self):
+        """Null values and missing keys are preserved"""
+        columnar = self.roundtrip({
+            "persons": [
+                {"id": 1, "sex": "M", "name": "John"},
+                {"id": 2, "sex": None, "name": "Mary"},
+                {"id": 3, "name": None},
+                {"id": 4, "name": "John", "parents": [1, None]},
+            ],
+            "count": 4,
+        })
+        persons = columnar["data"]["persons"]
+        self.assertEqual(persons["$table"], 4)
+        self.assertEqual(
+            persons["absent"], {"sex": [2, 3], "parents": [0, 1, 2]})
+        self.assertEqual(sorted(persons["coded"]), ["name", "sex"])
+        self.assertEqual(columnar["strings"], ["M", "John", "Mary"])
+
+    def test_values(self):
+        """Values that are not lists of objects are unchanged"""
+        self.roundtrip([])
+        self.roundtrip([1, 2, None])
+        self.roundtrip([[1, 2], [3, 4]])
+        self.roundtrip({"a": {"b": [{"x": 1}, {"x": None}, {}]}})
+        self.roundtrip([{"id": 1}, 2])
+        self.roundtrip(None)
+
+    def test_objects(self):
+        """Objects are converted with their serializer"""
+        columnar = self.roundtrip(
+            [Style(font_weight='bold'), Style(fill='red'), Style()])
+        self.assertEqual(
+            columnar["data"]["absent"],
+            {"fontWeight": [1, 2], "fill": [0, 2]})
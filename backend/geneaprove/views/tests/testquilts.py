@@ -0,0 +1,42 @@
+"""
+unittest-based framework for testing geneaprove.views.quilts
+"""
+
+import django.test
+import json
+import os
+from geneaprove import models
+from geneaprove.importers.gedcomimport import GedcomFileImporter
+from geneaprove.sql import PersonSet, global_graph
+
+
+class QuiltsTestCase(django.test.TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # The wives are imported before their husbands, so have lower ids
+        success, msg = GedcomFileImporter().parse(
+            os.path.join(os.path.dirname(__file__), 'quilts.ged'))
+        assert success, msg
+        PersonSet.recompute_main_ids()
+
+        # The change counters were rolled back with the previous tests
+        global_graph.invalidate()
+
+        cls.ids = {
+            p.display_name.split()[0]: p.main_id
+            for p in models.Persona.objects.all()}
+
+    def test_families(self):
+        """Each couple is a single family, with the father first"""
+        ids = self.ids
+        self.assertLess(ids['Mary'], ids['Peter'])
+
+        response = self.client.get(f'/data/quilts/{ids["John"]}')
+        self.assertEqual(response.status_code, 200)
+        result = json.loads(response.content.decode())
+        families = [f for layer in result['families'] for f in layer]
+        self.assertEqual(
+            sorted(families),
+            sorted([[ids['Peter'], ids['Mary'], ids['John']],
+                    [ids['George'], ids['Anna'], ids['Peter']]]))
@@ -0,0 +1,41 @@
+"""
+unittest-based framework for testing geneaprove.views.relationship
+"""
+
+import unittest
+from ..relationship import describe
+
+
+class DescribeTestCase(unittest.TestCase):
+
+    def test_direct(self):
+        """Ancestors and descendants"""
+        self.assertEqual(describe(0, 0), 'self')
+        self.assertEqual(describe(0, 1, 'M'), 'father')
+        self.assertEqual(describe(0, 1, 'F'), 'mother')
+        self.assertEqual(describe(0, 1), 'parent')
+        self.assertEqual(describe(0, 2, 'F'), 'grandmother')
+        self.assertEqual(describe(0, 4, 'M'), 'great-great-grandfather')
+        self.assertEqual(describe(0, 5), '3x great-grandparent')
+        self.assertEqual(describe(1, 0, 'M'), 'son')
+        self.assertEqual(describe(3, 0, 'F'), 'great-granddaughter')
+        self.assertEqual(describe(2, 0), 'grandchild')
+
+    def test_collateral(self):
+        """Siblings, aunts and nephews"""
+        self.assertEqual(describe(1, 1, 'F'), 'sister')
+        self.assertEqual(describe(1, 1), 'sibling')
+        self.assertEqual(describe(1, 2, 'M'), 'uncle')
+        self.assertEqual(describe(1, 3, 'F'), 'great-aunt')
+        self.assertEqual(describe(1, 2), 'aunt or uncle')
+        self.assertEqual(describe(2, 1, 'M'), 'nephew')
+        self.assertEqual(describe(4, 1, 'F'), 'great-great-niece')
+
+    def test_cousins(self):
+        """Degree and removal"""
+        self.assertEqual(describe(2, 2), 'first cousin')
+        self.assertEqual(describe(3, 3, 'M'), 'second cousin')
+        self.assertEqual(describe(2, 3), 'first cousin once removed')
+        self.assertEqual(describe(5, 3), 'second cousin twice removed')
+        self.assertEqual(describe(3, 7), 'second cousin 4 times removed')
+        self.assertEqual(describe(13, 13), '12th cousin')
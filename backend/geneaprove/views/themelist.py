@@ -10,9 +10,8 @@ class ThemeRules(JSONView):
 
     def get_json(self, params, theme_id):
         try:
-            theme = models.Theme.objects\
-                .prefetch_related('rules', 'rules__parts').get(id=theme_id)
-            rules = theme.rules.filter(parent=None).all()
+            theme = models.Theme.objects.get(id=theme_id)
+            rules = [r for r in theme.fetch_rules() if r.parent_id is None]
         except:
             rules = []
 
@@ -2,11 +2,17 @@
 
 from django.conf import settings
 from django.core.serializers.json import DjangoJSONEncoder
-from django.http import HttpResponse, QueryDict
+from django.http import (
+    HttpResponse, HttpResponseBadRequest, QueryDict, StreamingHttpResponse)
+from django.utils.cache import patch_vary_headers
 from django.views.generic import View
+from geneaprove.sql import Invalid_Cursor
 from geneaprove.utils.date import DateRange
+from geneaprove.utils.sqlaudit import QueryRecorder
+from .serializers import SERIALIZERS
 import datetime
 import django.db.models.query
+import itertools
 import json
 import logging
 import time
@@ -24,18 +30,23 @@ class ModelEncoder(DjangoJSONEncoder):
     representation.
     """
 
-    def __init__(self, custom=None, year_only=False, **kwargs):
+    def __init__(self, custom=None, year_only=False, serializers=SERIALIZERS,
+                 **kwargs):
         """
         :param custom: a function that gets an object, and returns its JSON
            encoding as a string, or a simple version of the object that should
            be encoded recursively It should return None to fallback to the
            default encoding.
+        :param serializers: a dict of type -> function, to convert the
+           instances of exactly that type (see geneaprove.views.serializers).
+           Other objects go through the checks in `default`.
         """
         if 'separators' not in kwargs:
             kwargs['separators'] = (',', ':')
         super().__init__(**kwargs)
         self.year_only = year_only
         self.custom = custom
+        self.serializers = serializers
 
     def default(self, obj):
         # pylint: disable=method-hidden
@@ -47,6 +58,10 @@ class ModelEncoder(DjangoJSONEncoder):
             if from_custom:
                 return from_custom
 
+        serialize = self.serializers.get(type(obj))
+        if serialize is not None:
+            return serialize(obj)
+
         if isinstance(obj, DateRange):
             return obj.display(year_only=self.year_only)
 
@@ -67,8 +82,223 @@ class ModelEncoder(DjangoJSONEncoder):
         else:
             return super().default(obj)
 
+    _PLAIN = frozenset((str, int, float, bool, type(None), dict, list))
+    # Types that json encodes without calling `default`
+
+    def _row(self, item):
+        """
+        The dict that `item` is converted to, or None if it is not converted
+        to a dict.
+        """
+        if isinstance(item, dict):
+            return item
+        if type(item) in self._PLAIN or isinstance(item, (tuple, set)):
+            return None
+        try:
+            row = self.default(item)
+        except TypeError:
+            return None
+        return row if isinstance(row, dict) else None
+
+    def columnar(self, obj):
+        """
+        Convert obj to the columnar format, where each list of objects
+        (found in obj or in its nested dicts) is stored as a table, with one
+        array per field instead of a dict per object::
+
+            {"format": "columnar",
+             "data": {"persons": {"$table": 3,
+                                  "columns": {"id": [1, 2, 3],
+                                              "sex": [0, null, null]},
+                                  "coded": ["sex"],
+                                  "absent": {"sex": [2]}}},
+             "strings": ["M"]}
+
+        The columns whose values are all strings are listed in "coded": they
+        contain indexes in "strings", shared by all tables, so that strings
+        repeated in many objects (dates, names, places,...) are sent once.
+        A null in a column is a null value, unless the row is listed in
+        "absent" for that column, in which case the object did not have
+        that key. "absent" is omitted when all objects have all keys.
+        See `decode_columnar` for the reverse conversion.
+        """
+        strings = {}   # string -> index
+
+        def _code(value):
+            index = strings.get(value)
+            if index is None:
+                index = strings[value] = len(strings)
+            return index
+
+        def _table(rows):
+            keys = {}
+            for r in rows:
+                keys.update(dict.fromkeys(r))
+
+            columns = {}
+            coded = []
+            absent = {}
+            for k in keys:
+                col = [r.get(k) for r in rows]
+                missing = [idx for idx, r in enumerate(rows) if k not in r]
+                if missing:
+                    absent[k] = missing
+                col = [v if type(v) in self._PLAIN else self.default(v)
+                       for v in col]
+                if all(v is None or type(v) is str for v in col):
+                    col = [None if v is None else _code(v) for v in col]
+                    coded.append(k)
+                columns[k] = col
+
+            table = {"$table": len(rows), "columns": columns, "coded": coded}
+            if absent:
+                table["absent"] = absent
+            return table
+
+        def _convert(value):
+            if type(value) not in self._PLAIN \
+                    and not isinstance(value, (dict, list, tuple)):
+                try:
+                    value = self.default(value)
+                except TypeError:
+                    return value
+
+            if isinstance(value, dict):
+                return {k: _convert(v) for k, v in value.items()}
+            if isinstance(value, (list, tuple)) and value:
+                rows = [self._row(item) for item in value]
+                if all(r is not None for r in rows):
+                    return _table(rows)
+            return value
+
+        data = _convert(obj)
+        return {"format": "columnar", "data": data, "strings": list(strings)}
+
+    def _key(self, key):
+        """Encode a key of a dict, converted to a string as json does"""
+        return self.encode(key if isinstance(key, str) else self.encode(key))
+
+    def iterchunks(self, obj, chunk_size=65536, batch=256):
+        """
+        Encode obj incrementally, as a series of strings of about
+        `chunk_size` characters.
+        This is the same as `iterencode`, but the lists found in obj or in
+        its nested dicts are encoded in slices of `batch` elements, which is
+        much faster since json then uses its C implementation.
+        Objects (like a PersonSet) are first converted with their to_json(),
+        so that the lists they contain are also split.
+        Only compact encoding is supported.
+        """
+        buffer = []
+        size = 0
+
+        def _items(value):
+            while not isinstance(value, (str, int, float, dict, list, tuple)) \
+                    and value is not None:
+                value = self.default(value)
+
+            if isinstance(value, dict):
+                yield '{'
+                for idx, (key, v) in enumerate(value.items()):
+                    yield f'{"," if idx else ""}{self._key(key)}:'
+                    yield from _items(v)
+                yield '}'
+            else:
+                yield from _list(value)
+
+        def _list(value):
+            if isinstance(value, (list, tuple)):
+                yield '['
+                for start in range(0, len(value), batch):
+                    if start:
+                        yield ','
+                    yield self.encode(list(value[start:start + batch]))[1:-1]
+                yield ']'
+            else:
+                yield self.encode(value)
+
+        for item in _items(obj):
+            buffer.append(item)
+            size += len(item)
+            if size >= chunk_size:
+                yield ''.join(buffer)
+                buffer = []
+                size = 0
+
+        if buffer:
+            yield ''.join(buffer)
+
+
+def _is_composite(obj):
+    """
+    Whether obj is an object converted with to_json(), which is not one of
+    the models (or rows) that the serializers know about.
+    """
+    return type(obj) not in SERIALIZERS and hasattr(obj, 'to_json') \
+        and not isinstance(obj, django.db.models.Model)
+
 
-def to_json(obj, custom=None, year_only=False):
+def evaluate(obj):
+    """
+    Evaluate the querysets found in obj (or in the dicts, lists and tuples
+    it contains), so that their queries are run now rather than while the
+    response is streamed, when errors can no longer be reported.
+    Objects like a PersonSet, at the top-level or in a dict, are converted
+    with their to_json(), which often runs queries too. This is not done
+    for the elements of lists, which are the rows of the result.
+    :returntype: obj, where querysets have been replaced with lists. Dicts
+       and lists are modified in place.
+    """
+    if isinstance(obj, django.db.models.query.QuerySet):
+        return [evaluate(v) for v in obj]
+    elif _is_composite(obj):
+        return evaluate(obj.to_json())
+    elif isinstance(obj, dict):
+        for k, v in obj.items():
+            if isinstance(v, (django.db.models.query.QuerySet, dict, list,
+                              tuple)) or _is_composite(v):
+                obj[k] = evaluate(v)
+    elif isinstance(obj, list):
+        for idx, v in enumerate(obj):
+            if isinstance(v, (django.db.models.query.QuerySet, dict, list,
+                              tuple)):
+                obj[idx] = evaluate(v)
+    elif isinstance(obj, tuple):
+        return tuple(evaluate(v) for v in obj)
+    return obj
+
+
+def decode_columnar(data):
+    """
+    The reverse of ModelEncoder.columnar, for data decoded from json: lists
+    are converted back to lists of dicts. The same is done on the client by
+    decodeColumnar (src/Server/Columnar.tsx).
+    """
+    if not isinstance(data, dict) or data.get("format") != "columnar":
+        return data
+    strings = data["strings"]
+
+    def _decode(value):
+        if not isinstance(value, dict):
+            return value
+        if "$table" not in value:
+            return {k: _decode(v) for k, v in value.items()}
+
+        rows = [{} for _ in range(value["$table"])]
+        coded = set(value["coded"])
+        absent = value.get("absent", {})
+        for k, col in value["columns"].items():
+            skip = set(absent.get(k, ()))
+            for idx, v in enumerate(col):
+                if idx not in skip:
+                    rows[idx][k] = \
+                        strings[v] if k in coded and v is not None else v
+        return rows
+
+    return _decode(data["data"])
+
+
+def to_json(obj, custom=None, year_only=False, pretty=False):
     """
     Converts a type to json data, properly converting database instances.
     If year_only is true, then the dates will only include the year
@@ -76,8 +306,28 @@ def to_json(obj, custom=None, year_only=False):
        encoding as a string, or a simple version of the object that should
        be encoded recursively It should return None to fallback to the default
        encoding.
+    :param pretty: if true, the result is indented, which is easier to read
+       but much larger.
     """
-    return ModelEncoder(year_only=year_only, custom=custom, indent=3).encode(obj)
+    if pretty:
+        return ModelEncoder(
+            year_only=year_only, custom=custom, indent=3,
+            separators=(',', ': ')).encode(obj)
+    return ModelEncoder(year_only=year_only, custom=custom).encode(obj)
+
+
+def iter_json(obj, custom=None, year_only=False, columnar=False):
+    """
+    Same as `to_json`, but returns an iterator over chunks of the compact
+    encoding, so that a large result never has to be fully encoded in
+    memory.
+    :param columnar: if true, the lists of objects are sent as tables (see
+       ModelEncoder.columnar), which is much smaller for long lists.
+    """
+    encoder = ModelEncoder(year_only=year_only, custom=custom)
+    if columnar:
+        obj = encoder.columnar(obj)
+    return encoder.iterchunks(obj)
 
 
 class JSONViewParams(QueryDict):
@@ -122,6 +372,36 @@ class JSONView(View):
     or as JSON-encoded body, and then return some JSON data.
     """
 
+    NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+    # Header used to send the cursor for the next page of a list (see
+    # SQLSet.keyset)
+
+    query_budget = None
+    # Maximal number of SQL queries for one request, checked when
+    # settings.GENEAPROVE_SQL_AUDIT is set. This should not depend on the
+    # amount of data returned, so that N+1 query patterns are detected.
+
+    COLUMNAR_TYPE = 'application/vnd.geneaprove.columnar+json'
+    # The type to accept (or the "columnar=1" parameter) to receive lists in
+    # the columnar format (see ModelEncoder.columnar)
+
+    SQL_REPEAT_THRESHOLD = 5
+    # Report queries executed at least this number of times from the same
+    # place while handling a request, when auditing SQL
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.headers = {}   # additional headers for the response
+
+    def set_next_cursor(self, rows, limit):
+        """
+        Send the cursor to get the rows following `rows`, unless we have
+        reached the end of the list.
+        :param rows: a list of objects with a `_cursor` attribute.
+        """
+        if limit and rows and len(rows) >= int(limit):
+            self.headers[self.NEXT_CURSOR_HEADER] = rows[-1]._cursor
+
     def get_json(self, params, *args, **kwargs):
         # pylint: disable=no-self-use
         # pylint: disable=unused-argument
@@ -141,12 +421,86 @@ class JSONView(View):
         """
         return {}
 
-    def to_json(self, value):
+    def to_json(self, value, pretty=False, columnar=False):
         """
-        Converts value to JSON.
+        Converts value to JSON, either as a string or as an iterator over
+        chunks of the encoding (see `iter_json`).
         This can be overridden if necessary.
         """
-        return to_json(value)
+        if columnar:
+            return iter_json(value, columnar=True)
+        if pretty:
+            return to_json(value, pretty=True)
+        return iter_json(value)
+
+    def __flag(self, params, name):
+        """Read (and remove) a boolean parameter"""
+        return str(params.pop(name, ['0'])[-1]) not in ('', '0')
+
+    def __compute(self, method, params, *args, **kwargs):
+        """
+        :returntype: a tuple (content, rest), where content is the start of
+           the JSON encoding, and rest is None or an iterator over the
+           following chunks.
+        """
+        pretty = self.__flag(params, 'pretty')
+        columnar = self.__flag(params, 'columnar') or (
+            self.COLUMNAR_TYPE in self.request.META.get('HTTP_ACCEPT', ''))
+        # Run all queries before the response starts, so that errors are
+        # reported with the proper status. The to_json() methods of some
+        # objects might still query the database while streaming (see
+        # __stream)
+        resp = evaluate(method(params, *args, **kwargs))
+
+        # Can't use JsonResponse since we want our own converter
+        logger.debug('convert to json')
+        result = self.to_json(resp, pretty=pretty, columnar=columnar)
+        if isinstance(result, str):
+            return result, None
+
+        # Encode the first chunks now, so that small responses are sent in
+        # one go, with a Content-Length, and that errors are reported as
+        # usual.
+        first = next(result, '')
+        second = next(result, None)
+        if second is None:
+            return first, None
+        return first, self.__stream(itertools.chain([second], result))
+
+    def __stream(self, chunks):
+        """
+        The rest of the response, encoded while it is sent. The status (200)
+        and headers have already been sent, so an error can no longer be
+        reported to the client. It is logged, and raised again so that the
+        server closes the connection: the client then receives an
+        incomplete body, which is not valid JSON, rather than a truncated
+        response that looks complete.
+        """
+        try:
+            yield from chunks
+        except Exception:
+            logger.exception(
+                f'{self.__module__}.{self.__class__.__name__}:'
+                ' error while streaming the response')
+            raise
+
+    def __audit(self, queries):
+        """
+        Report the queries executed several times, which likely come from a
+        loop over objects, and check the query budget of the view.
+        """
+        name = f'{self.__module__}.{self.__class__.__name__}'
+        report = queries.report(self.SQL_REPEAT_THRESHOLD)
+        if report:
+            logger.warning(f'{name}: repeated queries\n{report}')
+
+        if self.query_budget is not None \
+                and len(queries) > self.query_budget:
+            if getattr(settings, 'GENEAPROVE_SQL_BUDGET_STRICT', False):
+                queries.check_budget(self.query_budget, name)
+            logger.warning(
+                f'{name}: {len(queries)} queries,'
+                f' budget is {self.query_budget}')
 
     def __internal(self, method, params, *args, **kwargs):
         """
@@ -157,13 +511,37 @@ class JSONView(View):
         # Always convert an "id" parameter to integer
         if 'id' in kwargs:
             kwargs['id'] = int(kwargs['id'])
-        resp = method(params, *args, **kwargs)
 
-        # Can't use JsonResponse since we want our own converter
-        logger.debug('convert to json')
-        result = self.to_json(resp)
+        try:
+            if getattr(settings, 'GENEAPROVE_SQL_AUDIT', False):
+                with QueryRecorder() as queries:
+                    # Encode everything, to count the queries done while
+                    # converting objects to json
+                    content, rest = self.__compute(
+                        method, params, *args, **kwargs)
+                    if rest is not None:
+                        content += ''.join(rest)
+                        rest = None
+                self.__audit(queries)
+            else:
+                content, rest = self.__compute(
+                    method, params, *args, **kwargs)
+        except Invalid_Cursor as e:
+            return HttpResponseBadRequest(
+                json.dumps({'error': str(e)}),
+                content_type='application/json')
+
         logger.debug(f'send response, total {time.perf_counter() - start}s')
-        return HttpResponse(result, content_type='application/json')
+        if rest is None:
+            response = HttpResponse(content, content_type='application/json')
+        else:
+            response = StreamingHttpResponse(
+                itertools.chain([content], rest),
+                content_type='application/json')
+        for name, value in self.headers.items():
+            response[name] = value
+        patch_vary_headers(response, ('Accept', ))
+        return response
 
     def get(self, request, *args, **kwargs):
         """
@@ -0,0 +1,88 @@
+/**
+ * The server can send lists of objects in a columnar format, with one
+ * array per field instead of one object per row, when the request has an
+ * "Accept: application/vnd.geneaprove.columnar+json" header or a
+ * "columnar=1" parameter. This is much smaller for long lists.
+ * The columns listed in "coded" contain indexes in the "strings" array,
+ * shared by all tables. A null in a column is a null value, unless the row
+ * is listed in "absent" for that column, in which case the field is
+ * missing from the object.
+ */
+
+export const COLUMNAR_TYPE = 'application/vnd.geneaprove.columnar+json';
+
+interface Table {
+   $table: number;   // number of rows
+   columns: {[field: string]: any[]};
+   coded: string[];
+   absent?: {[field: string]: number[]};  // rows without the field
+}
+
+interface Columnar {
+   format: 'columnar';
+   data: any;
+   strings: string[];
+}
+
+/**
+ * Convert a response to the usual format, where lists are arrays of
+ * objects. Responses in the usual format are returned unchanged.
+ */
+export const decodeColumnar = (json: any): any => {
+   if (!json || json.format !== 'columnar') {
+      return json;
+   }
+   const strings = (json as Columnar).strings;
+
+   const decodeTable = (table: Table) => {
+      const rows: any[] = [];
+      for (let r = 0; r < table.$table; r++) {
+         rows.push({});
+      }
+      const coded = new Set(table.coded);
+      const absent = table.absent || {};
+      Object.entries(table.columns).forEach(([field, col]) => {
+         const isCoded = coded.has(field);
+         const skip = new Set(absent[field] || []);
+         col.forEach((v, r) => {
+            if (!skip.has(r)) {
+               rows[r][field] = (isCoded && v !== null) ? strings[v] : v;
+            }
+         });
+      });
+      return rows;
+   };
+
+   const decode = (value: any): any => {
+      if (value === null || typeof value !== 'object'
+          || Array.isArray(value)) {
+         return value;
+      }
+      if (value.$table !== undefined) {
+         return decodeTable(value as Table);
+      }
+      const result: any = {};
+      Object.entries(value).forEach(([k, v]) => result[k] = decode(v));
+      return result;
+   };
+
+   return decode((json as Columnar).data);
+};
+
+/**
+ * Fetch JSON data from the server, asking for the columnar format, which
+ * is smaller for long lists. The server might still answer with the usual
+ * format. Use `readJSON` to decode the response.
+ */
+export const fetchJSON = (url: string): Promise<Response> =>
+   window.fetch(url, {
+      headers: new Headers({
+         Accept: `${COLUMNAR_TYPE}, application/json`,
+      }),
+   });
+
+/**
+ * Decode a response, whatever its format
+ */
+export const readJSON = (resp: Response): Promise<any> =>
+   resp.json().then(decodeColumnar);
@@ -0,0 +1,37 @@
+/**
+ * The list endpoints (persons, places and sources) support keyset
+ * pagination: when a page is full, the response includes an opaque cursor
+ * (in the X-Next-Cursor header) that can be used to fetch the following
+ * rows. This is much faster than an offset far down the list.
+ * This cache remembers the cursor for each known offset of a query.
+ */
+export class CursorCache {
+   private cursors = new Map<string, string>();
+
+   /**
+    * The URL parameter to use to fetch rows starting at `offset`
+    */
+   public param(query: string, offset: number|undefined): string {
+      if (!offset) {
+         return '';
+      }
+      const cursor = this.cursors.get(`${query}@${offset}`);
+      return cursor
+         ? `&after=${encodeURIComponent(cursor)}`
+         : `&offset=${offset}`;
+   }
+
+   /**
+    * Store the cursor sent by the server after fetching `limit` rows at
+    * `offset`.
+    */
+   public store(
+      query: string, offset: number|undefined, limit: number|undefined,
+      resp: Response
+   ) {
+      const cursor = resp.headers.get('X-Next-Cursor');
+      if (cursor && limit) {
+         this.cursors.set(`${query}@${(offset || 0) + limit}`, cursor);
+      }
+   }
+}
@@ -13,6 +13,8 @@ import { sourceFromJSON } from "../Server/Source";
 import { Place, PlaceSet } from "../Store/Place";
 import * as GP_JSON from "../Server/JSON";
 import Style from "../Store/Styles";
+import { CursorCache } from "../Server/Cursors";
+import { fetchJSON, readJSON } from "../Server/Columnar";
 
 export interface FetchPersonsResult {
    persons: PersonSet;
@@ -79,15 +81,22 @@ interface FetchPersonsParams {
    filter?: string;
    ids?: number[];
 }
+const personCursors = new CursorCache();
+
 export function fetchPersonsFromServer(p: FetchPersonsParams): Promise<Person[]> {
-   const url =
+   const query =
       `/data/persona/list?theme=${p.colors || -1}` +
       (p.filter ? `&filter=${encodeURI(p.filter)}` : "") +
-      (p.ids ? `&ids=${p.ids.join(',')}` : "") +
-      (p.offset ? `&offset=${p.offset}` : "") +
+      (p.ids ? `&ids=${p.ids.join(',')}` : "");
+   const url =
+      query +
+      personCursors.param(query, p.offset) +
       (p.limit ? `&limit=${p.limit}` : "");
-   return window.fetch(url)
-      .then((resp: Response) => resp.json())
+   return fetchJSON(url)
+      .then((resp: Response) => {
+         personCursors.store(query, p.offset, p.limit, resp);
+         return readJSON(resp);
+      })
       .then((raw: PersonaListRaw) => {
          const allS = prepareStyles(raw.allstyles, raw.styles);
          return raw.persons.map(jp => jsonPersonToPerson(
@@ -1,6 +1,8 @@
 import * as React from "react";
 import { Place, PlaceSet } from "../Store/Place";
 import { AssertionEntitiesJSON } from "../Server/Person";
+import { CursorCache } from "../Server/Cursors";
+import { fetchJSON, readJSON } from "../Server/Columnar";
 
 export interface FetchPlacesResult {
    places: PlaceSet;
@@ -13,17 +15,24 @@ interface FetchPlacesFromServerArgs {
    ids?: number[];
 }
 
+const placeCursors = new CursorCache();
+
 export function fetchPlacesFromServer(
    p: FetchPlacesFromServerArgs
 ): Promise<Place[]> {
-   const url =
+   const query =
       '/data/places/list?' +
       (p.filter ? `&filter=${encodeURI(p.filter)}` : '') +
-      (p.ids ? `&ids=${p.ids.join(',')}` : '') +
-      (p.offset ? `&offset=${p.offset}` : '') +
+      (p.ids ? `&ids=${p.ids.join(',')}` : '');
+   const url =
+      query +
+      placeCursors.param(query, p.offset) +
       (p.limit ? `&limit=${p.limit}` : '');
-   return window.fetch(url)
-      .then((resp: Response) => resp.json());
+   return fetchJSON(url)
+      .then((resp: Response) => {
+         placeCursors.store(query, p.offset, p.limit, resp);
+         return readJSON(resp);
+      });
 }
 
 /**
@@ -2,6 +2,8 @@ import * as React from "react";
 import { Source } from "../Store/Source";
 import { AssertionEntitiesJSON } from "../Server/Person";
 import * as JSON from "../Server/JSON";
+import { CursorCache } from "../Server/Cursors";
+import { fetchJSON, readJSON } from "../Server/Columnar";
 
 interface JSONResult {
    source: JSON.Source;
@@ -60,6 +62,8 @@ export function fetchSourceAsserts(p: {
    ).then(r => r.json());
 }
 
+const sourceCursors = new CursorCache();
+
 export function fetchSourcesFromServer(
    p: {
       offset?: number;
@@ -68,14 +72,19 @@ export function fetchSourcesFromServer(
       ids?: number[];
    }
 ): Promise<Source[]> {
-   const url =
+   const query =
       '/data/sources/list?' +
       (p.filter ? `&filter=${encodeURI(p.filter)}` : '') +
-      (p.offset ? `&offset=${p.offset}` : '') +
-      (p.limit ? `&limit=${p.limit}` : '') +
       (p.ids ? `&ids=${p.ids.join(',')}` : '');
-   return window.fetch(url)
-      .then((resp: Response) => resp.json());
+   const url =
+      query +
+      sourceCursors.param(query, p.offset) +
+      (p.limit ? `&limit=${p.limit}` : '');
+   return fetchJSON(url)
+      .then((resp: Response) => {
+         sourceCursors.store(query, p.offset, p.limit, resp);
+         return readJSON(resp);
+      });
 }
 
 /**